@@ -7,4 +7,9 @@ PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_PATH = os.path.join(PROJECT_ROOT, 'data')
 RAW_DATA_PATH = os.path.join(PROJECT_ROOT, r'data/raw/')
 PROCESSED_DATA_PATH = os.path.join(PROJECT_ROOT, r'data/processed')
-DADOS_CSV = os.path.join(PROJECT_ROOT, r'data/processed/pof_domicilio.csv')
\ No newline at end of file
+DADOS_CSV = os.path.join(PROJECT_ROOT, r'data/processed/pof_domicilio.csv')
+DADOS_PROCESSADOS = os.path.join(PROJECT_ROOT, r'data/processed/pof_domicilio.arrow')
+PARAMETROS_PIPELINE = os.path.join(PROJECT_ROOT, r'data/processed/pipeline_domicilio.json')
+METRICAS_ETL = os.path.join(PROJECT_ROOT, r'data/metricas_etl.jsonl')
+BENCHMARK_PATH = os.path.join(PROJECT_ROOT, r'data/benchmark')
+ESTADO_INCREMENTAL = os.path.join(PROJECT_ROOT, r'data/incremental')
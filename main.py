@@ -1,4 +1,8 @@
+import argparse
 from scripts.ETL import ETL
+from scripts.ETLIncremental import ETLIncremental
+from scripts.SnapshotCache import SnapshotCache
+from scripts.MonitorETL import MonitorETL
 from config import settings
 
 db_params = {
@@ -9,4 +13,59 @@ db_params = {
     'port': '5432'       # Porta padrão do PostgreSQL
 }
 
-ETL(settings.DADOS_CSV, db_params)
\ No newline at end of file
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='ETL da POF 2017-2018.')
+    parser.add_argument('--atualizar-cache', action='store_true',
+                        help='Relê todas as views do banco, sobrescrevendo os snapshots locais.')
+    parser.add_argument('--sem-cache', action='store_true',
+                        help='Não usa os snapshots locais em settings.RAW_DATA_PATH.')
+    parser.add_argument('--exportar-csv', action='store_true',
+                        help='Também exporta o conjunto processado em CSV (settings.DADOS_CSV).')
+    parser.add_argument('--conexoes', type=int, default=4,
+                        help='Número máximo de conexões e de leituras simultâneas das views.')
+    parser.add_argument('--agregacao', choices=['pandas', 'sql', 'streaming'], default='pandas',
+                        help="Onde agregar as views por domicílio: 'pandas' (groupby local), 'sql' (GROUP BY no banco) "
+                             "ou 'streaming' (cursor server-side, lote a lote).")
+    parser.add_argument('--backend', choices=['fetchall', 'copy'], default='fetchall',
+                        help="Leitura das views: 'fetchall' pelo cursor ou 'copy' (COPY ... TO STDOUT, só no PostgreSQL).")
+    parser.add_argument('--tamanho-lote', type=int, default=50000,
+                        help="Linhas por lote do cursor server-side na agregação 'streaming'.")
+    parser.add_argument('--particionado', action='store_true',
+                        help='Executa a engenharia de features por UF, em um pool de processos.')
+    parser.add_argument('--processos', type=int, default=None,
+                        help='Número de processos do modo particionado (padrão: todos os núcleos).')
+    parser.add_argument('--epsilon', type=float, default=0.001,
+                        help='Erro de rank dos sketches de quantis do modo particionado.')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Reprocessa apenas os domicílios alterados desde a última execução (settings.ESTADO_INCREMENTAL).')
+    parser.add_argument('--limiar-drift', type=float, default=0.1,
+                        help='PSI a partir do qual o modo incremental reajusta faixas, medianas e limites.')
+    parser.add_argument('--sqlite', default=None,
+                        help='Lê as views de um banco SQLite local (ver GeradorPOF) em vez do PostgreSQL.')
+    parser.add_argument('--perfil', action='store_true',
+                        help='Perfila cada etapa com cProfile e tracemalloc (mais lento).')
+    args = parser.parse_args()
+
+    if args.sqlite is not None:
+        db_params = {'sqlite': args.sqlite}
+
+    # Métricas de cada etapa em JSON lines (settings.METRICAS_ETL), com um resumo no final
+    monitor = MonitorETL(settings.METRICAS_ETL, perfil=args.perfil)
+    cache = None if args.sem_cache else SnapshotCache(settings.RAW_DATA_PATH, atualizar=args.atualizar_cache)
+
+    csv_path = settings.DADOS_CSV if args.exportar_csv else None
+
+    if args.incremental:
+        resumo = ETLIncremental(settings.DADOS_PROCESSADOS, db_params, settings.ESTADO_INCREMENTAL,
+                                max_conexoes=args.conexoes, agregacao=args.agregacao, backend=args.backend,
+                                tamanho_lote=args.tamanho_lote, limiar_drift=args.limiar_drift, csv_path=csv_path,
+                                pipeline_path=settings.PARAMETROS_PIPELINE, monitor=monitor)
+        print(resumo)
+    else:
+        ETL(settings.DADOS_PROCESSADOS, db_params, max_conexoes=args.conexoes, agregacao=args.agregacao,
+            backend=args.backend, tamanho_lote=args.tamanho_lote, cache=cache, csv_path=csv_path,
+            pipeline_path=settings.PARAMETROS_PIPELINE,
+            particionado=args.particionado, n_processos=args.processos, epsilon=args.epsilon, monitor=monitor)
+
+    monitor.imprimirResumo()
@@ -4,6 +4,8 @@ from sklearn.cluster import KMeans, DBSCAN, AgglomerativeClustering
 from sklearn.metrics import silhouette_score, calinski_harabasz_score, davies_bouldin_score
 from sklearn.preprocessing import StandardScaler
 from hyperopt import fmin, tpe, hp, STATUS_OK, Trials
+from scripts.ClusterDistanceCache import ClusterDistanceCache
+from scripts.LinkageTreeCache import LinkageTreeCache
 import warnings
 
 # Suprimir avisos para uma saída mais limpa
@@ -25,9 +27,10 @@ class AutoClusterHPO:
         self.best_overall_config = None
         self.best_overall_labels = np.array([]) # Inicialização aqui!
 
-    def _evaluate_combined_cvi_score(self, X, labels):
+    def _evaluate_combined_cvi_score(self, X, labels, distances=None):
         """
         Avalia um modelo de agrupamento usando múltiplos CVIs e retorna uma pontuação combinada.
+        Com um ClusterDistanceCache (distances), a silhueta usa as distâncias já calculadas.
         """
         n_clusters = len(np.unique(labels))
         
@@ -46,7 +49,10 @@ class AutoClusterHPO:
             labels_for_cvi = labels
 
         try:
-            sil_score = silhouette_score(X_for_cvi, labels_for_cvi)
+            if distances is not None:
+                sil_score = distances.silhouette(labels)
+            else:
+                sil_score = silhouette_score(X_for_cvi, labels_for_cvi)
         except ValueError:
             sil_score = -1.0 
 
@@ -68,10 +74,13 @@ class AutoClusterHPO:
         combined_score = (sil_score + normalized_chi + normalized_dbi) / 3.0
         return combined_score
 
-    def _objective_function(self, params, X_scaled, algorithm_name, random_state):
+    def _objective_function(self, params, X_scaled, algorithm_name, random_state, distances=None, trees=None):
         """
         Função objetivo para Hyperopt para otimizar hiperparâmetros de um algoritmo específico.
         Hyperopt minimiza, então retornamos -combined_score.
+        Com um ClusterDistanceCache (distances), o DBSCAN roda sobre o grafo de vizinhos
+        pré-calculado (metric='precomputed') e a silhueta sobre as distâncias guardadas.
+        Com um LinkageTreeCache (trees), o Agglomerative Clustering só corta a árvore da ligação.
         """
         labels = np.array([])
         model = None
@@ -85,18 +94,26 @@ class AutoClusterHPO:
                 model.fit(X_scaled)
                 labels = model.labels_
             elif algorithm_name == 'DBSCAN':
-                model = DBSCAN(eps=params['eps'], min_samples=int(params['min_samples']))
-                labels = model.fit_predict(X_scaled)
+                if distances is not None:
+                    model = DBSCAN(eps=params['eps'], min_samples=int(params['min_samples']), metric='precomputed')
+                    labels = model.fit_predict(distances.radius_graph)
+                else:
+                    model = DBSCAN(eps=params['eps'], min_samples=int(params['min_samples']))
+                    labels = model.fit_predict(X_scaled)
             elif algorithm_name == 'Agglomerative Clustering':
                 n_clusters = int(params['n_clusters'])
                 if n_clusters < 2 or n_clusters >= len(X_scaled):
                      return {'loss': np.inf, 'status': STATUS_OK}
-                model = AgglomerativeClustering(n_clusters=n_clusters, linkage=params['linkage'])
-                labels = model.fit_predict(X_scaled)
+                if trees is not None:
+                    model = trees.model(params['linkage'], n_clusters)
+                    labels = model.labels_
+                else:
+                    model = AgglomerativeClustering(n_clusters=n_clusters, linkage=params['linkage'])
+                    labels = model.fit_predict(X_scaled)
             else:
                 return {'loss': np.inf, 'status': STATUS_OK} 
 
-            combined_score = self._evaluate_combined_cvi_score(X_scaled, labels)
+            combined_score = self._evaluate_combined_cvi_score(X_scaled, labels, distances)
             loss = -combined_score
             if np.isinf(loss):
                 loss = np.inf
@@ -129,18 +146,25 @@ class AutoClusterHPO:
         if max_n_clusters < 3:
             max_n_clusters = 3 
 
+        min_eps, max_eps = 0.1, 2.0
         algorithms_and_spaces = {
             'KMeans': {'n_clusters': hp.randint('kmeans_n_clusters', 3, max_n_clusters)},
-            'DBSCAN': {'eps': hp.uniform('dbscan_eps', 0.1, 2.0), 'min_samples': hp.randint('dbscan_min_samples', 2, 20)},
+            'DBSCAN': {'eps': hp.uniform('dbscan_eps', min_eps, max_eps), 'min_samples': hp.randint('dbscan_min_samples', 2, 20)},
             'Agglomerative Clustering': {'n_clusters': hp.randint('agglo_n_clusters', 3, max_n_clusters), 'linkage': hp.choice('agglo_linkage', ['ward', 'complete', 'average', 'single'])}
         }
 
+        # Distâncias, vizinhos e árvores hierárquicas calculados uma única vez, compartilhados
+        # por todas as tentativas
+        distances = ClusterDistanceCache(X_scaled, max_eps=max_eps)
+        trees = LinkageTreeCache(X_scaled)
+
         print("Iniciando otimização de hiperparâmetros...")
         
         for algo_name, space in algorithms_and_spaces.items():
             trials = Trials()
             fmin(
-                fn=lambda params: self._objective_function(params, X_scaled, algo_name, random_state=42),
+                fn=lambda params: self._objective_function(params, X_scaled, algo_name, random_state=42,
+                                                           distances=distances, trees=trees),
                 space=space,
                 algo=tpe.suggest,
                 max_evals=self.max_evals_per_algo,
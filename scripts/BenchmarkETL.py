@@ -0,0 +1,116 @@
+import os
+import argparse
+import tempfile
+import pandas as pd
+from config import settings
+from scripts.ETL import (VIEWS_POF, consultaView, criarPoolConexoes, featuresEnginer, conversoes, lerConsulta, lerDados,
+                         relatorioMemoria, tratarDomicilio)
+from scripts.GeradorPOF import DOMICILIOS_POR_ESCALA, criarBancoSQLite
+from scripts.MonitorETL import MonitorETL
+
+# Benchmark do ETL sobre bancos SQLite sintéticos (ver GeradorPOF), para comparar
+# alterações no ETL com números reprodutíveis e sem depender do servidor PostgreSQL.
+
+def prepararBanco(escala, diretorio=settings.BENCHMARK_PATH, seed=42):
+
+    # Os bancos gerados são reaproveitados entre execuções com o mesmo número de domicílios e semente
+    caminho = os.path.join(diretorio, f'pof_{int(DOMICILIOS_POR_ESCALA * escala)}dom_seed{seed}.sqlite')
+    if not os.path.exists(caminho):
+        criarBancoSQLite(caminho, escala, seed)
+
+    return caminho
+
+def medirETL(db_params, monitor, diretorio_saida, **opcoes):
+
+    with monitor.etapa('lerDados') as registro:
+        df = lerDados(db_params, monitor=monitor, **opcoes)
+        registro.saida(df)
+
+    with monitor.etapa('conversoes') as registro:
+        registro.entrada(df)
+        df = conversoes(df)
+        registro.saida(df)
+
+    with monitor.etapa('featuresEnginer') as registro:
+        registro.entrada(df)
+        df = featuresEnginer(df)
+        registro.saida(df)
+
+    with monitor.etapa('to_csv') as registro:
+        df.to_csv(os.path.join(diretorio_saida, 'pof_domicilio.csv'), index=False)
+        registro.saida(len(df))
+
+def relatorioMemoriaDomicilio(db_params):
+    """Memória da View_Domicilio tratada sem e com os tipos compactos (ver ETL.compactarDomicilio)."""
+
+    pool_conexoes = criarPoolConexoes(db_params, 1)
+    try:
+        bruto = lerConsulta(pool_conexoes, consultaView(VIEWS_POF['domicilio']))
+    finally:
+        pool_conexoes.closeall()
+
+    return relatorioMemoria(tratarDomicilio(bruto.copy(), compactar=False), tratarDomicilio(bruto))
+
+def benchmark(escalas=(1, 10, 100), repeticoes=3, seed=42, diretorio=settings.BENCHMARK_PATH, **opcoes):
+    """
+    Mede lerDados (e cada leitura de view), conversoes, featuresEnginer e a gravação
+    do CSV em cada escala do banco sintético.
+
+    Args:
+        escalas (tuple): Fatores de escala do GeradorPOF (1x = DOMICILIOS_POR_ESCALA domicílios).
+        repeticoes (int): Execuções por escala; o resumo usa a mediana.
+        seed (int): Semente dos bancos gerados.
+        diretorio (str): Onde os bancos sintéticos são gravados e reaproveitados.
+        **opcoes: Repassadas a lerDados (ex: agregacao='sql', backend='copy', max_conexoes=8).
+
+    Returns:
+        pd.DataFrame: Uma linha por etapa, repetição e escala, com as métricas do MonitorETL.
+    """
+
+    resultados = []
+    for escala in escalas:
+        db_params = {'sqlite': prepararBanco(escala, diretorio, seed)}
+        for repeticao in range(repeticoes):
+            monitor = MonitorETL()
+            with tempfile.TemporaryDirectory() as temporario:
+                medirETL(db_params, monitor, temporario, **opcoes)
+
+            resumo = monitor.resumo()
+            resumo.insert(0, 'escala', escala)
+            resumo.insert(1, 'repeticao', repeticao)
+            resultados.append(resumo)
+
+    return pd.concat(resultados, ignore_index=True)
+
+def resumirBenchmark(resultados):
+    """Mediana do tempo (em segundos) de cada etapa, com as escalas nas colunas."""
+    return resultados.pivot_table(index='etapa', columns='escala', values='duracao_s', aggfunc='median', sort=False)
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark do ETL sobre dados sintéticos da POF.')
+    parser.add_argument('--escalas', type=float, nargs='+', default=[1, 10, 100],
+                        help='Fatores de escala (1 = tamanho da POF real; ex: 0.02 para um teste rápido).')
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--agregacao', choices=['pandas', 'sql', 'streaming'], default='pandas')
+    parser.add_argument('--backend', choices=['fetchall', 'copy'], default='fetchall')
+    parser.add_argument('--conexoes', type=int, default=4)
+    parser.add_argument('--diretorio', default=settings.BENCHMARK_PATH, help='Diretório dos bancos sintéticos.')
+    parser.add_argument('--memoria', action='store_true',
+                        help='Também imprime a memória do domicílio antes e depois dos tipos compactos.')
+    parser.add_argument('--saida', default=None, help='CSV com todas as medições.')
+    args = parser.parse_args()
+
+    resultados = benchmark(args.escalas, args.repeticoes, args.seed, args.diretorio, agregacao=args.agregacao,
+                           backend=args.backend, max_conexoes=args.conexoes)
+    if args.saida is not None:
+        resultados.to_csv(args.saida, index=False)
+
+    print(resumirBenchmark(resultados).to_string())
+
+    if args.memoria:
+        for escala in args.escalas:
+            relatorio = relatorioMemoriaDomicilio({'sqlite': prepararBanco(escala, args.diretorio, args.seed)})
+            print(f"\nMemória do domicílio na escala {escala:g}x:")
+            print(relatorio.to_string())
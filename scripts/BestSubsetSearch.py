@@ -0,0 +1,203 @@
+import heapq
+import numpy as np
+import pandas as pd
+from typing import List, Optional, Sequence
+from scipy.linalg import solve_triangular
+from scripts.LinearGramEngine import LinearGramEngine, independent_basis
+
+class BestSubsetSearch:
+    """
+    Busca dos melhores subconjuntos de features de uma regressão linear (mínimos
+    quadrados) por branch-and-bound, no estilo do leaps-and-bounds de Furnival e Wilson.
+
+    As estatísticas suficientes (XᵀX, Xᵀy e yᵀy, centrados quando há intercepto) saem
+    de uma única decomposição QR de [X y]; a soma dos quadrados dos resíduos (RSS) de
+    qualquer subconjunto é calculada a partir delas, sem reajustar modelos.
+
+    Cada nó da árvore fixa um conjunto F de features obrigatórias e uma lista R de
+    features livres, e representa todos os subconjuntos entre F e F ∪ R. Como o RSS
+    não aumenta quando se incluem features, RSS(F ∪ R) é um limite inferior para todo
+    o nó: se ele não supera o m-ésimo melhor RSS já encontrado em nenhum dos tamanhos
+    do nó, o nó é descartado. Para cada tamanho k, os m subconjuntos de menor RSS são
+    também os melhores por Cp de Mallows, R² ajustado, AIC e BIC.
+
+    Atributos:
+        k_max (int): Maior tamanho de subconjunto procurado.
+        top_m (int): Quantos subconjuntos guardar para cada tamanho.
+        max_nodes (int): Limite de nós visitados (None = sem limite).
+        fit_intercept (bool): Se o modelo tem intercepto.
+        nodes_ (int): Nós visitados na última busca.
+        optimal_ (bool): Se a busca terminou sem atingir max_nodes (resultado garantidamente ótimo).
+    """
+    # Mesma tolerância de dependência do LinearGramEngine (ver independent_basis)
+    TOL = LinearGramEngine.TOL
+
+    def __init__(self, k_max: Optional[int] = None, top_m: int = 1, max_nodes: Optional[int] = None,
+                 fit_intercept: bool = True):
+        if top_m < 1:
+            raise ValueError("top_m deve ser pelo menos 1.")
+
+        self.k_max = k_max
+        self.top_m = top_m
+        self.max_nodes = max_nodes
+        self.fit_intercept = fit_intercept
+        self.nodes_ = 0
+        self.optimal_ = True
+
+    def fit(self, X: np.ndarray, y: np.ndarray, feature_names: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Executa a busca.
+
+        Args:
+            X (np.ndarray): Matriz de features (n x p).
+            y (np.ndarray): Variável alvo (n).
+            feature_names (Sequence[str]): Nomes das colunas de X (padrão: índices).
+
+        Returns:
+            pd.DataFrame: Uma linha por subconjunto guardado, com k, rank (pelo RSS dentro do
+                mesmo k), features, rss, r2, adj_r2, cp, aic e bic.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64).ravel()
+        n, p = X.shape
+        names = list(feature_names) if feature_names is not None else list(range(p))
+        k_max = p if self.k_max is None else min(self.k_max, p)
+
+        if self.fit_intercept:
+            X = X - X.mean(axis=0)
+            y = y - y.mean()
+
+        # Uma única QR de [X y]: RᵀR dá XᵀX, Xᵀy e yᵀy
+        R = np.linalg.qr(np.column_stack([X, y]), mode='r')
+        self._G = R[:, :p].T @ R[:, :p]
+        self._r = R[:, :p].T @ R[:, p]
+        self._yy = float(R[:, p] @ R[:, p])
+
+        # Melhores por tamanho: heaps de máximo (-rss) com os top_m menores RSS
+        self._best = {k: [] for k in range(1, k_max + 1)}
+        self._seen = set()
+        self._k_max = k_max
+        self.nodes_ = 0
+        self.optimal_ = True
+
+        stack = [((), tuple(range(p)))]
+        while stack:
+            if self.max_nodes is not None and self.nodes_ >= self.max_nodes:
+                self.optimal_ = False
+                break
+            forced, free = stack.pop()
+            self.nodes_ += 1
+            stack.extend(reversed(self._expand(forced, free)))
+
+        # Estatísticas do modelo completo para o Cp (mesma fórmula de calcular_cp_mallows)
+        rank = len(self._active(list(range(p))))
+        rss_full = self._prefix_rss(list(range(p)))[-1]
+        intercept = int(self.fit_intercept)
+        s2 = rss_full / (n - rank - intercept) if n - rank - intercept > 0 else np.nan
+        tss = self._yy
+
+        rows = []
+        for k, heap in self._best.items():
+            for rank_k, (rss, subset) in enumerate(sorted((-neg, subset) for neg, subset in heap), start=1):
+                params = k + intercept
+                rows.append({
+                    'k': k,
+                    'rank': rank_k,
+                    'features': [names[j] for j in subset],
+                    'rss': rss,
+                    'r2': 1 - rss / tss,
+                    'adj_r2': 1 - (rss / (n - params)) / (tss / (n - intercept)),
+                    'cp': rss / s2 + 2 * params - n,
+                    'aic': n * np.log(rss / n) + 2 * params,
+                    'bic': n * np.log(rss / n) + np.log(n) * params
+                })
+
+        return pd.DataFrame(rows)
+
+    def _expand(self, forced: tuple, free: tuple) -> List[tuple]:
+        # Registra o subconjunto do nó e devolve os filhos que não podem ser descartados
+        members = list(forced) + list(free)
+        if not free:
+            self._record(forced, self._prefix_rss(list(forced))[-1] if forced else self._yy)
+            return []
+
+        # Livres em ordem decrescente de importância no modelo com F ∪ R: os últimos filhos
+        # perdem as features mais importantes e têm limites mais altos, mais fáceis de descartar
+        costs = self._drop_costs(members)
+        free = tuple(sorted(free, key=lambda j: -costs[j]))
+
+        # Uma fatoração na ordem F, R[-1], ..., R[0] dá o RSS de F e de todo F ∪ R[i:]
+        order = list(forced) + list(reversed(free))
+        rss = self._prefix_rss(order)
+        if forced:
+            self._record(forced, rss[len(forced) - 1])
+
+        size = len(forced) + 1
+        if size > self._k_max:
+            return []
+
+        children = []
+        for i, j in enumerate(free):
+            largest = min(len(forced) + len(free) - i, self._k_max)
+            bound = rss[len(order) - i - 1]
+            # F ∪ R[i:] é ele mesmo um subconjunto candidato
+            if len(forced) + len(free) - i <= self._k_max:
+                self._record(tuple(forced) + free[i:], bound)
+            if all(bound >= self._threshold(k) for k in range(size, largest + 1)):
+                continue
+            children.append((tuple(forced) + (j,), free[i + 1:]))
+
+        return children
+
+    def _threshold(self, k: int) -> float:
+        heap = self._best[k]
+        return -heap[0][0] if len(heap) >= self.top_m else np.inf
+
+    def _record(self, subset: tuple, rss: float) -> None:
+        k = len(subset)
+        if not 1 <= k <= self._k_max:
+            return
+        key = tuple(sorted(subset))
+        if key in self._seen:
+            return
+        heap = self._best[k]
+        if len(heap) < self.top_m:
+            heapq.heappush(heap, (-rss, key))
+            self._seen.add(key)
+        elif rss < -heap[0][0]:
+            _, removed = heapq.heappushpop(heap, (-rss, key))
+            self._seen.discard(removed)
+            self._seen.add(key)
+
+    def _active(self, order: List[int]) -> List[int]:
+        # Colunas linearmente independentes das anteriores, na ordem dada
+        return independent_basis(self._G, order, self.TOL)[0]
+
+    def _prefix_rss(self, order: List[int]) -> np.ndarray:
+        # RSS de cada prefixo da ordem: yᵀy - soma acumulada de z², com z = L⁻¹ Xᵀy
+        G, r = self._G[np.ix_(order, order)], self._r[order]
+        try:
+            L = np.linalg.cholesky(G)
+            if np.min(np.diag(L) ** 2 / np.maximum(np.diag(G), np.finfo(float).tiny)) <= self.TOL:
+                raise np.linalg.LinAlgError
+            z = solve_triangular(L, r, lower=True)
+        except np.linalg.LinAlgError:
+            # Colunas dependentes não reduzem o RSS: z = 0 nas posições correspondentes
+            active = set(self._active(order))
+            positions = [i for i, j in enumerate(order) if j in active]
+            L = np.linalg.cholesky(G[np.ix_(positions, positions)])
+            z = np.zeros(len(order))
+            z[positions] = solve_triangular(L, r[positions], lower=True)
+
+        return np.maximum(self._yy - np.cumsum(z ** 2), 0.0)
+
+    def _drop_costs(self, members: List[int]) -> dict:
+        # Aumento do RSS ao retirar cada feature do modelo com todas as demais: β_j² / (A⁻¹)_jj
+        active = self._active(members)
+        costs = dict.fromkeys(members, 0.0)
+        if active:
+            inverse = np.linalg.inv(self._G[np.ix_(active, active)])
+            beta = inverse @ self._r[active]
+            costs.update(zip(active, beta ** 2 / np.diag(inverse)))
+
+        return costs
@@ -0,0 +1,74 @@
+import numpy as np
+from sklearn.metrics import pairwise_distances, silhouette_score
+from sklearn.neighbors import NearestNeighbors
+
+class ClusterDistanceCache:
+    """
+    Estruturas de vizinhança calculadas uma única vez sobre os dados padronizados e
+    compartilhadas por todas as tentativas do AutoClusterHPO.
+
+    - distances: matriz de distâncias euclidianas n x n, usada pela silhueta de cada
+      tentativa. Só é guardada até MAX_DENSE_SAMPLES linhas (n² floats); acima disso a
+      silhueta volta ao silhouette_score do Scikit-learn, que calcula as distâncias em
+      blocos a cada chamada.
+    - radius_graph: grafo esparso de vizinhos até max_eps, o maior eps do espaço de
+      busca do DBSCAN. Como o grafo contém todos os vizinhos de qualquer eps menor, cada
+      tentativa roda DBSCAN(metric='precomputed') sobre ele, sem refazer a busca de vizinhos.
+      É construído na primeira tentativa do DBSCAN.
+
+    Atributos:
+        X (np.ndarray): Dados padronizados (n x p).
+        max_eps (float): Raio do grafo de vizinhos.
+    """
+    # 8000² distâncias em float64 ocupam 512 MB
+    MAX_DENSE_SAMPLES = 8000
+
+    def __init__(self, X: np.ndarray, max_eps: float):
+        self.X = np.asarray(X, dtype=np.float64)
+        self.max_eps = max_eps
+        self.distances = pairwise_distances(self.X) if len(self.X) <= self.MAX_DENSE_SAMPLES else None
+        self._radius_graph = None
+
+    @property
+    def radius_graph(self):
+        if self._radius_graph is None:
+            neighbors = NearestNeighbors(radius=self.max_eps).fit(self.X)
+            self._radius_graph = neighbors.radius_neighbors_graph(self.X, mode='distance', sort_results=True)
+
+        return self._radius_graph
+
+    def silhouette(self, labels: np.ndarray) -> float:
+        """
+        Silhueta média dos pontos com rótulo diferente de -1 (ruído do DBSCAN), igual à
+        do silhouette_score sobre esses pontos.
+
+        Com a matriz de distâncias guardada, as somas das distâncias de cada ponto a cada
+        cluster saem de um único produto matricial (distâncias @ indicadoras dos clusters).
+        """
+        labels = np.asarray(labels)
+        mask = labels != -1
+        clusters, codes, counts = np.unique(labels[mask], return_inverse=True, return_counts=True)
+        n_points = int(mask.sum())
+        if not 2 <= len(clusters) <= n_points - 1:
+            raise ValueError(f"A silhueta exige entre 2 e {n_points - 1} clusters; há {len(clusters)}.")
+        if self.distances is None:
+            return float(silhouette_score(self.X[mask], labels[mask]))
+
+        # Linhas de ruído ficam zeradas: não entram nas somas de nenhum cluster
+        indicators = np.zeros((len(labels), len(clusters)))
+        indicators[np.flatnonzero(mask), codes] = 1.0
+        sums = (self.distances @ indicators)[mask]
+
+        rows = np.arange(n_points)
+        own_size = counts[codes]
+        a = sums[rows, codes] / np.maximum(own_size - 1, 1)
+        means = sums / counts
+        means[rows, codes] = np.inf
+        b = means.min(axis=1)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            samples = np.nan_to_num((b - a) / np.maximum(a, b))
+        # Pontos sozinhos no cluster têm silhueta 0
+        samples[own_size == 1] = 0.0
+
+        return float(samples.mean())
@@ -1,10 +1,21 @@
+import os
+import json
+import numpy as np
 import pandas as pd
 import time
-from typing import List, Union, Dict, Any
+from functools import partial
+from contextlib import nullcontext
+from typing import List, Union, Dict, Any, Optional, Tuple
 
 # Importações do Scikit-learn
-from sklearn.base import BaseEstimator
+from sklearn.base import BaseEstimator, clone, is_classifier
 from sklearn.feature_selection import SequentialFeatureSelector
+from sklearn.linear_model import LinearRegression
+from sklearn.model_selection import check_cv, cross_val_score
+from scripts.BestSubsetSearch import BestSubsetSearch
+from scripts.FoldScoreCache import FoldScoreCache
+from scripts.LinearGramEngine import LinearGramEngine
+from scripts.SelectionPool import SelectionPool
 
 class DataFrameFeatureSelector:
     """
@@ -14,6 +25,22 @@ class DataFrameFeatureSelector:
     Esta classe encapsula o SequentialFeatureSelector do scikit-learn,
     fornecendo uma interface conveniente para trabalhar com dataframes.
 
+    Com LinearRegression ou Ridge e as métricas r2, neg_mean_squared_error ou
+    neg_root_mean_squared_error, a busca usa o LinearGramEngine, que avalia todas as
+    candidatas de um passo em forma fechada a partir das matrizes de cada fold; os
+    scores são os mesmos da validação cruzada do scikit-learn, a menos de erro numérico.
+
+    Com o parâmetro groups, as dummies de uma mesma variável categórica entram ou
+    saem juntas, como uma única candidata, e o número de features passa a contar grupos.
+
+    Com n_workers, as candidatas de cada passo são avaliadas em paralelo por um
+    SelectionPool, que compartilha uma única cópia de X entre os processos; run_paths
+    avança os caminhos de vários modelos ao mesmo tempo sobre o mesmo pool.
+
+    Para execuções longas, cache_path guarda os scores de cada fold em um
+    FoldScoreCache, reaproveitados entre execuções, e checkpoint_path grava o estado
+    da busca após cada passo; uma execução interrompida continua do último passo.
+
     Atributos:
         model (BaseEstimator): O modelo do scikit-learn a ser usado para avaliar as features.
         dataframe (pd.DataFrame): O dataframe completo contendo features e a variável alvo.
@@ -22,7 +49,12 @@ class DataFrameFeatureSelector:
         y (pd.Series): A variável alvo (y) do dataframe.
         selected_features_ (List[str]): Lista com os nomes das colunas selecionadas após a execução.
         summary_ (Dict[str, Any]): Dicionário com um resumo da última execução.
+        path_ (pd.DataFrame): Caminho da última execução de run_path, com um passo por linha.
+        best_subsets_ (pd.DataFrame): Melhores subconjuntos por tamanho da última execução de run_best_subset.
     """
+    # Chave do modelo no SelectionPool quando o pool atende um único seletor
+    _POOL_KEY = 'model'
+
     def __init__(self, model: BaseEstimator, dataframe: pd.DataFrame, target_column: str):
         """
         Inicializa o seletor de features.
@@ -49,13 +81,20 @@ class DataFrameFeatureSelector:
         self.sfs_selector_ = None
         self.selected_features_: List[str] = []
         self.summary_: Dict[str, Any] = {}
+        self.path_: Optional[pd.DataFrame] = None
+        self.best_subsets_: Optional[pd.DataFrame] = None
 
     def run(self, 
             method: str = 'forward', 
             n_features_to_select: Union[int, str] = 'auto', 
             scoring: str = 'accuracy', 
             cv: int = 5, 
-            n_jobs: int = -1) -> 'DataFrameFeatureSelector':
+            n_jobs: int = -1,
+            fast_path: bool = True,
+            groups: Union[None, str, List[str], Dict[str, List[str]]] = None,
+            n_workers: Optional[int] = None,
+            cache_path: Optional[str] = None,
+            checkpoint_path: Optional[str] = None) -> 'DataFrameFeatureSelector':
         """
         Executa o processo de seleção de features.
 
@@ -66,6 +105,16 @@ class DataFrameFeatureSelector:
             scoring (str): A métrica de pontuação para avaliar as features (ex: 'accuracy', 'r2', 'f1').
             cv (int): O número de folds para a validação cruzada.
             n_jobs (int): O número de processadores a serem usados (-1 para usar todos).
+            fast_path (bool): Se False, usa sempre o SequentialFeatureSelector, mesmo com modelos lineares.
+            groups: Grupos de colunas tratados como uma única candidata (ver _feature_groups): None,
+                    'auto' (dummies agrupadas pelo prefixo), uma lista de prefixos ou um dicionário
+                    {nome do grupo: colunas}. Com grupos, n_features_to_select conta grupos.
+            n_workers (int): Se informado, as candidatas de cada passo são avaliadas em paralelo por um
+                             SelectionPool com esse número de processos (-1 = todos); cada validação
+                             cruzada roda então em um único processo.
+            cache_path (str): Se informado, arquivo SQLite do FoldScoreCache com os scores de cada fold.
+            checkpoint_path (str): Se informado, arquivo JSON com o estado da busca, gravado após cada
+                                   passo; se já existir (da mesma configuração), a busca continua dele.
 
         Returns:
             DataFrameFeatureSelector: Retorna a própria instância da classe para permitir encadeamento de métodos.
@@ -76,31 +125,51 @@ class DataFrameFeatureSelector:
         print(f"--- Iniciando Seleção de Features ({method.capitalize()}) ---")
         start_time = time.time()
 
-        self.sfs_selector_ = SequentialFeatureSelector(
-            self.model,
-            n_features_to_select=n_features_to_select,
-            direction=method,
-            scoring=scoring,
-            cv=cv,
-            n_jobs=n_jobs
-        )
+        units = self._feature_groups(groups)
+        grouped = len(units) < self.X.shape[1]
+        splits = list(check_cv(cv, self.y, classifier=is_classifier(self.model)).split(self.X, self.y))
+        engine = self._linear_engine(scoring, splits, fast_path)
+        greedy = grouped or n_workers is not None or cache_path is not None or checkpoint_path is not None
+        if engine is None and not greedy:
+            self.sfs_selector_ = SequentialFeatureSelector(
+                self.model,
+                n_features_to_select=n_features_to_select,
+                direction=method,
+                scoring=scoring,
+                cv=cv,
+                n_jobs=n_jobs
+            )
 
-        self.sfs_selector_.fit(self.X, self.y)
+            self.sfs_selector_.fit(self.X, self.y)
+            selected = list(self.X.columns[self.sfs_selector_.get_support()])
+        else:
+            # A mesma busca gulosa do SequentialFeatureSelector, sobre grupos de colunas, com as
+            # candidatas avaliadas em forma fechada ou em paralelo, com cache e checkpoints
+            n_select = self._n_features_to_select(n_features_to_select, len(units))
+            n_steps = n_select if method == 'forward' else len(units) - n_select
+            self.sfs_selector_ = None
+            with self._selection_pool(splits, engine, n_workers) as pool, self._open_cache(cache_path) as cache:
+                path, selected = self._greedy_path(method, n_steps, scoring, splits, n_jobs, engine, units, pool,
+                                                   cache, checkpoint_path)
         
         duration = time.time() - start_time
         print(f"--- Concluído em {duration:.2f} segundos ---")
 
         # Armazena os resultados
-        self.selected_features_ = list(self.X.columns[self.sfs_selector_.get_support()])
+        self.selected_features_ = selected
         
         self.summary_ = {
             'method': method,
             'scoring_metric': scoring,
+            'engine': 'generic' if engine is None else 'closed_form',
             'initial_features_count': self.X.shape[1],
             'features_selected_count': len(self.selected_features_),
             'selected_features_list': self.selected_features_,
             'duration_seconds': round(duration, 2)
         }
+        if grouped:
+            self.summary_['initial_groups_count'] = len(units)
+            self.summary_['selected_groups_list'] = path[-1]['selected_groups_list'] if path else []
         
         print(f"\nResumo da Execução:")
         print(f"  - Features iniciais: {self.summary_['initial_features_count']}")
@@ -109,6 +178,540 @@ class DataFrameFeatureSelector:
         
         return self
 
+    def run_path(self,
+                 method: str = 'forward',
+                 k_max: Optional[int] = None,
+                 k_min: int = 1,
+                 scoring: str = 'r2',
+                 cv: int = 5,
+                 n_jobs: int = -1,
+                 fast_path: bool = True,
+                 groups: Union[None, str, List[str], Dict[str, List[str]]] = None,
+                 n_workers: Optional[int] = None,
+                 cache_path: Optional[str] = None,
+                 checkpoint_path: Optional[str] = None) -> 'DataFrameFeatureSelector':
+        """
+        Executa a busca sequencial uma única vez, registrando o caminho completo.
+
+        A cada passo são guardados o conjunto selecionado, o score médio da validação
+        cruzada e o ganho em relação ao passo anterior. O conjunto de k features da
+        busca forward (ou backward) é o mesmo que run(n_features_to_select=k) selecionaria,
+        e pode ser lido com features_for_k(k) sem repetir a busca.
+
+        Args:
+            method (str): O método a ser usado. 'forward' ou 'backward'.
+            k_max (int): No forward, o tamanho do último conjunto do caminho (None = todas as features).
+            k_min (int): No backward, o tamanho do último conjunto do caminho.
+            scoring (str): A métrica de pontuação (ex: 'r2', 'neg_mean_squared_error', 'accuracy').
+            cv (int): O número de folds (ou um objeto de validação cruzada do scikit-learn).
+            n_jobs (int): O número de processadores usados em cada validação cruzada.
+            fast_path (bool): Se False, avalia as candidatas sempre com cross_val_score, mesmo com modelos lineares.
+            groups: Grupos de colunas tratados como uma única candidata (ver run). Com grupos, k,
+                    k_max e k_min contam grupos.
+            n_workers (int): Se informado, avalia as candidatas de cada passo em paralelo (ver run).
+            cache_path (str): Se informado, arquivo do FoldScoreCache (ver run).
+            checkpoint_path (str): Se informado, arquivo do checkpoint da busca (ver run).
+
+        Returns:
+            DataFrameFeatureSelector: Retorna a própria instância da classe para permitir encadeamento de métodos.
+        """
+        units = self._feature_groups(groups)
+        n_steps = self._n_steps(method, k_max, k_min, len(units))
+
+        print(f"--- Iniciando Caminho de Seleção de Features ({method.capitalize()}) ---")
+        start_time = time.time()
+
+        # As mesmas partições em todos os passos, como no SequentialFeatureSelector
+        splits = list(check_cv(cv, self.y, classifier=is_classifier(self.model)).split(self.X, self.y))
+        engine = self._linear_engine(scoring, splits, fast_path)
+        with self._selection_pool(splits, engine, n_workers) as pool, self._open_cache(cache_path) as cache:
+            path, selected = self._greedy_path(method, n_steps, scoring, splits, n_jobs, engine, units, pool,
+                                               cache, checkpoint_path)
+
+        self._finish_path(method, scoring, engine, path, selected, time.time() - start_time)
+
+        return self
+
+    @classmethod
+    def run_paths(cls,
+                  models: Dict[str, BaseEstimator],
+                  dataframe: pd.DataFrame,
+                  target_column: str,
+                  method: str = 'forward',
+                  k_max: Optional[int] = None,
+                  k_min: int = 1,
+                  scoring: str = 'r2',
+                  cv: int = 5,
+                  n_workers: Optional[int] = -1,
+                  fast_path: bool = True,
+                  groups: Union[None, str, List[str], Dict[str, List[str]]] = None,
+                  cache_path: Optional[str] = None,
+                  checkpoint_dir: Optional[str] = None) -> Dict[str, 'DataFrameFeatureSelector']:
+        """
+        Executa run_path para vários modelos ao mesmo tempo, sobre um único SelectionPool.
+
+        Os caminhos avançam juntos: a cada passo, as candidatas de todos os modelos que
+        não têm forma fechada (ver LinearGramEngine) vão para o pool em um único lote,
+        de modo que os processos ficam ocupados durante toda a busca. Os caminhos são os
+        mesmos de run_path executado para cada modelo separadamente.
+
+        Args:
+            models (Dict[str, BaseEstimator]): Os modelos, por nome (ex: modelos_para_testar).
+            dataframe, target_column: Como no construtor.
+            method, k_max, k_min, scoring, cv, fast_path, groups: Como em run_path.
+            n_workers (int): Número de processos do pool (-1 = todos os núcleos).
+            cache_path (str): Se informado, arquivo do FoldScoreCache, compartilhado pelos modelos.
+            checkpoint_dir (str): Se informado, diretório com um checkpoint '<nome do modelo>.json' por modelo.
+
+        Returns:
+            Dict[str, DataFrameFeatureSelector]: Um seletor por modelo, com path_ e summary_ preenchidos.
+        """
+        selectors = {name: cls(model, dataframe, target_column) for name, model in models.items()}
+        first = next(iter(selectors.values()))
+        units = first._feature_groups(groups)
+        n_steps = first._n_steps(method, k_max, k_min, len(units))
+
+        print(f"--- Iniciando Caminhos de Seleção de Features ({method.capitalize()}, {len(models)} modelos) ---")
+        start_time = time.time()
+
+        splits = {name: list(check_cv(cv, selector.y, classifier=is_classifier(selector.model)).split(selector.X, selector.y))
+                  for name, selector in selectors.items()}
+        engines = {name: selector._linear_engine(scoring, splits[name], fast_path) for name, selector in selectors.items()}
+        generic = [name for name in selectors if engines[name] is None]
+
+        if checkpoint_dir is not None:
+            os.makedirs(checkpoint_dir, exist_ok=True)
+        searches = {name: selector._start_search(method, n_steps, scoring, splits[name], units,
+                                                 None if checkpoint_dir is None else
+                                                 os.path.join(checkpoint_dir, f'{name}.json'))
+                    for name, selector in selectors.items()}
+        requests, results = {}, {}
+        for name, search in searches.items():
+            requests[name], results[name] = cls._advance(search)
+
+        pool = SelectionPool(first.X, first.y, {name: models[name] for name in generic},
+                             {name: splits[name] for name in generic}, n_workers) if generic else nullcontext()
+        with pool, first._open_cache(cache_path) as cache:
+            cache_keys = {name: selectors[name]._cache_key(cache, scoring, splits[name]) for name in generic}
+            while any(request is not None for request in requests.values()):
+                # Um único lote com as candidatas ainda fora do cache de todos os modelos do caminho genérico
+                pending = [name for name in generic if requests[name] is not None]
+                cached = {name: selectors[name]._cached(requests[name][2], cache, cache_keys[name]) for name in pending}
+                missing = [(name, i) for name in pending for i, scores in enumerate(cached[name]) if scores is None]
+                computed = pool.fold_scores([(name, first._indices(requests[name][2][i])) for name, i in missing],
+                                            scoring) if missing else []
+                for (name, i), scores in zip(missing, computed):
+                    cached[name][i] = scores
+                    selectors[name]._store([requests[name][2][i]], [scores], cache, cache_keys[name])
+
+                for name, selector in selectors.items():
+                    request = requests[name]
+                    if request is None:
+                        continue
+                    if engines[name] is None:
+                        scores = [float(np.mean(fold_scores)) for fold_scores in cached[name]]
+                    else:
+                        scores = selector._score_request(method, request, scoring, splits[name], 1, engines[name])
+                    requests[name], results[name] = cls._advance(searches[name], scores)
+
+        duration = time.time() - start_time
+        for name, selector in selectors.items():
+            print(f"Modelo: {name}")
+            path, selected = results[name]
+            selector._finish_path(method, scoring, engines[name], path, selected, duration)
+
+        return selectors
+
+    def _n_steps(self, method: str, k_max: Optional[int], k_min: int, n_units: int) -> int:
+        # Número de passos do caminho, validando os limites (em colunas ou grupos)
+        if method not in ['forward', 'backward']:
+            raise ValueError("O método deve ser 'forward' ou 'backward'.")
+
+        k_max = n_units if k_max is None else k_max
+        if not 1 <= k_max <= n_units or not 1 <= k_min <= n_units:
+            raise ValueError(f"k_max e k_min devem estar entre 1 e {n_units}.")
+
+        return k_max if method == 'forward' else n_units - k_min
+
+    def _finish_path(self, method: str, scoring: str, engine: Optional[LinearGramEngine],
+                     path: List[Dict[str, Any]], selected: List[str], duration: float) -> None:
+        # Guarda o caminho e o resumo de run_path/run_paths
+        print(f"--- Concluído em {duration:.2f} segundos ---")
+
+        self.path_ = pd.DataFrame(path)
+        self.selected_features_ = list(selected)
+        self.summary_ = {
+            'method': method,
+            'scoring_metric': scoring,
+            'initial_features_count': self.X.shape[1],
+            'features_selected_count': len(self.selected_features_),
+            'selected_features_list': self.selected_features_,
+            'engine': 'generic' if engine is None else 'closed_form',
+            'path': path,
+            'duration_seconds': round(duration, 2)
+        }
+
+        print(f"\nResumo da Execução:")
+        print(f"  - Features iniciais: {self.summary_['initial_features_count']}")
+        print(f"  - Passos registrados: {len(path)}")
+        print(f"  - Melhor score no caminho: {self.path_['score'].max():.4f} "
+              f"(k={int(self.path_.loc[self.path_['score'].idxmax(), 'k'])})\n")
+
+    def run_best_subset(self,
+                        k_max: Optional[int] = None,
+                        top_m: int = 1,
+                        criterion: str = 'bic',
+                        max_nodes: Optional[int] = None) -> 'DataFrameFeatureSelector':
+        """
+        Procura os melhores subconjuntos de cada tamanho para a regressão linear por
+        branch-and-bound (ver BestSubsetSearch), em vez da busca gulosa.
+
+        Os subconjuntos são comparados pelo RSS calculado a partir de uma única QR dos
+        dados, sem reajustar modelos, e ranqueados pelo critério escolhido. Sem max_nodes
+        (ou se o limite não for atingido), os subconjuntos encontrados são ótimos.
+
+        Args:
+            k_max (int): O maior tamanho de subconjunto (None = todas as features).
+            top_m (int): Quantos subconjuntos guardar para cada tamanho.
+            criterion (str): O critério para escolher o subconjunto final: 'cp', 'adj_r2', 'aic' ou 'bic'.
+            max_nodes (int): Limite de nós da busca, para limitar o tempo (None = sem limite).
+
+        Returns:
+            DataFrameFeatureSelector: Retorna a própria instância da classe para permitir encadeamento de métodos.
+        """
+        criteria = {'cp': True, 'adj_r2': False, 'aic': True, 'bic': True}
+        if criterion not in criteria:
+            raise ValueError(f"O critério deve ser um de {list(criteria)}.")
+        if not isinstance(self.model, LinearRegression):
+            raise TypeError("run_best_subset só se aplica a modelos LinearRegression.")
+
+        print(f"--- Iniciando Busca dos Melhores Subconjuntos ({criterion}) ---")
+        start_time = time.time()
+
+        search = BestSubsetSearch(k_max, top_m, max_nodes, self.model.fit_intercept)
+        table = search.fit(self.X.to_numpy(dtype=np.float64), self.y.to_numpy(dtype=np.float64), self.X.columns)
+
+        # Dentro de cada k a ordem pelo RSS é a mesma de qualquer critério; entre tamanhos vale o critério
+        ascending = criteria[criterion]
+        self.best_subsets_ = table.sort_values([criterion, 'k'], ascending=[ascending, True], kind='stable') \
+                                  .reset_index(drop=True)
+        best = self.best_subsets_.iloc[0]
+
+        duration = time.time() - start_time
+        print(f"--- Concluído em {duration:.2f} segundos ---")
+
+        self.selected_features_ = list(best['features'])
+        self.summary_ = {
+            'method': 'best_subset',
+            'scoring_metric': criterion,
+            'initial_features_count': self.X.shape[1],
+            'features_selected_count': len(self.selected_features_),
+            'selected_features_list': self.selected_features_,
+            'nodes_visited': search.nodes_,
+            'optimal': search.optimal_,
+            'duration_seconds': round(duration, 2)
+        }
+
+        print(f"\nResumo da Execução:")
+        print(f"  - Features iniciais: {self.summary_['initial_features_count']}")
+        print(f"  - Nós visitados: {search.nodes_}" + ("" if search.optimal_ else " (limite atingido, resultado não garantido)"))
+        print(f"  - Melhor {criterion}: {best[criterion]:.4f} (k={int(best['k'])})")
+        print(f"  - Lista de features: {self.summary_['selected_features_list']}\n")
+
+        return self
+
+    def features_for_k(self, k: int) -> List[str]:
+        """
+        Retorna o conjunto de k features do caminho calculado por run_path, sem refazer a busca.
+
+        Args:
+            k (int): O número de features.
+
+        Returns:
+            List[str]: As features selecionadas no passo em que o conjunto tinha k features.
+        """
+        if self.path_ is None:
+            raise RuntimeError("Você deve executar o método .run_path() antes de consultar o caminho.")
+
+        step = self.path_.loc[self.path_['k'] == k]
+        if step.empty:
+            raise ValueError(f"O caminho calculado não passa por k={k} (k disponíveis: {self.path_['k'].tolist()}).")
+
+        return list(step['selected_features_list'].iloc[0])
+
+    def _greedy_path(self, method: str, n_steps: int, scoring: str, splits: list, n_jobs: int,
+                     engine: Optional[LinearGramEngine], units: Dict[str, List[str]],
+                     pool: Optional[SelectionPool] = None, cache: Optional[FoldScoreCache] = None,
+                     checkpoint_path: Optional[str] = None) -> Tuple[List[Dict[str, Any]], List[str]]:
+        # Conduz a busca gulosa avaliando cada lote de candidatas neste seletor
+        search = self._start_search(method, n_steps, scoring, splits, units, checkpoint_path)
+        cache_key = self._cache_key(cache, scoring, splits) if engine is None else None
+        request, result = self._advance(search)
+        while request is not None:
+            if engine is None:
+                scores = self._generic_scores(request[2], scoring, splits, n_jobs, pool, cache, cache_key)
+            else:
+                scores = self._score_request(method, request, scoring, splits, n_jobs, engine)
+            request, result = self._advance(search, scores)
+
+        return result
+
+    def _start_search(self, method: str, n_steps: int, scoring: str, splits: list, units: Dict[str, List[str]],
+                      checkpoint_path: Optional[str]):
+        # Gerador da busca; com checkpoint, retoma os passos já gravados e grava cada passo novo
+        if checkpoint_path is None:
+            return self._greedy_search(method, n_steps, units)
+
+        signature = self._signature(method, scoring, splits, units)
+        start = None
+        if os.path.exists(checkpoint_path):
+            with open(checkpoint_path, encoding='utf-8') as file:
+                checkpoint = json.load(file)
+            if checkpoint['signature'] != signature:
+                print(f"O checkpoint '{checkpoint_path}' é de outra configuração (modelo, método, métrica, dados, "
+                      f"partições ou grupos) e será substituído.")
+            else:
+                start = [step for step in checkpoint['path'] if step['step'] <= n_steps]
+                print(f"Retomando do checkpoint '{checkpoint_path}': {len(start)} passos já calculados.")
+
+        return self._greedy_search(method, n_steps, units, start or None,
+                                   partial(self._save_checkpoint, checkpoint_path, signature))
+
+    def _signature(self, method: str, scoring: str, splits: list, units: Dict[str, List[str]]) -> str:
+        # Identifica a configuração de uma busca, para só retomar checkpoints compatíveis
+        return FoldScoreCache.subset_key([FoldScoreCache.estimator_key(self.model), method, scoring,
+                                          FoldScoreCache.data_key(self.X, self.y),
+                                          *FoldScoreCache.fold_keys(splits), json.dumps(units, default=str)])
+
+    @staticmethod
+    def _save_checkpoint(checkpoint_path: str, signature: str, path: List[Dict[str, Any]]) -> None:
+        # Gravação atômica: uma interrupção durante a escrita não corrompe o checkpoint anterior
+        temporary = checkpoint_path + '.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump({'signature': signature, 'path': path}, file, ensure_ascii=False, default=str)
+        os.replace(temporary, checkpoint_path)
+
+    def _greedy_search(self, method: str, n_steps: int, units: Dict[str, List[str]],
+                       start: Optional[List[Dict[str, Any]]] = None, on_step=None):
+        # Busca gulosa: a cada passo entra (ou sai) a candidata (coluna ou grupo) de maior score médio.
+        # É um gerador: cada lote de candidatas é entregue como (selecionadas, candidatas, subconjuntos)
+        # e recebe de volta os scores, para que vários modelos possam compartilhar o mesmo pool
+        columns = list(self.X.columns)
+        names = list(units)
+
+        def columns_of(selected_units):
+            chosen = {column for name in selected_units for column in units[name]}
+            return [column for column in columns if column in chosen]
+
+        path, first_step = [], 1
+        if start:
+            # Retomada: o estado é o do último passo gravado
+            path = list(start)
+            selected, previous_score = list(path[-1]['selected_groups_list']), path[-1]['score']
+            first_step = path[-1]['step'] + 1
+        elif method == 'forward':
+            selected, previous_score = [], np.nan
+        else:
+            selected = list(names)
+            previous_score = float((yield None, None, [columns])[0])
+            path.append(self._path_step(0, None, selected, columns, previous_score, np.nan))
+            if on_step is not None:
+                on_step(path)
+
+        for step in range(first_step, n_steps + 1):
+            if method == 'forward':
+                candidates = [name for name in names if name not in selected]
+                # Os subconjuntos mantêm a ordem original das colunas, como a máscara do scikit-learn
+                subsets = [[n for n in names if n in selected or n == name] for name in candidates]
+            else:
+                candidates = list(selected)
+                subsets = [[name for name in selected if name != candidate] for candidate in candidates]
+
+            scores = yield (columns_of(selected), [units[name] for name in candidates],
+                            [columns_of(subset) for subset in subsets])
+
+            # Em caso de empate, vale a primeira candidata na ordem das colunas, como no scikit-learn
+            best = int(np.argmax(scores))
+            score = float(scores[best])
+            selected = subsets[best]
+            path.append(self._path_step(step, candidates[best], selected, columns_of(selected), score,
+                                        score - previous_score))
+            previous_score = score
+            if on_step is not None:
+                on_step(path)
+
+        return path, columns_of(selected)
+
+    @staticmethod
+    def _advance(search, scores=None):
+        # Próximo lote de candidatas da busca, ou (None, resultado) quando ela termina
+        try:
+            return (next(search) if scores is None else search.send(scores)), None
+        except StopIteration as stop:
+            return None, stop.value
+
+    def _score_request(self, method: str, request: tuple, scoring: str, splits: list, n_jobs: int,
+                       engine: Optional[LinearGramEngine]) -> List[float]:
+        # Scores de um lote de candidatas no próprio processo: em forma fechada ou com cross_val_score
+        selected, candidates, subsets = request
+        if engine is None:
+            return self._generic_scores(subsets, scoring, splits, n_jobs)
+        if candidates is None:
+            return [engine.score_subset(self._indices(subset)) for subset in subsets]
+        if method == 'forward':
+            return engine.score_additions(self._indices(selected), [self._indices(c) for c in candidates])
+
+        return engine.score_removals(self._indices(selected), [self._indices(c) for c in candidates])
+
+    def _generic_scores(self, subsets: List[List[str]], scoring: str, splits: list, n_jobs: int,
+                        pool: Optional[SelectionPool] = None, cache: Optional[FoldScoreCache] = None,
+                        cache_key: Optional[tuple] = None) -> List[float]:
+        # Scores médios com cross_val_score (no pool, se houver), só para os subconjuntos fora do cache
+        fold_scores = self._cached(subsets, cache, cache_key)
+        missing = [i for i, scores in enumerate(fold_scores) if scores is None]
+        if pool is not None:
+            computed = pool.fold_scores([(self._POOL_KEY, self._indices(subsets[i])) for i in missing], scoring)
+        else:
+            computed = [self._fold_scores(subsets[i], scoring, splits, n_jobs) for i in missing]
+
+        for i, scores in zip(missing, computed):
+            fold_scores[i] = scores
+        self._store([subsets[i] for i in missing], computed, cache, cache_key)
+
+        return [float(np.mean(scores)) for scores in fold_scores]
+
+    def _cache_key(self, cache: Optional[FoldScoreCache], scoring: str, splits: list) -> Optional[tuple]:
+        # (estimador, métrica, dados, folds): a parte da chave do cache comum a todos os subconjuntos
+        if cache is None:
+            return None
+
+        return (FoldScoreCache.estimator_key(self.model), scoring, FoldScoreCache.data_key(self.X, self.y),
+                FoldScoreCache.fold_keys(splits))
+
+    @staticmethod
+    def _cached(subsets: List[List[str]], cache: Optional[FoldScoreCache], cache_key: Optional[tuple]) -> list:
+        if cache is None:
+            return [None] * len(subsets)
+
+        return [cache.get(*cache_key, FoldScoreCache.subset_key(subset)) for subset in subsets]
+
+    @staticmethod
+    def _store(subsets: List[List[str]], fold_scores: List[np.ndarray], cache: Optional[FoldScoreCache],
+               cache_key: Optional[tuple]) -> None:
+        if cache is None:
+            return
+        for subset, scores in zip(subsets, fold_scores):
+            cache.put(*cache_key, FoldScoreCache.subset_key(subset), scores)
+
+    @staticmethod
+    def _open_cache(cache_path: Optional[str]):
+        return FoldScoreCache(cache_path) if cache_path is not None else nullcontext()
+
+    def _indices(self, columns: List[str]) -> List[int]:
+        return [self.X.columns.get_loc(column) for column in columns]
+
+    def _selection_pool(self, splits: list, engine: Optional[LinearGramEngine], n_workers: Optional[int]):
+        # O pool só é criado para o caminho genérico com n_workers informado
+        if engine is not None or n_workers is None:
+            return nullcontext()
+
+        return SelectionPool(self.X, self.y, {self._POOL_KEY: self.model}, {self._POOL_KEY: splits}, n_workers)
+
+    def _feature_groups(self, groups: Union[None, str, List[str], Dict[str, List[str]]]) -> Dict[str, List[str]]:
+        """
+        Monta as candidatas da busca: {nome: colunas}, na ordem da primeira coluna de cada grupo.
+
+        groups pode ser:
+            None: cada coluna é uma candidata.
+            'auto': colunas binárias (0/1 ou bool) com nome '<prefixo>_<categoria>', como as do
+                    pd.get_dummies, são agrupadas pelo prefixo.
+            Uma lista de prefixos: as colunas '<prefixo>_*' de cada prefixo formam um grupo
+                    (ex: a lista de colunas categóricas passada ao pd.get_dummies).
+            Um dicionário {nome do grupo: colunas}.
+        As colunas fora de qualquer grupo continuam sendo candidatas individuais.
+        """
+        columns = list(self.X.columns)
+        if groups is None:
+            mapping = {}
+        elif isinstance(groups, str):
+            if groups != 'auto':
+                raise ValueError("groups deve ser None, 'auto', uma lista de prefixos ou um dicionário.")
+            mapping = {column: column.rsplit('_', 1)[0] for column in columns
+                       if isinstance(column, str) and '_' in column and self._is_dummy(self.X[column])}
+        elif isinstance(groups, dict):
+            mapping = {}
+            for name, group_columns in groups.items():
+                missing = [column for column in group_columns if column not in columns]
+                if missing:
+                    raise ValueError(f"As colunas {missing} do grupo '{name}' não foram encontradas.")
+                repeated = [column for column in group_columns if column in mapping]
+                if repeated:
+                    raise ValueError(f"As colunas {repeated} aparecem em mais de um grupo.")
+                mapping.update(dict.fromkeys(group_columns, name))
+        else:
+            # O prefixo mais longo vence, para prefixos contidos em outros (ex: 'v02' e 'v02_1')
+            mapping = {}
+            for prefix in sorted(groups, key=len):
+                mapping.update({column: prefix for column in columns
+                                if isinstance(column, str) and column.startswith(f'{prefix}_')})
+
+        units = {}
+        for column in columns:
+            units.setdefault(mapping.get(column, column), []).append(column)
+
+        return units
+
+    @staticmethod
+    def _is_dummy(series: pd.Series) -> bool:
+        if pd.api.types.is_bool_dtype(series):
+            return True
+        return pd.api.types.is_numeric_dtype(series) and series.dropna().isin([0, 1]).all()
+
+    def _linear_engine(self, scoring: str, splits: list, fast_path: bool) -> Optional[LinearGramEngine]:
+        # O LinearGramEngine só é usado com LinearRegression/Ridge, métricas de regressão e X numérico
+        if not fast_path or not LinearGramEngine.supports(self.model, scoring):
+            return None
+        try:
+            X = self.X.to_numpy(dtype=np.float64)
+            y = self.y.to_numpy(dtype=np.float64)
+        except (TypeError, ValueError):
+            return None
+        if not (np.isfinite(X).all() and np.isfinite(y).all()):
+            return None
+
+        return LinearGramEngine(self.model, X, y, splits, scoring)
+
+    def _n_features_to_select(self, n_features_to_select: Union[int, float, str], n_features: int) -> int:
+        # Mesma interpretação do SequentialFeatureSelector (com tol=None, 'auto' é metade das features)
+        if n_features_to_select == 'auto':
+            return n_features // 2
+        if isinstance(n_features_to_select, float):
+            return int(n_features * n_features_to_select)
+        if not 0 < n_features_to_select < n_features:
+            raise ValueError(f"n_features_to_select deve estar entre 1 e {n_features - 1}.")
+
+        return int(n_features_to_select)
+
+    def _fold_scores(self, columns: List[str], scoring: str, splits: list, n_jobs: int) -> np.ndarray:
+        # Scores de cada fold da validação cruzada do modelo treinado só com as colunas informadas
+        return cross_val_score(clone(self.model), self.X[columns], self.y,
+                               scoring=scoring, cv=splits, n_jobs=n_jobs)
+
+    @staticmethod
+    def _path_step(step: int, feature: Optional[str], groups: List[str], selected: List[str], score: float,
+                   gain: float) -> Dict[str, Any]:
+        # k conta candidatas (colunas ou grupos); n_columns, as colunas efetivamente selecionadas
+        return {
+            'step': step,
+            'k': len(groups),
+            'n_columns': len(selected),
+            'feature': feature,
+            'score': score,
+            'gain': gain,
+            'selected_groups_list': list(groups),
+            'selected_features_list': list(selected)
+        }
+
     def transform(self, dataframe: pd.DataFrame) -> pd.DataFrame:
         """
         Filtra o dataframe fornecido, mantendo apenas as features selecionadas.
@@ -1,4 +1,10 @@
 import psycopg2
+from psycopg2 import pool
+from concurrent.futures import ThreadPoolExecutor
+from collections import defaultdict
+from functools import partial
+import io
+import contextvars
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -11,343 +17,623 @@ from sklearn.metrics import mean_squared_error
 from sklearn.metrics import mean_absolute_error
 from sklearn.metrics import r2_score
 import math
+from scripts.ProcessedData import save_processed
+from scripts.HouseholdFeaturePipeline import HouseholdFeaturePipeline
+from scripts.ETLParticionado import ETLParticionado
+from scripts.MonitorETL import MonitorETL
+from scripts.PoolSQLite import PoolSQLite
 
 pd.options.display.float_format = '{:.2f}'.format
 
-def lerDados(db_params):
+# Views do schema POF_2018 lidas pelo ETL
+VIEWS_POF = {
+    'rendimento_trabalho': 'View_Rendimento_Trabalho',
+    'domicilio': 'View_Domicilio',
+    'aluguel_estimado': 'View_Aluguel_Estimado',
+    'caderneta_coletiva': 'View_Caderneta_Coletiva',
+    'caracteristica_dieta': 'View_Caracteristica_Dieta',
+    'condicoes_vida': 'View_Condições_Vida',
+    'despesa_individual': 'View_Despesa_Individual',
+    'despesa_coletiva': 'View_Despesa_Coletiva'
+}
+
+def criarPoolConexoes(db_params, max_conexoes):
+
+    # Um banco SQLite local (ver GeradorPOF) pode substituir o PostgreSQL
+    if 'sqlite' in db_params:
+        return PoolSQLite(db_params['sqlite'], max_conexoes)
+
+    try:
+        return pool.ThreadedConnectionPool(1, max_conexoes, **db_params)
+    except psycopg2.Error as e:
+        print(f"Erro ao se conectar ao banco de dados: {e}")
+        raise
+
+def lerConsulta(pool_conexoes, consulta, backend='fetchall', tipos=None):
+
+    # Cada leitura pega emprestada uma conexão do pool e a devolve ao final
+    conn = pool_conexoes.getconn()
+    try:
+        cursor = conn.cursor()
+        # O COPY é exclusivo do PostgreSQL; nos demais bancos a leitura usa o fetchall
+        if backend == 'copy' and hasattr(cursor, 'copy_expert'):
+            df = lerCopy(cursor, consulta, tipos or {})
+        else:
+            cursor.execute(consulta)
+            registros = cursor.fetchall()
+            df = pd.DataFrame(registros, columns=[desc[0] for desc in cursor.description])
+        cursor.close()
+    finally:
+        pool_conexoes.putconn(conn)
+
+    return df
+
+def lerCopy(cursor, consulta, tipos):
+
+    # O COPY devolve o resultado como CSV em um buffer, lido direto em colunas tipadas,
+    # sem criar uma tupla por linha nem um Decimal por célula.
+    # Colunas sem tipo declarado são lidas como category (códigos do questionário e
+    # identificadores não usados nas agregações): os mesmos textos do fetchall, guardados
+    # uma vez por valor distinto
+    buffer = io.BytesIO()
+    cursor.copy_expert(f'COPY ({consulta.rstrip(";")}) TO STDOUT WITH (FORMAT csv, HEADER true)', buffer)
+    buffer.seek(0)
+
+    return pd.read_csv(buffer, dtype=defaultdict(lambda: 'category', tipos), keep_default_na=False, na_values=[''])
+
+def lerAgregadoStreaming(pool_conexoes, nome, funcao, colunas, tamanho_lote=50000, upas=None, uf=None):
+
+    # Cursor nomeado (server-side): o banco entrega a view em lotes de tamanho_lote linhas.
+    # Cada lote é reduzido a somas e contagens por domicílio e descartado, então a memória
+    # cresce com o número de domicílios, e não com o número de itens da view.
+    conn = pool_conexoes.getconn()
+    try:
+        cursor = conn.cursor(name=f'pof_{nome}')
+        cursor.itersize = tamanho_lote
+        cursor.execute(consultaView(VIEWS_POF[nome], upas=upas, uf=uf))
+
+        parciais = []
+        nomes_colunas = None
+        while True:
+            registros = cursor.fetchmany(tamanho_lote)
+            if not registros:
+                break
+            if nomes_colunas is None:
+                nomes_colunas = [desc[0] for desc in cursor.description]
+
+            lote = pd.DataFrame(registros, columns=nomes_colunas)
+            if nome == 'rendimento_trabalho':
+                lote = tratarRendimentoTrabalho(lote)
+            parciais.append(agregarParciais(lote.rename(columns=colunas), funcao, list(colunas.values())))
+            del registros, lote
+
+            if len(parciais) >= LOTES_POR_COMPACTACAO:
+                parciais = [combinarParciais(parciais)]
+
+        cursor.close()
+    finally:
+        pool_conexoes.putconn(conn)
+
+    if not parciais:
+        return agregarParciais(pd.DataFrame(columns=CHAVES_DOMICILIO + list(colunas.values())), funcao, list(colunas.values()))
+
+    return combinarParciais(parciais)
+
+def tratarAluguelEstimado(df):
+
+    df['v8000'] = df['v8000'].replace(9999999.99, np.nan)
+    df['v8000'] = df['v8000'].replace(99999.00, np.nan)
+
+    return df
+
+# Tipos compactos do df_pof_domicilio, aplicados já na extração: chaves como inteiros,
+# contagens no menor inteiro anulável que as comporta, perguntas de sim/não como Int8
+# (1 = sim, 0 = não) e as demais respostas do questionário como category
+TIPOS_CHAVES_DOMICILIO = {'cod_upa': 'int32', 'num_dom': 'int16'}
+CODIGOS_SIM_NAO = {1: 1, 2: 0}
+
+def inteiroCompacto(serie):
+
+    valores = pd.to_numeric(serie, errors='coerce')
+    for tipo in ['Int8', 'Int16', 'Int32']:
+        limites = np.iinfo(tipo.lower())
+        if valores.dropna().between(limites.min, limites.max).all():
+            return valores.astype(tipo)
+
+    return valores.astype('Int64')
+
+def compactarDomicilio(pof_domicilio):
+
+    for coluna in pof_domicilio.columns:
+        if coluna in TIPOS_CHAVES_DOMICILIO:
+            pof_domicilio[coluna] = pd.to_numeric(pof_domicilio[coluna]).astype(TIPOS_CHAVES_DOMICILIO[coluna])
+        elif coluna in HouseholdFeaturePipeline.COLUNAS_INT:
+            pof_domicilio[coluna] = inteiroCompacto(pof_domicilio[coluna])
+        elif coluna in HouseholdFeaturePipeline.COLUNAS_SIM_NAO:
+            codigos = pd.to_numeric(pof_domicilio[coluna], errors='coerce')
+            pof_domicilio[coluna] = codigos.map(CODIGOS_SIM_NAO).astype('Int8')
+        else:
+            pof_domicilio[coluna] = pof_domicilio[coluna].astype('category')
+
+    return pof_domicilio
+
+def chavesInteiras(df):
+
+    # Converte o índice (cod_upa, num_dom) de uma fonte para os tipos das chaves do df_pof_domicilio
+    niveis = [pd.to_numeric(df.index.get_level_values(chave)).astype(tipo)
+              for chave, tipo in TIPOS_CHAVES_DOMICILIO.items()]
+
+    return df.set_axis(pd.MultiIndex.from_arrays(niveis), axis=0)
+
+def relatorioMemoria(df_antes, df_depois):
+    """
+    Compara, coluna a coluna, o tipo e a memória (contando o conteúdo das strings) de
+    duas versões do mesmo DataFrame, por exemplo tratarDomicilio(df, compactar=False)
+    e tratarDomicilio(df).
+
+    Returns:
+        pd.DataFrame: Tipos, bytes antes e depois e redução de cada coluna, com o total na última linha.
+    """
+
+    relatorio = pd.DataFrame({
+        'tipo_antes': df_antes.dtypes.astype(str),
+        'tipo_depois': df_depois.dtypes.astype(str),
+        'bytes_antes': df_antes.memory_usage(index=False, deep=True),
+        'bytes_depois': df_depois.memory_usage(index=False, deep=True)
+    })
+    relatorio.loc['Total'] = ['', '', relatorio['bytes_antes'].sum(), relatorio['bytes_depois'].sum()]
+    relatorio['reducao'] = 1 - relatorio['bytes_depois'] / relatorio['bytes_antes']
+
+    return relatorio
+
+def tratarDomicilio(pof_domicilio, compactar=True):
+
+    pof_domicilio.columns = ['cod_upa', 'num_dom', 'uf', 'Estratos do plano amostra', 'Situação do Domicílio',
+    'Tipo do domicílio', 'Material das paredes externas', 'Material do telhado',
+    'Material do piso', 'Qtd de cômodos', 'Qtd de cômodos dormitórios', 'Forma de abastecimento de água',
+    'Frequência da água proveniente de rede geral', 'Tipo de chegada da água', 'A água é aquecida por energia elétrica?',
+    'A água é aquecida por gás?', 'A água é aquecida por energia solar?', 'A água é aquecida por lenha ou carvão?', 
+    'A água é aquecida por outra forma?', 'Qtd de banheiros exclusivos', 'Qtd de banheiros de uso comum', 
+    'Utiliza sanitário ou buraco para dejeções?','Tipo de escoadouro sanitário', 'Destino dado ao lixo', 
+    'Energia elétrica é de rede geral?', 'Rede elétrica proveniente de outra origem?',
+    'Frequência da energia elétrica de rede geral', 'Utiliza-se gás butijão na preparação de alimentos?', 
+    'Utiliza-se lenha ou carvão na preparação de alimentos?', 'Utiliza-se energia elétrica na preparação de alimentos?', 
+    'Utiliza-se outro combustível na preparação de alimentos?', 'Este domicílio é:', 'Este contrato de aluguel é:', 
+    'A rua onde se localiza é pavimentada?', 'O serviço de correios é realizado:', 'Situação de segurança alimentar']
+    
+    situacao = pof_domicilio['Situação do Domicílio']
+    rotulos = {'1': 'Urbano', '2': 'Rural'}
+    if isinstance(situacao.dtype, pd.CategoricalDtype):
+        # Já lida como category (backend 'copy'): renomeia as categorias, sem percorrer as linhas
+        situacao = situacao.cat.rename_categories(lambda codigo: rotulos.get(codigo, codigo))
+        pof_domicilio['Situação do Domicílio'] = situacao.cat.reorder_categories(sorted(situacao.cat.categories))
+    else:
+        pof_domicilio['Situação do Domicílio'] = situacao.replace(rotulos)
+
+    if compactar:
+        pof_domicilio = compactarDomicilio(pof_domicilio)
+
+    return pof_domicilio
+
+def tratarRendimentoTrabalho(pof_rendimento):
+
+    pof_rendimento['v8500_defla'] = pof_rendimento['v8500_defla'].astype(float)
+    pof_rendimento['v531112_defla'] = pof_rendimento['v531112_defla'].astype(float)
+    pof_rendimento['v531122_defla'] = pof_rendimento['v531122_defla'].astype(float)
+    pof_rendimento['v531132_defla'] = pof_rendimento['v531132_defla'].astype(float)
+
+    pof_rendimento.columns = ['cod_upa', 'num_dom', 'cod_informante', 'quadro', 'sub_quadro', 'seq', 'produto',
+                'Nesse trabalho o informante era:',
+                'Tipo de trabalhador não remunerado em ajuda a membro do domicílio ou parente.',
+                'era servidor público estatutário (federal, estadual, municipal)?',
+                'tinha carteira de trabalho assinada?',
+                'era contribuinte de instituto de previdência?',
+                ' forma de pagamento do último rendimento bruto mensal recebido nesse trabalho',
+                'Valor em reais (R$) do rendimento bruto',
+                'Valor em reais (R$) da dedução com previdência pública',
+                'Valor em reais (R$) da dedução com imposto de renda',
+                'Valor em reais (R$) da dedução com iss e outros impostos',
+                'Último mês que o rendimento foi recebido',
+                'Número de meses que o rendimento foi recebido',
+                'Quantas horas trabalhava normalmente, por semana',
+                'Qual a duração habitual do deslocamento para esse trabalho?',
+                'deflator', 'Valor do rendimento deflacionado',
+                'Valor da dedução com previdência pública deflacionado',
+                'Valor da dedução com imposto de renda deflacionado',
+                'Valor da dedução com iss e outros impostos deflacionado',
+                'valor_imputado', 'fator_anualizacao',
+                'o cargo, a função, a profissão ou o ofício que a pessoa exercia habitualmente no trabalho', 'denominacao_atividade_cnae']
+
+    return pof_rendimento
+
+CHAVES_DOMICILIO = ['cod_upa', 'num_dom']
+
+# Agregações por domicílio, na ordem em que entram no df_pof_domicilio:
+# view -> (função, {coluna da view: nome da coluna agregada})
+# O rendimento soma as colunas não deflacionadas (posições 13 a 16 da view), as mesmas
+# que o tratarRendimentoTrabalho renomeia para os nomes abaixo.
+AGREGACOES_DOMICILIO = {
+    'caderneta_coletiva': ('sum', {'v8000_defla': 'Valor em reais (R$) de despesa realizada'}),
+    'condicoes_vida': ('mean', {'v6102': 'Rendimento mensal mínimo geral (R$)',
+                                'v6103': 'Rendimento mensal mínimo p\\ alimentação (R$)'}),
+    'despesa_individual': ('sum', {'v8000_defla': 'Valor em reais (R$) de despesa individual'}),
+    'despesa_coletiva': ('sum', {'v8000_defla': 'Valor em reais (R$) de despesa coletiva'}),
+    'rendimento_trabalho': ('sum', {'v8500': 'Valor em reais (R$) do rendimento bruto',
+                                    'v531112': 'Valor em reais (R$) da dedução com previdência pública',
+                                    'v531122': 'Valor em reais (R$) da dedução com imposto de renda',
+                                    'v531132': 'Valor em reais (R$) da dedução com iss e outros impostos'})
+}
+
+SUFIXO_CONTAGEM = '__n'
+
+# No modo 'streaming', quantos lotes parciais acumular antes de combiná-los
+LOTES_POR_COMPACTACAO = 8
+
+# Tipos declarados por view para o backend 'copy'; as demais colunas são lidas como category.
+# Na view de domicílios, as contagens (v0205, v0206, v0211, v0212) e as perguntas de sim/não
+# são lidas como inteiros anuláveis, que o compactarDomicilio reduz ao menor tipo
+TIPOS_CHAVES = {'cod_upa': 'int64', 'num_dom': 'int64'}
+COLUNAS_INT_DOMICILIO = ['v0205', 'v0206', 'v0211', 'v0212']
+COLUNAS_SIM_NAO_DOMICILIO = ['v02101', 'v02102', 'v02103', 'v02104', 'v02105', 'v0213', 'v02161', 'v02162',
+                             'v02171', 'v02172', 'v02173', 'v02174', 'v0220']
+TIPOS_VIEWS = {
+    'rendimento_trabalho': dict(TIPOS_CHAVES, **{coluna: 'float64' for coluna in [
+        'v8500', 'v531112', 'v531122', 'v531132', 'v8500_defla', 'v531112_defla', 'v531122_defla', 'v531132_defla']}),
+    'domicilio': dict(TIPOS_CHAVES, **{coluna: 'Int64' for coluna in COLUNAS_INT_DOMICILIO + COLUNAS_SIM_NAO_DOMICILIO}),
+    'aluguel_estimado': dict(TIPOS_CHAVES, v8000='float64'),
+    'caderneta_coletiva': dict(TIPOS_CHAVES, v8000_defla='float64'),
+    'caracteristica_dieta': dict(TIPOS_CHAVES),
+    'condicoes_vida': dict(TIPOS_CHAVES, v6102='float64', v6103='float64'),
+    'despesa_individual': dict(TIPOS_CHAVES, v8000_defla='float64'),
+    'despesa_coletiva': dict(TIPOS_CHAVES, v8000_defla='float64')
+}
+
+def filtroUpas(upas=None, uf=None):
+
+    # Restringe a consulta às UPAs informadas (usado pelo ETL incremental) ou às de uma UF
+    # (usado pelo ETL particionado): os dois primeiros dígitos do cod_upa são o código da UF
+    condicoes = []
+    if upas is not None:
+        valores = ', '.join("'" + str(upa).replace("'", "''") + "'" for upa in upas)
+        condicoes.append(f'cod_upa IN ({valores})')
+    if uf is not None:
+        condicoes.append("CAST(cod_upa AS TEXT) LIKE '" + str(uf).replace("'", "''") + "%'")
+
+    return ' WHERE ' + ' AND '.join(condicoes) if condicoes else ''
+
+def consultaView(view, colunas=None, upas=None, uf=None):
+
+    projecao = '*' if colunas is None else ', '.join(f'"{coluna}"' for coluna in colunas)
+
+    return f'SELECT {projecao} FROM "POF_2018"."{view}"{filtroUpas(upas, uf)};'
+
+def consultaAgregada(view, funcao, colunas, upas=None, uf=None):
+
+    # Soma (e contagem, para médias) por domicílio; o COALESCE reproduz a soma vazia = 0 do pandas
+    projecoes = []
+    for coluna in colunas:
+        projecoes.append(f'COALESCE(SUM("{coluna}"), 0) AS "{coluna}"')
+        if funcao == 'mean':
+            projecoes.append(f'COUNT("{coluna}") AS "{coluna}{SUFIXO_CONTAGEM}"')
+
+    chaves = ', '.join(CHAVES_DOMICILIO)
+
+    return f'SELECT {chaves}, {", ".join(projecoes)} FROM "POF_2018"."{view}"{filtroUpas(upas, uf)} GROUP BY {chaves};'
+
+def consultaUfs():
+
+    # UFs presentes na base, pelo prefixo do cod_upa (ver filtroUpas)
+    return f'SELECT DISTINCT SUBSTR(CAST(cod_upa AS TEXT), 1, 2) AS uf FROM "POF_2018"."{VIEWS_POF["domicilio"]}" ORDER BY uf;'
+
+def montarConsultas(agregacao='pandas', upas=None, uf=None):
+
+    if agregacao == 'pandas':
+        return {nome: consultaView(view, upas=upas, uf=uf) for nome, view in VIEWS_POF.items()}
+
+    # Nos modos 'sql' e 'streaming' só trafegam as colunas usadas; no 'sql' as views
+    # agregadas devolvem uma linha por domicílio e no 'streaming' são lidas à parte
+    consultas = {
+        'domicilio': consultaView(VIEWS_POF['domicilio'], upas=upas, uf=uf),
+        'aluguel_estimado': consultaView(VIEWS_POF['aluguel_estimado'], CHAVES_DOMICILIO + ['v8000'], upas, uf)
+    }
+    if agregacao == 'sql':
+        for nome, (funcao, colunas) in AGREGACOES_DOMICILIO.items():
+            consultas[nome] = consultaAgregada(VIEWS_POF[nome], funcao, list(colunas), upas, uf)
+
+    return consultas
+
+def montarTipos(agregacao='pandas'):
+
+    if agregacao == 'pandas':
+        return dict(TIPOS_VIEWS)
+
+    tipos = {nome: TIPOS_VIEWS[nome] for nome in ['domicilio', 'aluguel_estimado']}
+    if agregacao == 'streaming':
+        return tipos
+
+    for nome, (funcao, colunas) in AGREGACOES_DOMICILIO.items():
+        tipos[nome] = dict(TIPOS_CHAVES, **{coluna: 'float64' for coluna in colunas})
+        if funcao == 'mean':
+            tipos[nome].update({coluna + SUFIXO_CONTAGEM: 'int64' for coluna in colunas})
+
+    return tipos
+
+def agregarParciais(df, funcao, colunas):
 
-    def lerDespesaColetiva(db_params):
+    # Mesmo formato devolvido pela consultaAgregada: somas e, para médias, contagens
+    grupos = df.groupby(CHAVES_DOMICILIO)[colunas]
+    parciais = grupos.sum()
+    if funcao == 'mean':
+        parciais = parciais.join(grupos.count().add_suffix(SUFIXO_CONTAGEM))
 
-        try:
-            conn = psycopg2.connect(**db_params)
-            cursor = conn.cursor()
-        except psycopg2.Error as e:
-            print(f"Erro ao se conectar ao banco de dados: {e}")
+    return parciais
 
-        cursor.execute('SELECT * FROM "POF_2018"."View_Despesa_Coletiva";')
-        registros = cursor.fetchall()
-        df = pd.DataFrame(registros, columns=[desc[0] for desc in cursor.description])
-        
-        conn.close()
+def combinarParciais(parciais):
 
-        return df
+    # Somas e contagens parciais do mesmo domicílio se combinam somando
+    return pd.concat(parciais).groupby(level=CHAVES_DOMICILIO).sum()
 
-    def lerDespesaIndividual(db_params):
+def finalizarAgregados(parciais, funcao, colunas):
 
-        try:
-            conn = psycopg2.connect(**db_params)
-            cursor = conn.cursor()
-        except psycopg2.Error as e:
-            print(f"Erro ao se conectar ao banco de dados: {e}")
-
-        cursor.execute('SELECT * FROM "POF_2018"."View_Despesa_Individual";')
-        registros = cursor.fetchall()
-        df = pd.DataFrame(registros, columns=[desc[0] for desc in cursor.description])
-        
-        conn.close()
-
-        return df
+    if funcao == 'sum':
+        return parciais[colunas]
 
-    def lerCondicoesVida(db_params):
-
-        try:
-            conn = psycopg2.connect(**db_params)
-            cursor = conn.cursor()
-        except psycopg2.Error as e:
-            print(f"Erro ao se conectar ao banco de dados: {e}")
-
-        cursor.execute('SELECT * FROM "POF_2018"."View_Condições_Vida";')
-        registros = cursor.fetchall()
-        df = pd.DataFrame(registros, columns=[desc[0] for desc in cursor.description])
-        
-        conn.close()
-
-        return df
-
-    def lerCaracteristicaDieta(db_params):
-
-        try:
-            conn = psycopg2.connect(**db_params)
-            cursor = conn.cursor()
-        except psycopg2.Error as e:
-            print(f"Erro ao se conectar ao banco de dados: {e}")
-
-        cursor.execute('SELECT * FROM "POF_2018"."View_Caracteristica_Dieta";')
-        registros = cursor.fetchall()
-        df = pd.DataFrame(registros, columns=[desc[0] for desc in cursor.description])
-        
-        conn.close()
-
-        return df
-
-    def lerCadernetaColetiva(db_params):
-
-        try:
-            conn = psycopg2.connect(**db_params)
-            cursor = conn.cursor()
-        except psycopg2.Error as e:
-            print(f"Erro ao se conectar ao banco de dados: {e}")
-
-        cursor.execute('SELECT * FROM "POF_2018"."View_Caderneta_Coletiva";')
-        registros = cursor.fetchall()
-        df = pd.DataFrame(registros, columns=[desc[0] for desc in cursor.description])
-        
-        conn.close()
-
-        return df
-
-    def lerAluguelEstimado(db_params):
-
-        try:
-            conn = psycopg2.connect(**db_params)
-            cursor = conn.cursor()
-        except psycopg2.Error as e:
-            print(f"Erro ao se conectar ao banco de dados: {e}")
-
-        cursor.execute('select * FROM "POF_2018"."View_Aluguel_Estimado";')
-        registros = cursor.fetchall()
-        df = pd.DataFrame(registros, columns=[desc[0] for desc in cursor.description])
-
-        df['v8000'] = df['v8000'].replace(9999999.99, np.nan)
-        df['v8000'] = df['v8000'].replace(99999.00, np.nan)
-        
-        conn.close()
-
-        return df
-
-    def lerDomicilio(db_params):
-
-        try:
-            conn = psycopg2.connect(**db_params)
-            cursor = conn.cursor()
-        except psycopg2.Error as e:
-            print(f"Erro ao se conectar ao banco de dados: {e}")
-
-        cursor.execute('select * from "POF_2018"."View_Domicilio";')
-        registros = cursor.fetchall()
-        pof_domicilio = pd.DataFrame(registros, columns=[desc[0] for desc in cursor.description])
-
-        pof_domicilio.columns = ['cod_upa', 'num_dom', 'uf', 'Estratos do plano amostra', 'Situação do Domicílio',
-        'Tipo do domicílio', 'Material das paredes externas', 'Material do telhado',
-        'Material do piso', 'Qtd de cômodos', 'Qtd de cômodos dormitórios', 'Forma de abastecimento de água',
-        'Frequência da água proveniente de rede geral', 'Tipo de chegada da água', 'A água é aquecida por energia elétrica?',
-        'A água é aquecida por gás?', 'A água é aquecida por energia solar?', 'A água é aquecida por lenha ou carvão?', 
-        'A água é aquecida por outra forma?', 'Qtd de banheiros exclusivos', 'Qtd de banheiros de uso comum', 
-        'Utiliza sanitário ou buraco para dejeções?','Tipo de escoadouro sanitário', 'Destino dado ao lixo', 
-        'Energia elétrica é de rede geral?', 'Rede elétrica proveniente de outra origem?',
-        'Frequência da energia elétrica de rede geral', 'Utiliza-se gás butijão na preparação de alimentos?', 
-        'Utiliza-se lenha ou carvão na preparação de alimentos?', 'Utiliza-se energia elétrica na preparação de alimentos?', 
-        'Utiliza-se outro combustível na preparação de alimentos?', 'Este domicílio é:', 'Este contrato de aluguel é:', 
-        'A rua onde se localiza é pavimentada?', 'O serviço de correios é realizado:', 'Situação de segurança alimentar']
-        
-        pof_domicilio['Situação do Domicílio'] = pof_domicilio['Situação do Domicílio'].replace({'1': 'Urbano', '2': 'Rural'})
-        
-        conn.close()
-
-        return pof_domicilio
-
-    def lerRendimentoTrababalho(db_params):
-
-        try:
-            conn = psycopg2.connect(**db_params)
-            cursor = conn.cursor()
-        except psycopg2.Error as e:
-            print(f"Erro ao se conectar ao banco de dados: {e}")
-
-        cursor.execute('select * from "POF_2018"."View_Rendimento_Trabalho";')
-        registros = cursor.fetchall()
-        pof_rendimento = pd.DataFrame(registros, columns=[desc[0] for desc in cursor.description])
-        pof_rendimento['v8500_defla'] = pof_rendimento['v8500_defla'].astype(float)
-        pof_rendimento['v531112_defla'] = pof_rendimento['v531112_defla'].astype(float)
-        pof_rendimento['v531122_defla'] = pof_rendimento['v531122_defla'].astype(float)
-        pof_rendimento['v531132_defla'] = pof_rendimento['v531132_defla'].astype(float)
-
-        pof_rendimento.columns = ['cod_upa', 'num_dom', 'cod_informante', 'quadro', 'sub_quadro', 'seq', 'produto',
-                    'Nesse trabalho o informante era:',
-                    'Tipo de trabalhador não remunerado em ajuda a membro do domicílio ou parente.',
-                    'era servidor público estatutário (federal, estadual, municipal)?',
-                    'tinha carteira de trabalho assinada?',
-                    'era contribuinte de instituto de previdência?',
-                    ' forma de pagamento do último rendimento bruto mensal recebido nesse trabalho',
-                    'Valor em reais (R$) do rendimento bruto',
-                    'Valor em reais (R$) da dedução com previdência pública',
-                    'Valor em reais (R$) da dedução com imposto de renda',
-                    'Valor em reais (R$) da dedução com iss e outros impostos',
-                    'Último mês que o rendimento foi recebido',
-                    'Número de meses que o rendimento foi recebido',
-                    'Quantas horas trabalhava normalmente, por semana',
-                    'Qual a duração habitual do deslocamento para esse trabalho?',
-                    'deflator', 'Valor do rendimento deflacionado',
-                    'Valor da dedução com previdência pública deflacionado',
-                    'Valor da dedução com imposto de renda deflacionado',
-                    'Valor da dedução com iss e outros impostos deflacionado',
-                    'valor_imputado', 'fator_anualizacao',
-                    'o cargo, a função, a profissão ou o ofício que a pessoa exercia habitualmente no trabalho', 'denominacao_atividade_cnae']
-
-        conn.close()
-
-        return pof_rendimento
-
-    df_pof_rendimentos = lerRendimentoTrababalho(db_params)
-    df_pof_domicilio =  lerDomicilio(db_params)
-    df_aluguel_estimado = lerAluguelEstimado(db_params)
-    df_caderneta_coletiva = lerCadernetaColetiva(db_params)
-    df_caracte_dieta = lerCaracteristicaDieta(db_params)
-    df_condicoes_vida = lerCondicoesVida(db_params)
-    df_despesa_individual = lerDespesaIndividual(db_params)
-    df_despesa_coletiva = lerDespesaColetiva(db_params)
-
-    # 1. Aluguel Estimado
-    df_pof_domicilio = pd.merge(
-            df_pof_domicilio,
-            df_aluguel_estimado[['cod_upa', 'num_dom', 'v8000']],
-            how='left',
-            on=['cod_upa', 'num_dom']
-    ).rename(columns={'v8000': 'Aluguel Estimado'})
+    medias = pd.DataFrame(index=parciais.index)
+    for coluna in colunas:
+        contagem = parciais[coluna + SUFIXO_CONTAGEM]
+        medias[coluna] = pd.to_numeric(parciais[coluna]) / contagem.where(contagem > 0)
 
+    return medias
+
+def lerComCache(pool_conexoes, leitura, cache, nome, descricao):
+
+    # A impressão digital é calculada no servidor; só a view alterada volta a trafegar
+    conn = pool_conexoes.getconn()
+    try:
+        impressao = cache.impressaoDigital(conn, VIEWS_POF[nome])
+    finally:
+        pool_conexoes.putconn(conn)
+
+    chave = cache.chave(nome, VIEWS_POF[nome], descricao, impressao)
+    df = cache.ler(chave)
+    if df is None:
+        df = leitura(pool_conexoes)
+        cache.gravar(chave, df)
+
+    return df
+
+def montarLeituras(agregacao='pandas', backend='fetchall', tamanho_lote=50000, cache=None, upas=None, uf=None):
+
+    tipos = montarTipos(agregacao)
+    leituras, descricoes = {}, {}
+    for nome, consulta in montarConsultas(agregacao, upas, uf).items():
+        leituras[nome] = partial(lerConsulta, consulta=consulta, backend=backend, tipos=tipos.get(nome))
+        # No 'copy', os tipos declarados fazem parte da descrição do snapshot
+        descricoes[nome] = f'{backend}:{consulta}' + (f':{sorted(tipos.get(nome, {}).items())}' if backend == 'copy' else '')
+
+    if agregacao == 'streaming':
+        for nome, (funcao, colunas) in AGREGACOES_DOMICILIO.items():
+            leituras[nome] = partial(lerAgregadoStreaming, nome=nome, funcao=funcao, colunas=colunas, tamanho_lote=tamanho_lote,
+                                     upas=upas, uf=uf)
+            descricoes[nome] = f'streaming:{funcao}:{colunas}'
+
+    if cache is not None:
+        leituras = {nome: partial(lerComCache, leitura=leitura, cache=cache, nome=nome, descricao=descricoes[nome])
+                    for nome, leitura in leituras.items()}
+
+    return leituras
+
+def lerMonitorado(pool_conexoes, leitura, monitor, nome):
+
+    # Cada leitura é uma etapa própria, medida na thread que a executa
+    with monitor.etapa(f'ler:{nome}') as registro:
+        df = leitura(pool_conexoes)
+        registro.saida(df)
+
+    return df
+
+def lerViews(db_params, leituras, max_conexoes=4, monitor=None):
+    """
+    Lê as views do POF_2018 em paralelo, usando um pool limitado de conexões.
+
+    Args:
+        db_params (dict): Parâmetros de conexão do psycopg2.
+        leituras (dict): Função de leitura de cada view, indexada pelas chaves de VIEWS_POF.
+                         Cada função recebe o pool de conexões e devolve um DataFrame
+                         (ver montarLeituras).
+        max_conexoes (int): Grau de paralelismo, isto é, o número máximo de
+                            conexões abertas e de leituras simultâneas.
+        monitor (MonitorETL): Se informado, registra cada leitura como uma etapa.
+
+    Returns:
+        dict: DataFrames lidos, indexados pelas mesmas chaves de leituras.
+    """
+
+    monitor = monitor if monitor is not None else MonitorETL(ativo=False)
+    pool_conexoes = criarPoolConexoes(db_params, max_conexoes)
+
+    try:
+        # As leituras passam a maior parte do tempo esperando a rede, então threads bastam.
+        # Cada tarefa roda numa cópia do contexto, para o monitor saber a etapa que a submeteu
+        with ThreadPoolExecutor(max_workers=max_conexoes) as executor:
+            futuros = {nome: executor.submit(contextvars.copy_context().run, lerMonitorado, pool_conexoes, leitura, monitor, nome)
+                       for nome, leitura in leituras.items()}
+            dfs = {nome: futuro.result() for nome, futuro in futuros.items()}
+    finally:
+        pool_conexoes.closeall()
+
+    return dfs
+
+def lerDados(db_params, max_conexoes=4, agregacao='pandas', backend='fetchall', tamanho_lote=50000, cache=None,
+             monitor=None, upas=None, uf=None):
+    """
+    Extrai as views do POF_2018 e monta o DataFrame com um registro por domicílio.
+
+    Args:
+        db_params (dict): Parâmetros de conexão do psycopg2, ou {'sqlite': caminho} para
+                          ler um banco local gerado por GeradorPOF.criarBancoSQLite.
+        max_conexoes (int): Número máximo de leituras simultâneas.
+        agregacao (str): 'pandas' lê as views completas e agrega com groupby;
+                         'sql' envia GROUP BY cod_upa, num_dom ao banco e lê apenas
+                         uma linha por domicílio; 'streaming' percorre as views agregadas
+                         com um cursor server-side, acumulando somas e contagens por
+                         domicílio lote a lote. Os três modos produzem o mesmo resultado.
+        backend (str): 'fetchall' materializa as linhas pelo cursor; 'copy' usa
+                       COPY ... TO STDOUT e lê o CSV já com os tipos declarados.
+                       No modo 'streaming', vale só para as views não agregadas.
+        tamanho_lote (int): Linhas por lote do cursor server-side no modo 'streaming'.
+        cache (SnapshotCache): Se informado, cada view (ou agregado) é lida do snapshot
+                               local enquanto a impressão digital no servidor não mudar.
+        monitor (MonitorETL): Se informado, registra a leitura de cada view, a agregação
+                              de cada fonte e a junção como etapas.
+        upas (list): Se informado, lê apenas os domicílios dessas UPAs (cod_upa como está
+                     no banco), sem usar o cache. Usado pelo ETL incremental.
+        uf (str): Se informado, lê apenas os domicílios dessa UF (os dois primeiros dígitos
+                  do cod_upa), sem usar o cache. Usado pelo ETL particionado.
+
+    Returns:
+        pd.DataFrame: Domicílios com o aluguel estimado e as despesas e rendimentos agregados.
+    """
+
+    if agregacao not in ['pandas', 'sql', 'streaming']:
+        raise ValueError("A agregação deve ser 'pandas', 'sql' ou 'streaming'.")
+    if backend not in ['fetchall', 'copy']:
+        raise ValueError("O backend deve ser 'fetchall' ou 'copy'.")
+
+    monitor = monitor if monitor is not None else MonitorETL(ativo=False)
+    # Os snapshots guardam views inteiras; uma leitura parcial não passa pelo cache
+    cache = cache if upas is None and uf is None else None
+    dfs = lerViews(db_params, montarLeituras(agregacao, backend, tamanho_lote, cache, upas, uf), max_conexoes, monitor)
+
+    df_pof_domicilio = tratarDomicilio(dfs.pop('domicilio'))
+    df_aluguel_estimado = tratarAluguelEstimado(dfs.pop('aluguel_estimado'))
+
+    agregados = {}
+    for nome, (funcao, colunas) in AGREGACOES_DOMICILIO.items():
+        df = dfs.pop(nome)
+        renomear = dict(colunas, **{origem + SUFIXO_CONTAGEM: destino + SUFIXO_CONTAGEM for origem, destino in colunas.items()})
+        with monitor.etapa(f'agregar:{nome}') as registro:
+            registro.entrada(df)
+            if agregacao == 'pandas':
+                if nome == 'rendimento_trabalho':
+                    df = tratarRendimentoTrabalho(df)
+                parciais = agregarParciais(df.rename(columns=colunas), funcao, list(colunas.values()))
+            elif agregacao == 'sql':
+                parciais = df.set_index(CHAVES_DOMICILIO).rename(columns=renomear)
+            else:
+                parciais = df
+            agregados[nome] = finalizarAgregados(parciais, funcao, list(colunas.values()))
+            registro.saida(agregados[nome])
+        del df, parciais
+
+    del dfs
+
+    aluguel_estimado = df_aluguel_estimado.set_index(CHAVES_DOMICILIO)[['v8000']].rename(columns={'v8000': 'Aluguel Estimado'})
     del df_aluguel_estimado
-    
-    # 2. Caderneta Coletiva
-    df_pof_domicilio = pd.merge(
-        df_pof_domicilio,
-        df_caderneta_coletiva.groupby(['cod_upa', 'num_dom'])['v8000_defla'].sum(),
-        how='left',
-        on=['cod_upa', 'num_dom']
-    ).rename(columns={'v8000_defla': 'Valor em reais (R$) de despesa realizada'})
-
-    del df_caderneta_coletiva
-
-    # 3. Condições de Vida
-    df_pof_domicilio = pd.merge(
-        df_pof_domicilio,
-        df_condicoes_vida.groupby(['cod_upa', 'num_dom'])[['v6102', 'v6103']].mean(),
-        how='left',
-        on=['cod_upa', 'num_dom']
-    ).rename(columns={'v6102': 'Rendimento mensal mínimo geral (R$)', 
-                        'v6103': 'Rendimento mensal mínimo p\\ alimentação (R$)'})
-    
-    del df_condicoes_vida
-
-    # 4. Despesa Individual
-    df_pof_domicilio = pd.merge(
-        df_pof_domicilio,
-            df_despesa_individual.groupby(['cod_upa', 'num_dom'])['v8000_defla'].sum(),
-            how='left',
-            on=['cod_upa', 'num_dom']
-        ).rename(columns={'v8000_defla': 'Valor em reais (R$) de despesa individual'})
-
-    del df_despesa_individual
-
-    # 5. Despesa Coletiva
-    df_pof_domicilio = pd.merge(
-        df_pof_domicilio,
-        df_despesa_coletiva.groupby(['cod_upa', 'num_dom'])['v8000_defla'].sum(),
-        how='left',
-        on=['cod_upa', 'num_dom']
-    ).rename(columns={'v8000_defla': 'Valor em reais (R$) de despesa coletiva'})
-
-    del df_despesa_coletiva
-    
-    cols = ['Valor em reais (R$) do rendimento bruto',
-        'Valor em reais (R$) da dedução com previdência pública',
-        'Valor em reais (R$) da dedução com imposto de renda',
-        'Valor em reais (R$) da dedução com iss e outros impostos']
-
-    df_pof_domicilio = pd.merge(
-            df_pof_domicilio,
-            df_pof_rendimentos.groupby(['cod_upa', 'num_dom'])[cols].sum(),
-            how='left',
-            on=['cod_upa', 'num_dom']
-        )
-
-    del df_pof_rendimentos
-    
-    return df_pof_domicilio 
 
-def conversoes(df_pof_domicilio):
+    # 1. Aluguel Estimado, 2. Caderneta Coletiva, 3. Condições de Vida, 4. Despesa Individual,
+    # 5. Despesa Coletiva e 6. Rendimentos, com as chaves já inteiras como as do domicílio
+    fontes = [chavesInteiras(aluguel_estimado)] + [chavesInteiras(agregados.pop(nome)) for nome in AGREGACOES_DOMICILIO]
 
-    # 1. Crie listas com os nomes das colunas para cada tipo
-    colunas_para_int = [
-            'Qtd de cômodos',
-            'Qtd de cômodos dormitórios',
-            'Qtd de banheiros exclusivos',
-            'Qtd de banheiros de uso comum'
-        ]
-
-    colunas_para_float = [
-            'Valor em reais (R$) do rendimento bruto',
-            'Valor em reais (R$) da dedução com previdência pública',
-            'Valor em reais (R$) da dedução com imposto de renda',
-            'Valor em reais (R$) da dedução com iss e outros impostos',
-            'Valor em reais (R$) de despesa realizada',
-            'Valor em reais (R$) de despesa individual',
-            'Valor em reais (R$) de despesa coletiva',
-            'Aluguel Estimado',
-            'Rendimento mensal mínimo geral (R$)',
-            'Rendimento mensal mínimo p\\ alimentação (R$)'
-        ]
-
-        # 2. Converta as colunas de forma segura usando um loop
-        # Para colunas de inteiros
-
-    for col in colunas_para_int:
-        # Primeiro, converte para numérico, transformando erros em Nulos (NaN)
-        temp_col = pd.to_numeric(df_pof_domicilio[col], errors='coerce')
-        # Depois, converte para o tipo Int64, que suporta nulos
-        df_pof_domicilio[col] = temp_col.astype('Int64')
-
-    # Para colunas de float
-    for col in colunas_para_float:
-        # Apenas converter para numérico é suficiente, pois float já suporta NaN
-        df_pof_domicilio[col] = pd.to_numeric(df_pof_domicilio[col], errors='coerce')
+    with monitor.etapa('juntarPorDomicilio') as registro:
+        registro.entrada(df_pof_domicilio)
+        df_pof_domicilio = juntarPorDomicilio(df_pof_domicilio, fontes)
+        registro.saida(df_pof_domicilio)
 
     return df_pof_domicilio
 
-def featuresEnginer(df_pof_domicilio):
+def listarUfs(db_params):
 
-    df_pof_domicilio['Aluguel Estimado'] = df_pof_domicilio['Aluguel Estimado'].replace(9999999.99, np.nan)
+    # Códigos das UFs presentes na base, uma partição do ETL particionado por UF
+    pool_conexoes = criarPoolConexoes(db_params, 1)
+    try:
+        return lerConsulta(pool_conexoes, consultaUfs())['uf'].astype(str).tolist()
+    finally:
+        pool_conexoes.closeall()
 
-    df_pof_domicilio = df_pof_domicilio.dropna(subset=['Aluguel Estimado'])
-    
-    nomes_faixas = ['1 - Muito Baixo', '2 - Baixo', '3 - Médio', '4 - Alto', '5 - Muito Alto']
-    df_pof_domicilio['Aluguel Estimado (Faixa)'] = pd.qcut(df_pof_domicilio['Aluguel Estimado'], q=5, labels=nomes_faixas, duplicates='drop')
-    df_pof_domicilio['Aluguel Estimado (Faixa)'] = df_pof_domicilio['Aluguel Estimado (Faixa)'].astype(str)
-
-    df_pof_domicilio['Qtd de banheiros de uso comum'] = df_pof_domicilio['Qtd de banheiros de uso comum'].fillna(0)
-    df_pof_domicilio['Valor em reais (R$) de despesa realizada'] = df_pof_domicilio.groupby('Tipo do domicílio')['Valor em reais (R$) de despesa realizada'].transform(lambda x: x.fillna(x.median()))
-    df_pof_domicilio['Valor em reais (R$) do rendimento bruto'] = df_pof_domicilio.groupby('Tipo do domicílio')['Valor em reais (R$) do rendimento bruto'].transform(lambda x: x.fillna(x.median()))
-    df_pof_domicilio = df_pof_domicilio.dropna(subset=['Aluguel Estimado', 
-                                                    'Valor em reais (R$) de despesa individual', 
-                                                    'Valor em reais (R$) de despesa coletiva'])
-    
-    df_pof_domicilio.drop(labels=['Valor em reais (R$) da dedução com previdência pública',
-                                'Valor em reais (R$) da dedução com imposto de renda',
-                                'Valor em reais (R$) da dedução com iss e outros impostos'], axis=1, inplace=True)
+def juntarPorDomicilio(df_pof_domicilio, fontes):
+    """
+    Equivale à sequência de pd.merge(..., how='left', on=['cod_upa', 'num_dom']) com cada
+    fonte, na ordem dada, mas sem recopiar o DataFrame a cada junção.
 
+    A chave composta do domicílio é codificada uma única vez em um índice inteiro; cada
+    fonte é alinhada a esse índice com um único take, e o resultado é montado coluna a
+    coluna em um só DataFrame.
 
-    # Loop para tratar cada variável
-    for variavel in df_pof_domicilio.select_dtypes(include=np.number).columns:
-        
-        # 4. Calcular Q1 (25º percentil) e Q3 (75º percentil)
-        Q1 = df_pof_domicilio[variavel].quantile(0.25)
-        Q3 = df_pof_domicilio[variavel].quantile(0.75)
+    Args:
+        df_pof_domicilio (pd.DataFrame): Domicílios, com as colunas cod_upa e num_dom.
+        fontes (list): DataFrames indexados por (cod_upa, num_dom).
 
-        # 5. Calcular o IQR
-        IQR = Q3 - Q1
+    Returns:
+        pd.DataFrame: Os domicílios seguidos das colunas de cada fonte.
+    """
 
-        # 6. Calcular o Limite Superior para outliers
-        limite_superior = Q3 + (1.5 * IQR)
-        limite_superior = math.ceil(limite_superior)
+    # Uma fonte com chaves repetidas multiplica as linhas do domicílio; só o merge reproduz isso
+    while fontes and not fontes[0].index.is_unique:
+        df_pof_domicilio = pd.merge(df_pof_domicilio, fontes.pop(0), how='left',
+                                    left_on=CHAVES_DOMICILIO, right_index=True).reset_index(drop=True)
+    if any(not fonte.index.is_unique for fonte in fontes):
+        raise ValueError("As fontes agregadas devem ter uma linha por domicílio.")
 
-        # Substituir outliers pelo limite superior
-        df_pof_domicilio.loc[df_pof_domicilio[variavel] > limite_superior, variavel] = limite_superior
-    
-    return df_pof_domicilio
+    # Índice inteiro do domicílio: código de cada linha e chaves únicas, calculados uma vez
+    codigos, domicilios = pd.MultiIndex.from_frame(df_pof_domicilio[CHAVES_DOMICILIO]).factorize()
+
+    colunas = {coluna: df_pof_domicilio[coluna].array for coluna in df_pof_domicilio.columns}
+    for fonte in fontes:
+        posicoes = fonte.index.get_indexer(domicilios)[codigos]
+        for coluna in fonte.columns:
+            colunas[coluna] = pd.api.extensions.take(fonte[coluna].array, posicoes, allow_fill=True)
+
+    return pd.DataFrame(colunas)
 
-def ETL(output_path, db_params):
+def conversoes(df_pof_domicilio):
+
+    # Contagens para Int64 e valores para float (ver HouseholdFeaturePipeline.converter_tipos)
+    return HouseholdFeaturePipeline.converter_tipos(df_pof_domicilio)
 
-    df_pof_domicilio = lerDados(db_params)
-    df_pof_domicilio = conversoes(df_pof_domicilio)
-    df_pof_domicilio = featuresEnginer(df_pof_domicilio)
-    df_pof_domicilio.to_csv(output_path, index=False)
+def featuresEnginer(df_pof_domicilio):
 
+    # Aprende as medianas, os limites de outliers e as faixas do aluguel sobre a própria base e os aplica
+    return HouseholdFeaturePipeline().fit_transform(df_pof_domicilio)
+
+def ETL(output_path, db_params, max_conexoes=4, agregacao='pandas', backend='fetchall', tamanho_lote=50000, cache=None,
+        csv_path=None, pipeline_path=None, particionado=False, n_processos=None, epsilon=0.001, monitor=None):
+
+    # Sem monitor, as etapas rodam sem medição
+    monitor = monitor if monitor is not None else MonitorETL(ativo=False)
+
+    if particionado:
+        # Uma partição por UF em um pool de processos: cada processo lê, converte e trata a
+        # sua UF, com estatísticas globais via sketches, e o resultado é gravado partição a
+        # partição. Cada processo abre até max_conexoes conexões; o cache não é usado
+        with monitor.etapa('ETLParticionado') as registro:
+            ler_particao = partial(lerDados, db_params, max_conexoes, agregacao, backend, tamanho_lote)
+            pipeline, linhas = ETLParticionado(output_path, ler_particao, listarUfs(db_params), n_processos, epsilon,
+                                               csv_path)
+            registro.saida(linhas)
+        if pipeline_path is not None:
+            pipeline.save(pipeline_path)
+        return
+
+    with monitor.etapa('lerDados') as registro:
+        df_pof_domicilio = lerDados(db_params, max_conexoes, agregacao, backend, tamanho_lote, cache, monitor)
+        registro.saida(df_pof_domicilio)
+
+    with monitor.etapa('conversoes') as registro:
+        registro.entrada(df_pof_domicilio)
+        df_pof_domicilio = conversoes(df_pof_domicilio)
+        registro.saida(df_pof_domicilio)
+
+    # Conversões e engenharia de features; os parâmetros aprendidos podem ser gravados
+    # para tratar novos lotes de domicílios com HouseholdFeaturePipeline.load(...).transform(...)
+    with monitor.etapa('featuresEnginer') as registro:
+        registro.entrada(df_pof_domicilio)
+        pipeline = HouseholdFeaturePipeline()
+        df_pof_domicilio = pipeline.fit_transform(df_pof_domicilio)
+        registro.saida(df_pof_domicilio)
+    if pipeline_path is not None:
+        pipeline.save(pipeline_path)
+
+    with monitor.etapa('save_processed') as registro:
+        save_processed(df_pof_domicilio, output_path, csv_path)
+        registro.saida(len(df_pof_domicilio))
\ No newline at end of file
@@ -0,0 +1,375 @@
+import os
+import json
+from functools import partial
+import numpy as np
+import pandas as pd
+from scripts.ETL import VIEWS_POF, CHAVES_DOMICILIO, lerDados, lerViews, conversoes
+from scripts.HouseholdFeaturePipeline import HouseholdFeaturePipeline
+from scripts.MonitorETL import MonitorETL
+from scripts.ProcessedData import part_dtypes, save_processed_parts
+
+# ETL incremental: em vez de reconstruir o conjunto inteiro, compara com a execução
+# anterior um hash das linhas de cada domicílio em cada view, calculado no servidor,
+# relê apenas as UPAs com domicílios novos, alterados ou removidos e substitui essas
+# UPAs no estado local. As estatísticas globais do HouseholdFeaturePipeline (faixas,
+# medianas e limites) só são reaprendidas quando a distribuição das variáveis se
+# desloca além de um limiar (PSI) em relação à do último ajuste.
+#
+# O estado é particionado por UF (os dois primeiros dígitos do cod_upa): cada partição
+# tem os domicílios, os domicílios processados e um resumo com as contagens por decil de
+# referência (para o PSI) e os tipos das colunas (para a gravação). Uma execução só lê,
+# prepara e regrava as partições das UPAs alteradas; o PSI soma as contagens dessas
+# partições às já guardadas nas demais.
+
+ARQUIVO_HASHES = 'hashes.parquet'
+DIRETORIO_DOMICILIOS = 'domicilios'
+DIRETORIO_PROCESSADOS = 'processados'
+DIRETORIO_RESUMOS = 'resumos'
+ARQUIVO_PIPELINE = 'pipeline.json'
+ARQUIVO_REFERENCIA = 'referencia_drift.json'
+
+# Faixas (decis) usadas para comparar distribuições no PSI
+FAIXAS_PSI = 10
+
+def colunasView(pool_conexoes, view):
+
+    conn = pool_conexoes.getconn()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT * FROM "POF_2018"."{view}" LIMIT 0;')
+        colunas = [desc[0] for desc in cursor.description]
+        cursor.close()
+    finally:
+        pool_conexoes.putconn(conn)
+
+    return colunas
+
+def consultaHashes(view, colunas):
+
+    # Número de linhas e soma dos hashes das linhas de cada domicílio; a soma não depende
+    # da ordem das linhas, e só uma linha por domicílio trafega
+    texto = " || '|' || ".join(f'COALESCE(CAST("{coluna}" AS TEXT), \'\')' for coluna in colunas)
+    chaves = ', '.join(CHAVES_DOMICILIO)
+
+    return (f'SELECT {chaves}, COUNT(*) AS linhas, SUM(CAST(hashtext({texto}) AS BIGINT)) AS hash '
+            f'FROM "POF_2018"."{view}" GROUP BY {chaves};')
+
+def lerHashes(pool_conexoes, nome):
+
+    consulta = consultaHashes(VIEWS_POF[nome], colunasView(pool_conexoes, VIEWS_POF[nome]))
+
+    conn = pool_conexoes.getconn()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(consulta)
+        registros = cursor.fetchall()
+        cursor.close()
+    finally:
+        pool_conexoes.putconn(conn)
+
+    # Chaves e hashes como texto: o tipo devolvido (int, Decimal) depende do banco
+    df = pd.DataFrame(registros, columns=CHAVES_DOMICILIO + ['linhas', 'hash']).astype(str)
+    df.insert(0, 'view', nome)
+
+    return df
+
+def upasAlteradas(hashes, hashes_anteriores):
+
+    # Um domicílio mudou se aparece só em um dos lados ou se a contagem ou o hash diferem
+    comparacao = hashes.merge(hashes_anteriores, on=['view'] + CHAVES_DOMICILIO, how='outer',
+                              suffixes=('', '_anterior'), indicator=True)
+    alterados = ((comparacao['_merge'] != 'both')
+                 | (comparacao['linhas'] != comparacao['linhas_anterior'])
+                 | (comparacao['hash'] != comparacao['hash_anterior']))
+
+    return comparacao.loc[alterados, CHAVES_DOMICILIO].drop_duplicates()
+
+def categoriasObservadas(df, categoricas):
+
+    # Só as categorias presentes, como no astype('category') do ETL completo
+    for coluna in categoricas:
+        df[coluna] = df[coluna].astype('category').cat.remove_unused_categories()
+
+    return df
+
+def concatenarDomicilios(partes):
+
+    # Categorias diferentes entre as partes viram object no concat; o tipo category é refeito
+    categoricas = [coluna for coluna in partes[0].columns if isinstance(partes[0][coluna].dtype, pd.CategoricalDtype)]
+    df = categoriasObservadas(pd.concat(partes, ignore_index=True), categoricas)
+
+    return df.sort_values(CHAVES_DOMICILIO, kind='stable').reset_index(drop=True)
+
+def substituirUpas(df, novos, upas):
+
+    # Remove do estado todos os domicílios das UPAs relidas e inclui a versão atual
+    mantidos = ~df['cod_upa'].isin(pd.to_numeric(pd.Series(list(upas))))
+
+    return concatenarDomicilios([df.loc[mantidos], novos])
+
+def ufUpa(cod_upa):
+
+    # A partição de uma UPA é a UF, os dois primeiros dígitos do código
+    return str(cod_upa)[:2]
+
+def referenciaDrift(df_preparado, colunas):
+
+    # Decis de cada variável no ajuste, com as proporções observadas em cada faixa
+    referencia = {}
+    for coluna in colunas:
+        valores = pd.to_numeric(df_preparado[coluna], errors='coerce').dropna().to_numpy(dtype=float)
+        if len(valores) == 0:
+            continue
+        limites = np.unique(np.quantile(valores, np.linspace(0, 1, FAIXAS_PSI + 1)))[1:-1]
+        referencia[coluna] = {'limites': limites.tolist(), 'proporcoes': proporcoes(valores, limites).tolist()}
+
+    return referencia
+
+def contagensFaixas(valores, limites):
+
+    return np.bincount(np.searchsorted(limites, valores, side='right'), minlength=len(limites) + 1)
+
+def proporcoes(valores, limites):
+
+    contagens = contagensFaixas(valores, limites)
+
+    return contagens / max(contagens.sum(), 1)
+
+def contagensDrift(referencia, df_preparado):
+
+    # Domicílios de cada variável de referência em cada faixa, somáveis entre partições
+    contagens = {}
+    for coluna, faixas in referencia.items():
+        valores = pd.to_numeric(df_preparado[coluna], errors='coerce').dropna().to_numpy(dtype=float)
+        contagens[coluna] = contagensFaixas(valores, np.asarray(faixas['limites'], dtype=float)).tolist()
+
+    return contagens
+
+def psi(esperado, observado, minimo=1e-4):
+    """Population Stability Index entre duas distribuições nas mesmas faixas."""
+    esperado = np.maximum(np.asarray(esperado, dtype=float), minimo)
+    observado = np.maximum(np.asarray(observado, dtype=float), minimo)
+
+    return float(np.sum((observado - esperado) * np.log(observado / esperado)))
+
+def driftMaximo(referencia, resumos):
+
+    # Maior PSI entre as variáveis de referência, com as contagens somadas sobre as partições
+    maior = 0.0
+    for coluna, faixas in referencia.items():
+        contagens = np.sum([resumo['contagens'][coluna] for resumo in resumos], axis=0)
+        observado = contagens / max(contagens.sum(), 1)
+        maior = max(maior, psi(faixas['proporcoes'], observado))
+
+    return maior
+
+def gravarParquet(df, caminho):
+
+    # Gravação atômica, como nos snapshots: uma execução interrompida não corrompe o estado
+    temporario = caminho + '.tmp'
+    df.to_parquet(temporario)
+    os.replace(temporario, caminho)
+
+def gravarJson(dados, caminho):
+
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(dados, arquivo, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+def caminhosParticao(diretorio_estado, uf):
+
+    return (os.path.join(diretorio_estado, DIRETORIO_DOMICILIOS, f'uf={uf}.parquet'),
+            os.path.join(diretorio_estado, DIRETORIO_PROCESSADOS, f'uf={uf}.parquet'),
+            os.path.join(diretorio_estado, DIRETORIO_RESUMOS, f'uf={uf}.json'))
+
+def ufsEstado(diretorio_estado):
+
+    return sorted(arquivo[len('uf='):-len('.parquet')]
+                  for arquivo in os.listdir(os.path.join(diretorio_estado, DIRETORIO_DOMICILIOS))
+                  if arquivo.startswith('uf=') and arquivo.endswith('.parquet'))
+
+def resumirParticao(df_domicilios, df_processado, pipeline, referencia):
+
+    # Contagens por decil da partição inteira (preparada, antes dos limites, como no ajuste)
+    # e tipos da partição processada (ver save_processed_parts)
+    preparado = pipeline._preparar(pipeline.converter_tipos(df_domicilios.copy()))
+
+    return {'contagens': contagensDrift(referencia, preparado), 'tipos': part_dtypes(df_processado)}
+
+def gravarParticao(diretorio_estado, uf, df_domicilios, df_processado, resumo):
+
+    # O resumo é gravado por último: se a execução parar no meio, os hashes também não foram
+    # gravados, as UPAs são relidas na próxima e a partição é refeita
+    caminho_domicilios, caminho_processados, caminho_resumo = caminhosParticao(diretorio_estado, uf)
+    if df_domicilios.empty:
+        for caminho in [caminho_resumo, caminho_processados, caminho_domicilios]:
+            if os.path.exists(caminho):
+                os.remove(caminho)
+        return
+
+    gravarParquet(df_domicilios, caminho_domicilios)
+    gravarParquet(df_processado, caminho_processados)
+    gravarJson(resumo, caminho_resumo)
+
+def lerResumo(diretorio_estado, uf):
+
+    with open(caminhosParticao(diretorio_estado, uf)[2], encoding='utf-8') as arquivo:
+        return json.load(arquivo)
+
+def particionar(df):
+
+    # Partições por UF, cada uma ainda ordenada por (cod_upa, num_dom) e só com as próprias categorias
+    categoricas = [coluna for coluna in df.columns if isinstance(df[coluna].dtype, pd.CategoricalDtype)]
+
+    return {uf: categoriasObservadas(parte.reset_index(drop=True), categoricas)
+            for uf, parte in df.groupby(df['cod_upa'].map(ufUpa), sort=True)}
+
+def ajustar(df_domicilios, diretorio_estado):
+
+    pipeline = HouseholdFeaturePipeline()
+    df_processado = pipeline.fit_transform(df_domicilios.copy()).reset_index(drop=True)
+
+    preparado = pipeline._preparar(pipeline.converter_tipos(df_domicilios.copy()))
+    referencia = referenciaDrift(preparado, pipeline.limites_superiores_.index)
+    del preparado
+
+    pipeline.save(os.path.join(diretorio_estado, ARQUIVO_PIPELINE))
+    gravarJson(referencia, os.path.join(diretorio_estado, ARQUIVO_REFERENCIA))
+
+    # Com novos parâmetros, todas as partições (e as contagens de referência) são refeitas
+    for diretorio in [DIRETORIO_DOMICILIOS, DIRETORIO_PROCESSADOS, DIRETORIO_RESUMOS]:
+        os.makedirs(os.path.join(diretorio_estado, diretorio), exist_ok=True)
+    domicilios, processados = particionar(df_domicilios), particionar(df_processado)
+    for uf in sorted(set(ufsEstado(diretorio_estado)) | set(domicilios)):
+        df_uf = domicilios.get(uf, df_domicilios.iloc[:0])
+        processado_uf = processados.get(uf, df_processado.iloc[:0])
+        gravarParticao(diretorio_estado, uf, df_uf, processado_uf, resumirParticao(df_uf, processado_uf, pipeline, referencia))
+
+    return pipeline
+
+def ETLIncremental(output_path, db_params, diretorio_estado, max_conexoes=4, agregacao='pandas', backend='fetchall',
+                   tamanho_lote=50000, limiar_drift=0.1, csv_path=None, pipeline_path=None, monitor=None):
+    """
+    Atualiza o conjunto processado reprocessando apenas os domicílios alterados.
+
+    Na primeira execução (diretório de estado vazio) o ETL é completo. Nas seguintes:
+    1. O hash das linhas de cada domicílio em cada view é calculado no servidor e
+       comparado com o da execução anterior.
+    2. As UPAs com domicílios novos, alterados ou removidos são relidas com lerDados
+       e substituem as mesmas UPAs no estado local, particionado por UF: só as partições
+       dessas UPAs são lidas e regravadas.
+    3. Se o PSI de alguma variável numérica, medido contra a distribuição do último
+       ajuste, passar de limiar_drift, o HouseholdFeaturePipeline é reajustado sobre
+       todos os domicílios; caso contrário, só as UPAs relidas passam pelo transform.
+       O PSI usa as contagens por decil guardadas de cada partição, recalculadas apenas
+       nas partições regravadas.
+    4. O arquivo processado é montado partição a partição (ver save_processed_parts).
+
+    O resultado é o mesmo do ETL completo com o pipeline vigente, com as linhas
+    ordenadas por (cod_upa, num_dom).
+
+    Args:
+        output_path (str): Caminho do arquivo Arrow processado (ver save_processed).
+        db_params (dict): Parâmetros de conexão (ver lerDados).
+        diretorio_estado (str): Diretório com o estado da última execução.
+        max_conexoes, agregacao, backend, tamanho_lote: Como em lerDados.
+        limiar_drift (float): PSI a partir do qual as estatísticas globais são reaprendidas.
+        csv_path (str): Se informado, também exporta o CSV.
+        pipeline_path (str): Se informado, grava também aí os parâmetros do pipeline vigente.
+        monitor (MonitorETL): Se informado, registra as etapas.
+
+    Returns:
+        dict: Resumo da execução: domicílios e UPAs alterados, PSI e se houve reajuste.
+    """
+
+    monitor = monitor if monitor is not None else MonitorETL(ativo=False)
+    os.makedirs(diretorio_estado, exist_ok=True)
+    caminho = partial(os.path.join, diretorio_estado)
+
+    with monitor.etapa('hashes') as registro:
+        leituras = {f'hash:{nome}': partial(lerHashes, nome=nome) for nome in VIEWS_POF}
+        hashes = pd.concat(lerViews(db_params, leituras, max_conexoes, monitor).values(), ignore_index=True)
+        registro.saida(hashes)
+
+    primeira = not all(os.path.exists(caminho(arquivo)) for arquivo in
+                       [ARQUIVO_HASHES, DIRETORIO_DOMICILIOS, DIRETORIO_PROCESSADOS, DIRETORIO_RESUMOS,
+                        ARQUIVO_PIPELINE, ARQUIVO_REFERENCIA])
+    resumo = {'primeira_execucao': primeira, 'domicilios_alterados': 0, 'upas_alteradas': 0, 'psi': None,
+              'reajustado': primeira}
+
+    if primeira:
+        with monitor.etapa('lerDados') as registro:
+            df_domicilios = lerDados(db_params, max_conexoes, agregacao, backend, tamanho_lote, monitor=monitor)
+            registro.saida(df_domicilios)
+        df_domicilios = conversoes(df_domicilios).sort_values(CHAVES_DOMICILIO, kind='stable').reset_index(drop=True)
+
+        with monitor.etapa('featuresEnginer') as registro:
+            pipeline = ajustar(df_domicilios, diretorio_estado)
+            registro.saida(df_domicilios)
+        del df_domicilios
+    else:
+        alterados = upasAlteradas(hashes, pd.read_parquet(caminho(ARQUIVO_HASHES)))
+        upas = sorted(alterados['cod_upa'].unique())
+        resumo.update(domicilios_alterados=len(alterados), upas_alteradas=len(upas))
+
+        pipeline = HouseholdFeaturePipeline.load(caminho(ARQUIVO_PIPELINE))
+        if not upas:
+            print("Nenhum domicílio alterado desde a última execução.")
+        else:
+            with monitor.etapa('lerDados') as registro:
+                novos = conversoes(lerDados(db_params, max_conexoes, agregacao, backend, tamanho_lote,
+                                            monitor=monitor, upas=upas))
+                registro.saida(novos)
+
+            with monitor.etapa('featuresEnginer') as registro:
+                with open(caminho(ARQUIVO_REFERENCIA), encoding='utf-8') as arquivo:
+                    referencia = json.load(arquivo)
+
+                # Só as partições (UFs) das UPAs relidas são lidas e refeitas; as demais
+                # entram no PSI pelas contagens já guardadas
+                novos_por_uf = particionar(novos)
+                ufs_alteradas = sorted({ufUpa(upa) for upa in upas})
+                resumos = {uf: lerResumo(diretorio_estado, uf) for uf in ufsEstado(diretorio_estado)
+                           if uf not in ufs_alteradas}
+                particoes = {}
+                for uf in ufs_alteradas:
+                    upas_uf = [upa for upa in upas if ufUpa(upa) == uf]
+                    novos_uf = novos_por_uf.get(uf, novos.iloc[:0])
+                    caminho_domicilios, caminho_processados, _ = caminhosParticao(diretorio_estado, uf)
+                    if os.path.exists(caminho_domicilios):
+                        df_uf = substituirUpas(pd.read_parquet(caminho_domicilios), novos_uf, upas_uf)
+                        processado_uf = substituirUpas(pd.read_parquet(caminho_processados),
+                                                       pipeline.transform(novos_uf), upas_uf)
+                    else:
+                        df_uf = concatenarDomicilios([novos_uf])
+                        processado_uf = concatenarDomicilios([pipeline.transform(novos_uf)])
+                    particoes[uf] = (df_uf, processado_uf)
+                    resumos[uf] = resumirParticao(df_uf, processado_uf, pipeline, referencia)
+                resumo['psi'] = driftMaximo(referencia, list(resumos.values()))
+
+                if resumo['psi'] > limiar_drift:
+                    # A distribuição mudou: faixas, medianas e limites são reaprendidos sobre tudo
+                    partes = [particoes[uf][0] if uf in particoes else pd.read_parquet(caminhosParticao(diretorio_estado, uf)[0])
+                              for uf in sorted(resumos)]
+                    pipeline = ajustar(concatenarDomicilios([parte for parte in partes if not parte.empty]), diretorio_estado)
+                    resumo['reajustado'] = True
+                else:
+                    for uf, (df_uf, processado_uf) in particoes.items():
+                        gravarParticao(diretorio_estado, uf, df_uf, processado_uf, resumos[uf])
+                registro.saida(novos)
+
+    # O estado é gravado antes dos hashes: se a execução parar no meio, as UPAs são relidas na próxima
+    gravarParquet(hashes, caminho(ARQUIVO_HASHES))
+
+    if pipeline_path is not None:
+        pipeline.save(pipeline_path)
+
+    # O arquivo final é montado partição a partição, sem a base inteira em memória
+    with monitor.etapa('save_processed') as registro:
+        ufs = ufsEstado(diretorio_estado)
+        linhas = save_processed_parts([caminhosParticao(diretorio_estado, uf)[1] for uf in ufs],
+                                      [lerResumo(diretorio_estado, uf)['tipos'] for uf in ufs], output_path, csv_path)
+        registro.saida(linhas)
+
+    return resumo
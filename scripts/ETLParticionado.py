@@ -0,0 +1,130 @@
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from scripts.HouseholdFeaturePipeline import HouseholdFeaturePipeline
+from scripts.KLLSketch import KLLSketch
+from scripts.ProcessedData import part_dtypes, save_processed_parts
+
+# Execução particionada do ETL: cada partição (uma UF) é lida do banco, convertida e
+# tratada em um processo separado, e gravada em disco. As únicas estatísticas globais
+# (faixas do aluguel, medianas por tipo de domicílio e limites de outliers) vêm de sketches
+# de quantis calculados por partição e combinados no processo principal, que os devolve
+# às partições para a etapa final. Nenhum processo tem a base inteira em memória: o
+# principal só combina sketches e, no fim, copia uma partição de cada vez para o arquivo
+# Arrow final (save_processed_parts).
+
+def extrairParticao(ler_particao, uf, caminho, epsilon):
+
+    # Lê só os domicílios da UF, converte os tipos e guarda a partição para as próximas etapas
+    df = HouseholdFeaturePipeline.converter_tipos(ler_particao(uf=uf))
+    df.to_parquet(caminho)
+
+    return sketchesMedianasFaixas(df, epsilon)
+
+def sketchesMedianasFaixas(df, epsilon):
+
+    aluguel = df['Aluguel Estimado'].replace(HouseholdFeaturePipeline.SENTINELA_ALUGUEL, np.nan)
+    com_aluguel = df.loc[aluguel.notna()]
+
+    sketch_aluguel = KLLSketch(epsilon).update(aluguel.dropna())
+    sketches_medianas = {
+        (tipo, coluna): KLLSketch(epsilon).update(grupo[coluna])
+        for tipo, grupo in com_aluguel.groupby('Tipo do domicílio', observed=True)
+        for coluna in HouseholdFeaturePipeline.COLUNAS_MEDIANA
+    }
+
+    return sketch_aluguel, sketches_medianas
+
+def sketchesLimites(caminho, pipeline, epsilon):
+
+    # Prepara a partição com as medianas e faixas globais e a guarda para a etapa final
+    df = pipeline._preparar(pd.read_parquet(caminho))
+    df.to_parquet(caminho)
+
+    numericas = pipeline._numericas(df)
+    return {coluna: KLLSketch(epsilon).update(df[coluna].to_numpy(dtype=float, na_value=np.nan)) for coluna in numericas}
+
+def aplicarLimites(caminho, pipeline):
+
+    # A partição final volta para o disco; o processo principal só recebe o resumo dos tipos
+    df = pipeline._limitar(pd.read_parquet(caminho))
+    df.to_parquet(caminho)
+
+    return part_dtypes(df)
+
+def combinar(sketches):
+
+    combinados = {}
+    for parcial in sketches:
+        for chave, sketch in parcial.items():
+            if chave in combinados:
+                combinados[chave].merge(sketch)
+            else:
+                combinados[chave] = sketch
+
+    return combinados
+
+def ETLParticionado(output_path, ler_particao, ufs, n_processos=None, epsilon=0.001, csv_path=None, diretorio=None):
+    """
+    Executa a extração, as conversões e a engenharia de features por UF, em um pool de
+    processos, e grava o conjunto processado partição a partição.
+
+    A memória de cada processo é a de uma UF (a maior delas) mais os sketches; o processo
+    principal nunca monta a base inteira. As linhas saem agrupadas por UF, na ordem de ufs.
+
+    Args:
+        output_path (str): Caminho do arquivo Arrow (ver save_processed_parts).
+        ler_particao (callable): Lê os domicílios de uma UF, com a UF no argumento nomeado
+                                 uf (ex: partial(lerDados, db_params, ...)). Precisa poder
+                                 ser enviada aos processos (pickle). Cada processo abre as
+                                 próprias conexões.
+        ufs (list): Códigos das UFs, uma partição por UF.
+        n_processos (int): Número de processos (None usa todos os núcleos).
+        epsilon (float): Erro de rank dos sketches de quantis (ver KLLSketch).
+        csv_path (str): Se informado, também exporta o CSV nesse caminho.
+        diretorio (str): Diretório para as partições intermediárias. Se None,
+                         usa um diretório temporário, apagado ao final.
+
+    Returns:
+        tuple: O HouseholdFeaturePipeline com os parâmetros globais estimados e o
+               número de linhas gravadas.
+    """
+
+    with tempfile.TemporaryDirectory(dir=diretorio) as temporario:
+        caminhos = [os.path.join(temporario, f'particao_{i}.parquet') for i in range(len(ufs))]
+
+        with ProcessPoolExecutor(max_workers=n_processos) as executor:
+            # 1. Extração e conversões; faixas do aluguel e medianas de imputação
+            resultados = list(executor.map(extrairParticao, [ler_particao] * len(ufs), ufs, caminhos,
+                                           [epsilon] * len(ufs)))
+            sketch_aluguel = combinar({'aluguel': aluguel} for aluguel, _ in resultados)['aluguel']
+            sketches_medianas = combinar(medianas for _, medianas in resultados)
+
+            pipeline = HouseholdFeaturePipeline()
+            limites = np.asarray(sketch_aluguel.quantile(np.linspace(0, 1, 6)))
+            if len(np.unique(limites)) != len(limites):
+                raise ValueError("Os limites das faixas do aluguel estimado não são únicos.")
+            limites[0], limites[-1] = -np.inf, np.inf
+            pipeline.limites_faixas_ = limites
+
+            medianas = pd.Series({chave: sketch.quantile(0.5) for chave, sketch in sketches_medianas.items()}, dtype=float)
+            pipeline.medianas_ = medianas.unstack().reindex(columns=HouseholdFeaturePipeline.COLUNAS_MEDIANA)
+            pipeline.medianas_.index.name = 'Tipo do domicílio'
+
+            # 2. Limites superiores (Q3 + 1.5 * IQR) sobre as partições já imputadas
+            sketches_limites = combinar(executor.map(sketchesLimites, caminhos, [pipeline] * len(caminhos),
+                                                     [epsilon] * len(caminhos)))
+            quartis = pd.DataFrame({coluna: sketch.quantile([0.25, 0.75]) for coluna, sketch in sketches_limites.items()},
+                                   index=[0.25, 0.75])
+            Q1, Q3 = quartis.loc[0.25], quartis.loc[0.75]
+            pipeline.limites_superiores_ = np.ceil(Q3 + (1.5 * (Q3 - Q1)))
+
+            # 3. Aplicação dos limites em cada partição
+            tipos = list(executor.map(aplicarLimites, caminhos, [pipeline] * len(caminhos)))
+
+        # 4. Gravação partição a partição, com os tipos unificados entre as partições
+        linhas = save_processed_parts(caminhos, tipos, output_path, csv_path)
+
+    return pipeline, linhas
@@ -0,0 +1,85 @@
+import json
+import sqlite3
+import hashlib
+import numpy as np
+import pandas as pd
+from typing import List, Optional, Sequence
+from sklearn.base import BaseEstimator
+
+class FoldScoreCache:
+    """
+    Cache persistente (SQLite) dos scores de validação cruzada da seleção de features.
+
+    Cada linha guarda o score de um fold, identificado pelo estimador (classe e
+    parâmetros), pela métrica, pela impressão digital dos dados, pelos índices de
+    treino e teste do fold e pelo subconjunto de colunas. Assim, um mesmo ajuste não é
+    refeito entre execuções interrompidas, valores de k ou métodos diferentes.
+
+    Estimadores com random_state=None não são determinísticos: o cache devolve o score
+    da primeira execução.
+
+    Atributos:
+        path (str): Arquivo do banco SQLite.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        with self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS fold_scores ('
+                               'estimator TEXT, scoring TEXT, data TEXT, fold TEXT, subset TEXT, score REAL, '
+                               'PRIMARY KEY (estimator, scoring, data, fold, subset))')
+
+    @staticmethod
+    def estimator_key(model: BaseEstimator) -> str:
+        """Classe e parâmetros do estimador (inclusive os de estimadores aninhados)."""
+        params = sorted((name, repr(value)) for name, value in model.get_params(deep=True).items())
+        return _digest(f'{type(model).__module__}.{type(model).__qualname__}', params)
+
+    @staticmethod
+    def data_key(X: pd.DataFrame, y: pd.Series) -> str:
+        """Impressão digital dos dados: nomes, tipos e valores de X e y, inclusive os índices."""
+        hashes = pd.util.hash_pandas_object(pd.concat([X, y], axis=1), index=True).to_numpy()
+        return _digest([str(column) for column in X.columns] + [str(y.name)],
+                       [str(dtype) for dtype in X.dtypes], hashlib.sha256(hashes.tobytes()).hexdigest())
+
+    @staticmethod
+    def fold_keys(splits: Sequence) -> List[str]:
+        """Uma chave por fold, a partir dos índices de treino e de teste."""
+        return [hashlib.sha256(np.asarray(train, dtype=np.int64).tobytes() + b'|' +
+                               np.asarray(test, dtype=np.int64).tobytes()).hexdigest()
+                for train, test in splits]
+
+    @staticmethod
+    def subset_key(columns: Sequence[str]) -> str:
+        return _digest([str(column) for column in columns])
+
+    def get(self, estimator: str, scoring: str, data: str, folds: List[str], subset: str) -> Optional[np.ndarray]:
+        """Scores de todos os folds, ou None se algum deles ainda não estiver no cache."""
+        placeholders = ', '.join('?' * len(folds))
+        rows = dict(self._conn.execute(
+            f'SELECT fold, score FROM fold_scores WHERE estimator = ? AND scoring = ? AND data = ? AND subset = ? '
+            f'AND fold IN ({placeholders})', [estimator, scoring, data, subset] + list(folds)).fetchall())
+        if len(rows) < len(set(folds)):
+            return None
+
+        return np.array([rows[fold] for fold in folds])
+
+    def put(self, estimator: str, scoring: str, data: str, folds: List[str], subset: str, scores: Sequence[float]) -> None:
+        """Grava os scores de cada fold; a transação é confirmada na hora, para sobreviver a interrupções."""
+        with self._conn:
+            self._conn.executemany('INSERT OR REPLACE INTO fold_scores VALUES (?, ?, ?, ?, ?, ?)',
+                                   [(estimator, scoring, data, fold, subset, float(score))
+                                    for fold, score in zip(folds, scores)])
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> 'FoldScoreCache':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def _digest(*parts) -> str:
+    return hashlib.sha256(json.dumps(parts, default=str).encode('utf-8')).hexdigest()
@@ -0,0 +1,303 @@
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+from scripts.ETL import VIEWS_POF
+
+# Gerador de dados sintéticos com o formato das views do schema POF_2018: mesmas views,
+# mesmas colunas e cardinalidades próximas às da POF 2017-2018 (vários itens de despesa
+# por domicílio, mais de uma unidade de consumo em alguns domicílios, sentinelas de
+# valor ignorado no aluguel estimado). Os valores são aleatórios, mas reprodutíveis
+# pela semente, e servem para executar e medir o ETL sem o servidor PostgreSQL.
+
+# Domicílios gerados na escala 1x: o tamanho da POF 2017-2018 (cerca de 58 mil domicílios).
+# Escalas fracionárias (ex: 0.02) geram bancos pequenos para testes rápidos
+DOMICILIOS_POR_ESCALA = 58000
+
+# Domicílios por UPA (unidade primária de amostragem)
+DOMICILIOS_POR_UPA = 12
+
+# Códigos IBGE das 27 UFs, que formam os dois primeiros dígitos do cod_upa
+UFS = ['11', '12', '13', '14', '15', '16', '17', '21', '22', '23', '24', '25', '26', '27', '28', '29',
+       '31', '32', '33', '35', '41', '42', '43', '50', '51', '52', '53']
+
+# Média de linhas por domicílio nas views com vários registros por domicílio
+ITENS_POR_DOMICILIO = {
+    'caderneta_coletiva': 15,
+    'despesa_individual': 40,
+    'despesa_coletiva': 25,
+    'rendimento_trabalho': 1.6,
+    'caracteristica_dieta': 3
+}
+
+# Frações de domicílios com duas unidades de consumo e de aluguéis com valor ignorado
+FRACAO_DUAS_UCS = 0.01
+FRACAO_SEM_ALUGUEL = 0.08
+SENTINELAS_ALUGUEL = {9999999.99: 0.02, 99999.00: 0.01}
+
+# Respostas da View_Domicilio, na ordem das colunas: probabilidade de cada código
+# ('1', '2', ...). As perguntas de sim/não usam '1' para sim e '2' para não.
+RESPOSTAS_DOMICILIO = {
+    'v0201': [0.86, 0.13, 0.01],
+    'v0202': [0.70, 0.05, 0.10, 0.05, 0.03, 0.02, 0.02, 0.02, 0.01],
+    'v0203': [0.45, 0.30, 0.15, 0.04, 0.03, 0.02, 0.01],
+    'v0204': [0.60, 0.15, 0.15, 0.05, 0.03, 0.02],
+    'v0205': None,
+    'v0206': None,
+    'v0207': [0.85, 0.07, 0.03, 0.02, 0.02, 0.01],
+    'v0208': [0.80, 0.15, 0.05],
+    'v0209': [0.90, 0.07, 0.03],
+    'v02101': [0.40, 0.60],
+    'v02102': [0.10, 0.90],
+    'v02103': [0.05, 0.95],
+    'v02104': [0.03, 0.97],
+    'v02105': [0.02, 0.98],
+    'v0211': None,
+    'v0212': None,
+    'v0213': None,
+    'v0214': [0.65, 0.10, 0.15, 0.05, 0.03, 0.02],
+    'v0215': [0.80, 0.10, 0.05, 0.03, 0.01, 0.01],
+    'v02161': [0.99, 0.01],
+    'v02162': [0.03, 0.97],
+    'v02163': [0.95, 0.04, 0.01],
+    'v02171': [0.90, 0.10],
+    'v02172': [0.20, 0.80],
+    'v02173': [0.05, 0.95],
+    'v02174': [0.03, 0.97],
+    'v0218': [0.65, 0.05, 0.18, 0.09, 0.02, 0.005, 0.005],
+    'v0219': None,
+    'v0220': [0.70, 0.30],
+    'v0221': [0.70, 0.20, 0.10],
+    'v6199': [0.63, 0.21, 0.10, 0.06]
+}
+
+COLUNAS_RENDIMENTO = ['cod_upa', 'num_dom', 'cod_informante', 'quadro', 'sub_quadro', 'seq', 'v9001', 'v5302',
+                      'v53021', 'v5303', 'v5304', 'v5305', 'v5307', 'v8500', 'v531112', 'v531122', 'v531132',
+                      'v9010', 'v9011', 'v5314', 'v5315', 'deflator', 'v8500_defla', 'v531112_defla',
+                      'v531122_defla', 'v531132_defla', 'cod_imput_valor', 'fator_anualizacao',
+                      'cod_ocup_final', 'cod_cnae']
+
+def respostas(rng, n, probabilidades):
+
+    probabilidades = np.asarray(probabilidades, dtype=float)
+    codigos = np.array([str(codigo) for codigo in range(1, len(probabilidades) + 1)], dtype=object)
+
+    return codigos[rng.choice(len(probabilidades), n, p=probabilidades / probabilidades.sum())]
+
+def textos(valores):
+
+    return np.array([str(valor) for valor in valores], dtype=object)
+
+def valores(rng, n, mediana, dispersao=0.8):
+
+    # Valores monetários com distribuição log-normal, arredondados em centavos
+    return np.round(rng.lognormal(np.log(mediana), dispersao, n), 2)
+
+def gerarChaves(rng, inicio, n):
+
+    # Domicílios numerados em sequência dentro de cada UPA; a UPA define a UF
+    posicao = np.arange(inicio, inicio + n)
+    upa, num_dom = np.divmod(posicao, DOMICILIOS_POR_UPA)
+    uf = np.array(UFS, dtype=object)[upa % len(UFS)]
+
+    chaves = pd.DataFrame({
+        'cod_upa': uf + textos(1000000 + upa),
+        'num_dom': textos(num_dom + 1),
+        'uf': uf,
+        'estrato_pof': uf + textos(10 + upa % 20)
+    })
+    chaves['num_uc'] = np.where(rng.random(n) < FRACAO_DUAS_UCS, 2, 1)
+
+    return chaves
+
+def gerarDomicilio(rng, chaves):
+
+    n = len(chaves)
+    df = chaves[['cod_upa', 'num_dom', 'uf', 'estrato_pof']].copy()
+    df['tipo_situacao_reg'] = respostas(rng, n, [0.8, 0.2])
+
+    comodos = np.clip(rng.poisson(5, n), 1, 20)
+    dormitorios = np.minimum(np.clip(rng.poisson(2, n), 1, 10), comodos)
+    banheiros = np.clip(rng.poisson(1.2, n), 0, 8)
+    sem_banheiro = banheiros == 0
+
+    especiais = {
+        'v0205': textos(comodos),
+        'v0206': textos(dormitorios),
+        'v0211': textos(banheiros),
+        # Banheiro de uso comum e sanitário só são perguntados a quem não tem banheiro exclusivo
+        'v0212': np.where(sem_banheiro, textos(rng.integers(1, 4, n)), None),
+        'v0213': np.where(sem_banheiro, respostas(rng, n, [0.6, 0.4]), None)
+    }
+    for coluna, probabilidades in RESPOSTAS_DOMICILIO.items():
+        if probabilidades is None:
+            df[coluna] = especiais.get(coluna)
+        else:
+            df[coluna] = respostas(rng, n, probabilidades)
+
+    # O tipo de contrato só existe para domicílios alugados
+    df['v0219'] = np.where(df['v0218'] == '3', respostas(rng, n, [0.5, 0.5]), None)
+
+    return df
+
+def gerarAluguelEstimado(rng, chaves):
+
+    # Uma linha por unidade de consumo: domicílios com duas UCs repetem a chave
+    df = chaves.loc[chaves.index.repeat(chaves['num_uc']), ['cod_upa', 'num_dom']].reset_index(drop=True)
+    df['num_uc'] = textos(df.groupby(['cod_upa', 'num_dom']).cumcount() + 1)
+    df = df.loc[rng.random(len(df)) >= FRACAO_SEM_ALUGUEL].reset_index(drop=True)
+
+    df['v8000'] = valores(rng, len(df), 800)
+    sorteio = rng.random(len(df))
+    limite = 0.0
+    for sentinela, fracao in SENTINELAS_ALUGUEL.items():
+        df.loc[(sorteio >= limite) & (sorteio < limite + fracao), 'v8000'] = sentinela
+        limite += fracao
+
+    return df
+
+def gerarItens(rng, chaves, nome):
+
+    # Número de itens por domicílio com média ITENS_POR_DOMICILIO[nome]
+    quantidades = rng.poisson(ITENS_POR_DOMICILIO[nome], len(chaves))
+    df = chaves.loc[chaves.index.repeat(quantidades), ['cod_upa', 'num_dom']].reset_index(drop=True)
+    df['num_uc'] = '1'
+    df['seq'] = textos(df.groupby(['cod_upa', 'num_dom']).cumcount() + 1)
+
+    return df
+
+def gerarDespesa(rng, chaves, nome, mediana):
+
+    df = gerarItens(rng, chaves, nome)
+    n = len(df)
+    if nome == 'despesa_individual':
+        df['cod_informante'] = textos(rng.integers(1, 5, n))
+    df['quadro'] = textos(rng.integers(6, 50, n))
+    df['v9001'] = textos(rng.integers(100000, 9999999, n))
+    df['v8000'] = valores(rng, n, mediana, 1.2)
+    df['fator_anualizacao'] = rng.choice([1, 4, 12, 52], n)
+    df['deflator'] = np.round(rng.uniform(0.98, 1.06, n), 6)
+    df['v8000_defla'] = np.round(df['v8000'] * df['deflator'], 2)
+
+    return df
+
+def gerarRendimentoTrabalho(rng, chaves):
+
+    df = gerarItens(rng, chaves, 'rendimento_trabalho')
+    n = len(df)
+    df['cod_informante'] = textos(rng.integers(1, 5, n))
+    df['quadro'] = '53'
+    df['sub_quadro'] = textos(rng.integers(1, 3, n))
+    df['v9001'] = textos(rng.integers(5300101, 5300999, n))
+    for coluna, probabilidades in {'v5302': [0.5, 0.05, 0.2, 0.2, 0.05], 'v53021': [0.5, 0.5],
+                                   'v5303': [0.15, 0.85], 'v5304': [0.6, 0.4], 'v5305': [0.65, 0.35],
+                                   'v5307': [0.8, 0.15, 0.05]}.items():
+        df[coluna] = respostas(rng, n, probabilidades)
+    df.loc[df['v5302'] != '3', 'v53021'] = None
+
+    # Rendimento bruto e deduções: a previdência é proporcional ao rendimento e os impostos
+    # só aparecem em parte dos registros (nulos nos demais)
+    df['v8500'] = valores(rng, n, 2500, 0.9)
+    df['v531112'] = np.where(df['v5305'] == '1', np.round(df['v8500'] * 0.11, 2), np.nan)
+    df['v531122'] = np.where(df['v8500'] > 4000, np.round(df['v8500'] * rng.uniform(0.05, 0.2, n), 2), np.nan)
+    df['v531132'] = np.where(rng.random(n) < 0.03, valores(rng, n, 150), np.nan)
+    df['v9010'] = textos(rng.integers(1, 13, n))
+    df['v9011'] = textos(rng.integers(1, 13, n))
+    df['v5314'] = textos(np.clip(rng.normal(40, 10, n).round(), 1, 98).astype(int))
+    df['v5315'] = respostas(rng, n, [0.3, 0.4, 0.2, 0.1])
+    df['deflator'] = np.round(rng.uniform(0.98, 1.06, n), 6)
+    for coluna in ['v8500', 'v531112', 'v531122', 'v531132']:
+        df[coluna + '_defla'] = np.round(df[coluna] * df['deflator'], 2)
+    df['cod_imput_valor'] = respostas(rng, n, [0.9, 0.1])
+    df['fator_anualizacao'] = 12
+    df['cod_ocup_final'] = textos(rng.integers(1000, 9999, n))
+    df['cod_cnae'] = textos(rng.integers(1000, 99999, n))
+
+    return df[COLUNAS_RENDIMENTO]
+
+def gerarCondicoesVida(rng, chaves):
+
+    # Uma linha por unidade de consumo, respondida pela pessoa de referência
+    df = chaves.loc[chaves.index.repeat(chaves['num_uc']), ['cod_upa', 'num_dom']].reset_index(drop=True)
+    n = len(df)
+    df['num_uc'] = textos(df.groupby(['cod_upa', 'num_dom']).cumcount() + 1)
+    df['cod_informante'] = '1'
+    df['v6101'] = respostas(rng, n, [0.3, 0.4, 0.3])
+    df['v6102'] = np.where(rng.random(n) < 0.05, np.nan, np.round(valores(rng, n, 2000), -1))
+    df['v6103'] = np.where(rng.random(n) < 0.05, np.nan, np.round(valores(rng, n, 700), -1))
+    df['v6104'] = respostas(rng, n, [0.5, 0.3, 0.2])
+
+    return df
+
+def gerarCaracteristicaDieta(rng, chaves):
+
+    df = gerarItens(rng, chaves, 'caracteristica_dieta').rename(columns={'seq': 'cod_informante'})
+    n = len(df)
+    for coluna, probabilidades in {'v7101': [0.2, 0.8], 'v7102': [0.1, 0.9], 'v7103': [0.05, 0.95],
+                                   'v7104': [0.03, 0.97]}.items():
+        df[coluna] = respostas(rng, n, probabilidades)
+
+    return df
+
+def gerarViews(rng, chaves):
+    """
+    Gera as oito views do POF_2018 para um bloco de domicílios.
+
+    Args:
+        rng (np.random.Generator): Gerador de números aleatórios do bloco.
+        chaves (pd.DataFrame): Domicílios do bloco (ver gerarChaves).
+
+    Returns:
+        dict: DataFrames indexados pelas chaves de VIEWS_POF.
+    """
+
+    return {
+        'rendimento_trabalho': gerarRendimentoTrabalho(rng, chaves),
+        'domicilio': gerarDomicilio(rng, chaves),
+        'aluguel_estimado': gerarAluguelEstimado(rng, chaves),
+        'caderneta_coletiva': gerarDespesa(rng, chaves, 'caderneta_coletiva', 12),
+        'caracteristica_dieta': gerarCaracteristicaDieta(rng, chaves),
+        'condicoes_vida': gerarCondicoesVida(rng, chaves),
+        'despesa_individual': gerarDespesa(rng, chaves, 'despesa_individual', 35),
+        'despesa_coletiva': gerarDespesa(rng, chaves, 'despesa_coletiva', 120)
+    }
+
+def criarBancoSQLite(caminho, escala=1, seed=42, tamanho_bloco=20000):
+    """
+    Gera as views do POF_2018 na escala pedida e as grava em um banco SQLite, que pode
+    substituir o PostgreSQL no ETL com db_params = {'sqlite': caminho}.
+
+    Os domicílios são gerados em blocos de tamanho_bloco, cada um com a sua própria
+    semente derivada de seed, de modo que a memória não cresce com a escala e o mesmo
+    (escala, seed) sempre gera o mesmo banco.
+
+    Args:
+        caminho (str): Arquivo do banco SQLite (sobrescrito se existir).
+        escala (float): Fator de escala; a escala 1 tem DOMICILIOS_POR_ESCALA domicílios,
+                        como a POF real.
+        seed (int): Semente dos dados gerados.
+        tamanho_bloco (int): Domicílios gerados e gravados por vez.
+
+    Returns:
+        dict: Número de linhas gravadas em cada view.
+    """
+    if os.path.exists(caminho):
+        os.remove(caminho)
+    os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+
+    total = int(DOMICILIOS_POR_ESCALA * escala)
+    linhas = dict.fromkeys(VIEWS_POF, 0)
+
+    conn = sqlite3.connect(caminho)
+    try:
+        for bloco, inicio in enumerate(range(0, total, tamanho_bloco)):
+            rng = np.random.default_rng([seed, bloco])
+            chaves = gerarChaves(rng, inicio, min(tamanho_bloco, total - inicio))
+            for nome, df in gerarViews(rng, chaves).items():
+                df.to_sql(VIEWS_POF[nome], conn, if_exists='append', index=False)
+                linhas[nome] += len(df)
+            conn.commit()
+    finally:
+        conn.close()
+
+    return linhas
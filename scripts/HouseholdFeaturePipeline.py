@@ -0,0 +1,212 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from sklearn.exceptions import NotFittedError
+
+class HouseholdFeaturePipeline:
+    """
+    Conversão de tipos e engenharia de features do df_pof_domicilio como um objeto
+    treinável, no estilo fit/transform do Scikit-learn.
+
+    O fit aprende, a partir da base completa, as estatísticas globais do tratamento:
+    as medianas por 'Tipo do domicílio' usadas na imputação, os limites superiores
+    (Q3 + 1.5 * IQR) de cada variável numérica e os limites das faixas (quintis) do
+    'Aluguel Estimado'. O transform só aplica esses parâmetros, em tempo proporcional
+    ao lote, o que permite processar novos domicílios sem refazer o ETL inteiro.
+
+    Atributos:
+        medianas_ (pd.DataFrame): Medianas de imputação, com os tipos de domicílio como linhas.
+        limites_superiores_ (pd.Series): Limite superior de cada variável numérica.
+        limites_faixas_ (np.ndarray): Limites das faixas do aluguel, com -inf e +inf nas pontas.
+    """
+
+    NOMES_FAIXAS = ['1 - Muito Baixo', '2 - Baixo', '3 - Médio', '4 - Alto', '5 - Muito Alto']
+    SENTINELA_ALUGUEL = 9999999.99
+    COLUNAS_MEDIANA = ['Valor em reais (R$) de despesa realizada', 'Valor em reais (R$) do rendimento bruto']
+    COLUNAS_DESCARTADAS = ['Valor em reais (R$) da dedução com previdência pública',
+                           'Valor em reais (R$) da dedução com imposto de renda',
+                           'Valor em reais (R$) da dedução com iss e outros impostos']
+    COLUNAS_INT = ['Qtd de cômodos',
+                   'Qtd de cômodos dormitórios',
+                   'Qtd de banheiros exclusivos',
+                   'Qtd de banheiros de uso comum']
+    COLUNAS_SIM_NAO = ['A água é aquecida por energia elétrica?',
+                       'A água é aquecida por gás?',
+                       'A água é aquecida por energia solar?',
+                       'A água é aquecida por lenha ou carvão?',
+                       'A água é aquecida por outra forma?',
+                       'Utiliza sanitário ou buraco para dejeções?',
+                       'Energia elétrica é de rede geral?',
+                       'Rede elétrica proveniente de outra origem?',
+                       'Utiliza-se gás butijão na preparação de alimentos?',
+                       'Utiliza-se lenha ou carvão na preparação de alimentos?',
+                       'Utiliza-se energia elétrica na preparação de alimentos?',
+                       'Utiliza-se outro combustível na preparação de alimentos?',
+                       'A rua onde se localiza é pavimentada?']
+    # Chaves e perguntas de sim/não são numéricas, mas não são medidas: ficam sem limite de outliers
+    COLUNAS_SEM_LIMITE = ['cod_upa', 'num_dom'] + COLUNAS_SIM_NAO
+    COLUNAS_FLOAT = ['Valor em reais (R$) do rendimento bruto',
+                     'Valor em reais (R$) da dedução com previdência pública',
+                     'Valor em reais (R$) da dedução com imposto de renda',
+                     'Valor em reais (R$) da dedução com iss e outros impostos',
+                     'Valor em reais (R$) de despesa realizada',
+                     'Valor em reais (R$) de despesa individual',
+                     'Valor em reais (R$) de despesa coletiva',
+                     'Aluguel Estimado',
+                     'Rendimento mensal mínimo geral (R$)',
+                     'Rendimento mensal mínimo p\\ alimentação (R$)']
+
+    def __init__(self):
+        self.medianas_ = None
+        self.limites_superiores_ = None
+        self.limites_faixas_ = None
+
+    @classmethod
+    def converter_tipos(cls, df):
+        """
+        Converte as colunas de contagem para Int64 e as de valores para float,
+        transformando valores inválidos em nulos.
+        """
+        for col in cls.COLUNAS_INT:
+            if pd.api.types.is_integer_dtype(df[col]):
+                # Já convertida (e reduzida) na extração, pelo esquema do ETL
+                continue
+            # Primeiro, converte para numérico, transformando erros em Nulos (NaN)
+            temp_col = pd.to_numeric(df[col], errors='coerce')
+            # Depois, converte para o tipo Int64, que suporta nulos
+            df[col] = temp_col.astype('Int64')
+
+        for col in cls.COLUNAS_FLOAT:
+            # Apenas converter para numérico é suficiente, pois float já suporta NaN
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+
+        return df
+
+    def fit(self, X, y=None):
+        """
+        Aprende as medianas, os limites superiores e os limites das faixas.
+
+        Parâmetros:
+        ----------
+        X : pd.DataFrame
+            O df_pof_domicilio produzido por lerDados (ou já convertido).
+        y : Ignorado
+            Não é utilizado, presente para compatibilidade com a API do Scikit-learn.
+
+        Retorna:
+        -------
+        self : object
+            Retorna a própria instância da classe.
+        """
+        self._ajustar(X)
+        return self
+
+    def transform(self, X):
+        """
+        Aplica a conversão de tipos e os parâmetros aprendidos a um lote de domicílios.
+
+        Parâmetros:
+        ----------
+        X : pd.DataFrame
+            Domicílios no formato produzido por lerDados.
+
+        Retorna:
+        -------
+        df : pd.DataFrame
+            Os domicílios tratados, com a coluna 'Aluguel Estimado (Faixa)'.
+        """
+        if self.limites_superiores_ is None:
+            raise NotFittedError("Esta instância de HouseholdFeaturePipeline não foi treinada. Chame 'fit' primeiro.")
+
+        df = self._preparar(self.converter_tipos(X.copy(deep=False)))
+        return self._limitar(df)
+
+    def fit_transform(self, X, y=None):
+        """Aprende os parâmetros e trata a mesma base, sem repetir a preparação."""
+        return self._limitar(self._ajustar(X))
+
+    def _ajustar(self, X):
+        df = self.converter_tipos(X.copy(deep=False))
+
+        # 1. Faixas e medianas são aprendidas sobre os domicílios com aluguel estimado
+        aluguel = df['Aluguel Estimado'].replace(self.SENTINELA_ALUGUEL, np.nan)
+        com_aluguel = aluguel.notna()
+
+        _, limites = pd.qcut(aluguel[com_aluguel], q=5, labels=self.NOMES_FAIXAS, retbins=True, duplicates='drop')
+        # As pontas abertas mantêm em uma faixa os lotes futuros fora do intervalo do treino
+        limites[0], limites[-1] = -np.inf, np.inf
+        self.limites_faixas_ = limites
+
+        tipos = df.loc[com_aluguel, 'Tipo do domicílio']
+        self.medianas_ = df.loc[com_aluguel, self.COLUNAS_MEDIANA].groupby(tipos, observed=True).median()
+
+        # 2. Os limites superiores são calculados sobre a base já imputada e filtrada
+        df = self._preparar(df)
+        numericas = self._numericas(df)
+        quartis = df[numericas].quantile([0.25, 0.75]).astype(float)
+        Q1, Q3 = quartis.loc[0.25], quartis.loc[0.75]
+        self.limites_superiores_ = np.ceil(Q3 + (1.5 * (Q3 - Q1)))
+
+        return df
+
+    def _preparar(self, df):
+        aluguel = df['Aluguel Estimado'].replace(self.SENTINELA_ALUGUEL, np.nan)
+
+        # Um único recorte de linhas e colunas, em vez de dropna/drop sobre cópias sucessivas
+        mantidos = (aluguel.notna()
+                    & df['Valor em reais (R$) de despesa individual'].notna()
+                    & df['Valor em reais (R$) de despesa coletiva'].notna())
+        df = df.loc[mantidos, df.columns.difference(self.COLUNAS_DESCARTADAS, sort=False)].copy()
+
+        df['Aluguel Estimado'] = aluguel[mantidos]
+        df['Aluguel Estimado (Faixa)'] = pd.cut(df['Aluguel Estimado'], self.limites_faixas_, labels=self.NOMES_FAIXAS,
+                                                include_lowest=True).astype(str)
+        df['Qtd de banheiros de uso comum'] = df['Qtd de banheiros de uso comum'].fillna(0)
+
+        # Medianas preenchidas por alinhamento de índice, sem uma função por grupo
+        df[self.COLUNAS_MEDIANA] = df[self.COLUNAS_MEDIANA].fillna(
+            self.medianas_.reindex(df['Tipo do domicílio']).set_axis(df.index))
+
+        return df
+
+    def _numericas(self, df):
+        return df.select_dtypes(include=np.number).columns.difference(self.COLUNAS_SEM_LIMITE, sort=False)
+
+    def _limitar(self, df):
+        # Substitui os outliers pelo limite superior, em um único clip sobre o bloco numérico
+        numericas = self.limites_superiores_.index.intersection(df.columns)
+        df[numericas] = df[numericas].clip(upper=self.limites_superiores_[numericas], axis=1)
+
+        return df
+
+    def save(self, path):
+        """Grava os parâmetros aprendidos em JSON."""
+        if self.limites_superiores_ is None:
+            raise NotFittedError("Esta instância de HouseholdFeaturePipeline não foi treinada. Chame 'fit' primeiro.")
+
+        parametros = {
+            'limites_faixas': self.limites_faixas_.tolist(),
+            'medianas': {
+                'tipos': self.medianas_.index.tolist(),
+                'valores': {coluna: self.medianas_[coluna].tolist() for coluna in self.medianas_.columns}
+            },
+            'limites_superiores': {coluna: float(valor) for coluna, valor in self.limites_superiores_.items()}
+        }
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as arquivo:
+            json.dump(parametros, arquivo, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        """Cria um pipeline já treinado a partir dos parâmetros gravados por save."""
+        with open(path, encoding='utf-8') as arquivo:
+            parametros = json.load(arquivo)
+
+        pipeline = cls()
+        pipeline.limites_faixas_ = np.array(parametros['limites_faixas'], dtype=float)
+        pipeline.medianas_ = pd.DataFrame(parametros['medianas']['valores'],
+                                          index=pd.Index(parametros['medianas']['tipos'], name='Tipo do domicílio'))
+        pipeline.limites_superiores_ = pd.Series(parametros['limites_superiores'], dtype=float)
+
+        return pipeline
@@ -0,0 +1,104 @@
+import numpy as np
+
+class KLLSketch:
+    """
+    Sketch de quantis KLL (Karnin, Lang e Liberty), que pode ser combinado (merge).
+
+    Cada partição dos dados alimenta o seu próprio sketch; os sketches são depois
+    combinados para estimar quantis globais sem reunir os dados em um só processo.
+    O erro de rank é de aproximadamente epsilon (com alta probabilidade); enquanto o
+    total de valores não excede a capacidade do sketch, os quantis são exatos e
+    coincidem com a interpolação linear do pandas.
+
+    Atributos:
+        epsilon (float): Erro de rank desejado (ex: 0.001 para 0,1%).
+        k (int): Capacidade do compactador de nível mais alto, derivada de epsilon.
+        n (int): Número de valores (não nulos) já vistos.
+    """
+    C = 2.0 / 3.0
+
+    def __init__(self, epsilon: float = 0.001, seed: int = 42):
+        if not 0 < epsilon < 1:
+            raise ValueError("epsilon deve estar entre 0 e 1.")
+
+        self.epsilon = epsilon
+        self.k = max(8, int(np.ceil(1.65 / epsilon)))
+        self.n = 0
+        self.compactadores = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, valores) -> 'KLLSketch':
+        """Adiciona um lote de valores ao sketch, ignorando os nulos."""
+        valores = np.asarray(valores, dtype=float).ravel()
+        valores = valores[~np.isnan(valores)]
+
+        self.n += len(valores)
+        self.compactadores[0] = np.concatenate([self.compactadores[0], valores])
+        self._compactar()
+
+        return self
+
+    def merge(self, outro: 'KLLSketch') -> 'KLLSketch':
+        """Incorpora outro sketch (com o mesmo epsilon) a este."""
+        if outro.k != self.k:
+            raise ValueError("Só é possível combinar sketches com o mesmo epsilon.")
+
+        while len(self.compactadores) < len(outro.compactadores):
+            self.compactadores.append(np.empty(0))
+        for nivel, itens in enumerate(outro.compactadores):
+            self.compactadores[nivel] = np.concatenate([self.compactadores[nivel], itens])
+
+        self.n += outro.n
+        self._compactar()
+
+        return self
+
+    def quantile(self, q):
+        """
+        Estima o(s) quantil(is) q, com q entre 0 e 1.
+
+        Retorna NaN se o sketch estiver vazio.
+        """
+        q = np.asarray(q, dtype=float)
+        if self.n == 0:
+            return np.full(q.shape, np.nan) if q.ndim else np.nan
+
+        if len(self.compactadores) == 1:
+            # Nenhuma compactação ainda: os valores estão todos guardados
+            return np.quantile(self.compactadores[0], q)
+
+        itens = np.concatenate(self.compactadores)
+        pesos = np.concatenate([np.full(len(c), 2.0 ** nivel) for nivel, c in enumerate(self.compactadores)])
+        ordem = np.argsort(itens, kind='stable')
+        itens, acumulado = itens[ordem], np.cumsum(pesos[ordem])
+
+        posicoes = np.searchsorted(acumulado, q * acumulado[-1], side='left')
+        return itens[np.minimum(posicoes, len(itens) - 1)]
+
+    def _capacidade(self, nivel: int) -> int:
+        altura = len(self.compactadores)
+        return max(2, int(np.ceil(self.k * self.C ** (altura - nivel - 1))))
+
+    def _compactar(self) -> None:
+        nivel = 0
+        while nivel < len(self.compactadores):
+            itens = self.compactadores[nivel]
+            if len(itens) <= self._capacidade(nivel):
+                nivel += 1
+                continue
+
+            if nivel + 1 == len(self.compactadores):
+                self.compactadores.append(np.empty(0))
+
+            # Ordena o compactador e promove, com peso dobrado, metade dos itens
+            # (os de posição par ou ímpar, sorteada); um item ímpar fica no nível
+            itens = np.sort(itens)
+            restante = itens[-1:] if len(itens) % 2 else itens[:0]
+            pares = itens[:len(itens) - len(restante)]
+            promovidos = pares[self._rng.integers(2)::2]
+
+            self.compactadores[nivel] = restante
+            self.compactadores[nivel + 1] = np.concatenate([self.compactadores[nivel + 1], promovidos])
+
+            # A altura pode ter mudado, e com ela as capacidades: recomeça do nível 0
+            nivel = 0
@@ -0,0 +1,281 @@
+import numpy as np
+from typing import List, Sequence
+from scipy.linalg import solve_triangular
+from sklearn.base import BaseEstimator
+from sklearn.linear_model import LinearRegression, Ridge
+
+def independent_basis(G: np.ndarray, order: Sequence[int], tol: float, alpha: float = 0.0):
+    """
+    Colunas linearmente independentes das anteriores, na ordem dada, e o fator de Cholesky
+    L (triangular inferior) de G[ativas, ativas] + alpha * I, montado coluna a coluna.
+
+    Uma coluna é dependente quando o quadrado do novo pivô não passa de tol vezes a sua
+    diagonal. É a regra única usada pelo LinearGramEngine e pelo BestSubsetSearch.
+    """
+    active, L = [], np.zeros((0, 0))
+    for j in order:
+        d = G[j, j] + alpha
+        w = solve_triangular(L, G[active, j], lower=True) if active else np.zeros(0)
+        s = d - w @ w
+        if d > 0 and s > tol * d:
+            k = len(active)
+            L = np.block([[L, np.zeros((k, 1))], [w[None, :], np.sqrt(s)]])
+            active.append(j)
+
+    return active, L
+
+class LinearGramEngine:
+    """
+    Validação cruzada em forma fechada para LinearRegression e Ridge.
+
+    Em vez de reajustar o modelo com o scikit-learn para cada candidata, a classe
+    calcula uma única vez, por fold, as estatísticas suficientes do treino (XᵀX e Xᵀy
+    centrados) e do teste. O score de um subconjunto de features sai da solução das
+    equações normais e de formas quadráticas sobre essas matrizes, sem voltar aos dados.
+
+    Todas as candidatas de um passo da busca sequencial são avaliadas de uma vez: a
+    partir da fatoração de Cholesky do conjunto atual, a inclusão de uma candidata é
+    uma atualização em bloco (complemento de Schur) e a remoção usa a inversa do
+    conjunto atual, ambas vetorizadas sobre as candidatas.
+
+    Colunas linearmente dependentes (sem regularização) não mudam as previsões; os
+    casos em que a atualização não é possível são resolvidos por mínimos quadrados
+    sobre as matrizes do fold, como faz o LinearRegression.
+
+    Atributos:
+        alpha (float): Regularização do Ridge (0 para LinearRegression).
+        fit_intercept (bool): Se o modelo ajusta o intercepto.
+        scoring (str): 'r2', 'neg_mean_squared_error' ou 'neg_root_mean_squared_error'.
+        n_folds (int): Número de folds.
+    """
+    SCORINGS = ('r2', 'neg_mean_squared_error', 'neg_root_mean_squared_error')
+    TOL = 1e-10
+
+    @classmethod
+    def supports(cls, model: BaseEstimator, scoring) -> bool:
+        """Indica se o modelo e a métrica podem ser avaliados em forma fechada."""
+        if scoring not in cls.SCORINGS:
+            return False
+        if type(model) is LinearRegression:
+            return not model.positive
+        if type(model) is Ridge:
+            return np.ndim(model.alpha) == 0 and not model.positive
+
+        return False
+
+    def __init__(self, model: BaseEstimator, X: np.ndarray, y: np.ndarray, splits: Sequence, scoring: str):
+        """
+        Pré-calcula as matrizes de cada fold.
+
+        Args:
+            model (BaseEstimator): Um LinearRegression ou Ridge (ver supports).
+            X (np.ndarray): Matriz de features (n x p).
+            y (np.ndarray): Variável alvo (n).
+            splits (Sequence): Pares (índices de treino, índices de teste), como os de check_cv(...).split.
+            scoring (str): A métrica da validação cruzada.
+        """
+        if not self.supports(model, scoring):
+            raise ValueError("LinearGramEngine só avalia LinearRegression e Ridge com as métricas "
+                             f"{', '.join(self.SCORINGS)}.")
+
+        self.alpha = float(model.alpha) if isinstance(model, Ridge) else 0.0
+        self.fit_intercept = model.fit_intercept
+        self.scoring = scoring
+        self.n_folds = len(splits)
+
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64).ravel()
+        p = X.shape[1]
+
+        self.G = np.empty((self.n_folds, p, p))
+        self.r = np.empty((self.n_folds, p))
+        self.H = np.empty((self.n_folds, p, p))
+        self.h = np.empty((self.n_folds, p))
+        self.q = np.empty(self.n_folds)
+        self.sst = np.empty(self.n_folds)
+        self.n_test = np.empty(self.n_folds)
+
+        for f, (train, test) in enumerate(splits):
+            X_train, y_train = X[train], y[train]
+            mean_x = X_train.mean(axis=0) if self.fit_intercept else np.zeros(p)
+            mean_y = y_train.mean() if self.fit_intercept else 0.0
+
+            # Treino centrado: a solução das equações normais dá os coeficientes e
+            # o intercepto é a média de y menos a média das previsões
+            X_train = X_train - mean_x
+            self.G[f] = X_train.T @ X_train
+            self.r[f] = X_train.T @ (y_train - mean_y)
+
+            # Teste centrado nas médias do treino: SSE = q - 2βᵀh + βᵀHβ
+            X_test = X[test] - mean_x
+            y_test = y[test] - mean_y
+            self.H[f] = X_test.T @ X_test
+            self.h[f] = X_test.T @ y_test
+            self.q[f] = y_test @ y_test
+            self.sst[f] = np.sum((y[test] - y[test].mean()) ** 2)
+            self.n_test[f] = len(test)
+
+    def score_subset(self, columns: Sequence[int]) -> float:
+        """Score médio da validação cruzada do modelo com as colunas informadas."""
+        columns = np.asarray(columns, dtype=int)
+        sse = np.array([self._sse_exact(f, columns) for f in range(self.n_folds)])
+
+        return float(self._scores(sse[:, None])[0])
+
+    def score_additions(self, selected: Sequence[int], candidates: List[Sequence[int]]) -> np.ndarray:
+        """
+        Score de cada candidata somada ao conjunto atual.
+
+        Args:
+            selected (Sequence[int]): Índices das colunas já selecionadas.
+            candidates (List[Sequence[int]]): Índices das colunas de cada candidata.
+
+        Returns:
+            np.ndarray: O score médio da validação cruzada de selected + candidata, para cada candidata.
+        """
+        sse = np.empty((self.n_folds, len(candidates)))
+        for f in range(self.n_folds):
+            sse[f] = self._sse_additions(f, list(selected), candidates)
+
+        return self._scores(sse)
+
+    def score_removals(self, selected: Sequence[int], candidates: List[Sequence[int]]) -> np.ndarray:
+        """
+        Score de cada candidata retirada do conjunto atual.
+
+        Args:
+            selected (Sequence[int]): Índices das colunas selecionadas.
+            candidates (List[Sequence[int]]): Índices (contidos em selected) das colunas de cada candidata.
+
+        Returns:
+            np.ndarray: O score médio da validação cruzada de selected - candidata, para cada candidata.
+        """
+        sse = np.empty((self.n_folds, len(candidates)))
+        for f in range(self.n_folds):
+            sse[f] = self._sse_removals(f, list(selected), candidates)
+
+        return self._scores(sse)
+
+    def _scores(self, sse: np.ndarray) -> np.ndarray:
+        # sse: (folds, candidatas). Mesmas métricas do scikit-learn, fold a fold, e a média
+        n_test = self.n_test[:, None]
+        if self.scoring == 'r2':
+            sst = self.sst[:, None]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                scores = np.where(sst > 0, 1 - sse / sst, np.where(sse == 0, 1.0, 0.0))
+        elif self.scoring == 'neg_mean_squared_error':
+            scores = -sse / n_test
+        else:
+            scores = -np.sqrt(sse / n_test)
+
+        return scores.mean(axis=0)
+
+    def _basis(self, f: int, selected: List[int]):
+        # Cholesky incremental do conjunto atual, pulando colunas dependentes das anteriores
+        return independent_basis(self.G[f], selected, self.TOL, self.alpha)
+
+    def _quadratic(self, f: int, beta: np.ndarray, columns: np.ndarray) -> float:
+        H, h = self.H[f], self.h[f]
+        return self.q[f] - 2 * beta @ h[columns] + beta @ H[np.ix_(columns, columns)] @ beta
+
+    def _sse_exact(self, f: int, columns: np.ndarray) -> float:
+        # Mínimos quadrados sobre as equações normais: para colunas dependentes, a solução
+        # de norma mínima dá as mesmas previsões do LinearRegression
+        if len(columns) == 0:
+            return self.q[f]
+
+        A = self.G[f][np.ix_(columns, columns)] + self.alpha * np.eye(len(columns))
+        beta = np.linalg.lstsq(A, self.r[f][columns], rcond=None)[0]
+
+        return self._quadratic(f, beta, columns)
+
+    def _sse_additions(self, f: int, selected: List[int], candidates: List[Sequence[int]]) -> np.ndarray:
+        G, r, H, h, alpha = self.G[f], self.r[f], self.H[f], self.h[f], self.alpha
+        active, L = self._basis(f, selected)
+        A = np.asarray(active, dtype=int)
+        k = len(A)
+
+        z = solve_triangular(L, r[A], lower=True) if k else np.zeros(0)
+        beta = solve_triangular(L.T, z, lower=False) if k else np.zeros(0)
+
+        sse = np.empty(len(candidates))
+        exact = []
+        # Candidatas com o mesmo número de colunas são resolvidas juntas, em lote
+        for size in sorted({len(candidate) for candidate in candidates}):
+            positions = [i for i, candidate in enumerate(candidates) if len(candidate) == size]
+            C = np.array([candidates[i] for i in positions], dtype=int).reshape(len(positions), size)
+            m = len(positions)
+
+            # W = L⁻¹ G[A, C] e o complemento de Schur de cada candidata
+            if k:
+                W = solve_triangular(L, G[np.ix_(A, C.ravel())], lower=True).reshape(k, m, size)
+            else:
+                W = np.zeros((0, m, size))
+            G_CC = G[C[:, :, None], C[:, None, :]] + alpha * np.eye(size)
+            schur = G_CC - np.einsum('kmi,kmj->mij', W, W)
+            rhs = r[C] - np.einsum('kmi,k->mi', W, z)
+
+            # Sem regularização, uma candidata dependente do conjunto atual não tem complemento
+            # de Schur positivo; esses casos vão para a solução exata
+            scale = np.maximum(np.einsum('mii->mi', G_CC).max(axis=1), np.finfo(float).tiny)
+            ok = np.linalg.eigvalsh(schur).min(axis=1) > self.TOL * scale
+            exact += [positions[i] for i in np.flatnonzero(~ok)]
+            if not ok.any():
+                continue
+
+            C, W, schur, rhs = C[ok], W[:, ok], schur[ok], rhs[ok]
+            beta_C = np.linalg.solve(schur, rhs[:, :, None])[:, :, 0]
+            if k:
+                B = beta[:, None] - solve_triangular(L.T, np.einsum('kmi,mi->km', W, beta_C), lower=False)
+                H_AC = H[np.ix_(A, C.ravel())].reshape(k, len(C), size)
+                linear = B.T @ h[A] + np.einsum('mi,mi->m', beta_C, h[C])
+                quadratic = (np.einsum('km,km->m', H[np.ix_(A, A)] @ B, B)
+                             + 2 * np.einsum('km,kmi,mi->m', B, H_AC, beta_C))
+            else:
+                linear = np.einsum('mi,mi->m', beta_C, h[C])
+                quadratic = np.zeros(len(C))
+            quadratic += np.einsum('mi,mij,mj->m', beta_C, H[C[:, :, None], C[:, None, :]], beta_C)
+
+            sse[np.asarray(positions)[ok]] = self.q[f] - 2 * linear + quadratic
+
+        for i in exact:
+            sse[i] = self._sse_exact(f, np.asarray(list(active) + list(candidates[i]), dtype=int))
+
+        return sse
+
+    def _sse_removals(self, f: int, selected: List[int], candidates: List[Sequence[int]]) -> np.ndarray:
+        active, L = self._basis(f, selected)
+        sse = np.empty(len(candidates))
+
+        if len(active) < len(selected):
+            # Há colunas dependentes: retirar uma delas não muda as previsões; as demais
+            # retiradas podem tornar independentes colunas antes dependentes, e são resolvidas exatamente
+            current = self._sse_exact(f, np.asarray(active, dtype=int))
+            for i, candidate in enumerate(candidates):
+                if not set(candidate) & set(active):
+                    sse[i] = current
+                else:
+                    remaining = [j for j in selected if j not in set(candidate)]
+                    sse[i] = self._sse_exact(f, np.asarray(remaining, dtype=int))
+            return sse
+
+        A = np.asarray(active, dtype=int)
+        k = len(A)
+        index = {j: position for position, j in enumerate(active)}
+        inverse = solve_triangular(L.T, solve_triangular(L, np.eye(k), lower=True), lower=False)
+        beta = inverse @ self.r[f][A]
+        H_AA, h_A = self.H[f][np.ix_(A, A)], self.h[f][A]
+
+        # Sem as colunas J: β' = β - inv[:, J] inv[J, J]⁻¹ β[J], com β'[J] = 0
+        for size in sorted({len(candidate) for candidate in candidates}):
+            positions = [i for i, candidate in enumerate(candidates) if len(candidate) == size]
+            P = np.array([[index[j] for j in candidates[i]] for i in positions], dtype=int).reshape(len(positions), size)
+            m = len(positions)
+
+            coef = np.linalg.solve(inverse[P[:, :, None], P[:, None, :]], beta[P][:, :, None])[:, :, 0]
+            B = beta[:, None] - np.einsum('kmi,mi->km', inverse[:, P], coef)
+            B[P, np.arange(m)[:, None]] = 0.0
+
+            sse[positions] = self.q[f] - 2 * B.T @ h_A + np.einsum('km,km->m', H_AA @ B, B)
+
+        return sse
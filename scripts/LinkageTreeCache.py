@@ -0,0 +1,64 @@
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from sklearn.cluster import AgglomerativeClustering
+
+class LinkageTreeCache:
+    """
+    Árvores de agrupamento hierárquico (dendrogramas) calculadas uma única vez por
+    tipo de ligação e compartilhadas pelas tentativas do AutoClusterHPO.
+
+    A hierarquia de uma ligação ('ward', 'complete', 'average', 'single') não depende
+    de n_clusters: o agrupamento em k clusters é a árvore cortada depois das n - k
+    primeiras fusões, que é exatamente o que o AgglomerativeClustering faz. A árvore
+    completa custa O(n²) uma vez; cada corte custa O(n) (componentes conexas das fusões
+    mantidas).
+
+    Atributos:
+        X (np.ndarray): Dados padronizados (n x p).
+        trees (dict): Ligação -> children_ da árvore completa (n - 1 fusões).
+    """
+    def __init__(self, X: np.ndarray):
+        self.X = X
+        self.trees = {}
+
+    def children(self, linkage: str) -> np.ndarray:
+        """Fusões da árvore completa (children_ do AgglomerativeClustering), calculadas na primeira chamada."""
+        if linkage not in self.trees:
+            model = AgglomerativeClustering(n_clusters=1, linkage=linkage, compute_full_tree=True).fit(self.X)
+            self.trees[linkage] = model.children_
+
+        return self.trees[linkage]
+
+    def labels(self, linkage: str, n_clusters: int) -> np.ndarray:
+        """
+        Rótulos de 0 a n_clusters - 1 do corte da árvore em n_clusters clusters (a mesma
+        partição do AgglomerativeClustering(n_clusters, linkage), a menos da numeração).
+        """
+        n_samples = len(self.X)
+        if not 1 <= n_clusters <= n_samples:
+            raise ValueError(f"n_clusters deve estar entre 1 e {n_samples}.")
+
+        # Grafo folha/nó -> nó criado pela fusão, apenas com as n - k primeiras fusões
+        kept = self.children(linkage)[:n_samples - n_clusters]
+        parents = np.repeat(np.arange(n_samples, n_samples + len(kept)), 2)
+        graph = sparse.coo_matrix((np.ones(len(parents)), (kept.ravel(), parents)),
+                                  shape=(2 * n_samples - 1, 2 * n_samples - 1))
+        _, components = connected_components(graph, directed=False)
+
+        return np.unique(components[:n_samples], return_inverse=True)[1]
+
+    def model(self, linkage: str, n_clusters: int) -> AgglomerativeClustering:
+        """
+        Um AgglomerativeClustering com os atributos de um ajuste em n_clusters (labels_,
+        children_ da árvore completa etc.), montado a partir do corte, sem reajustar.
+        """
+        model = AgglomerativeClustering(n_clusters=n_clusters, linkage=linkage, compute_full_tree=True)
+        model.labels_ = self.labels(linkage, n_clusters)
+        model.children_ = self.children(linkage)
+        model.n_clusters_ = n_clusters
+        model.n_leaves_ = len(self.X)
+        model.n_connected_components_ = 1
+        model.n_features_in_ = self.X.shape[1]
+
+        return model
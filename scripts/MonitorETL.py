@@ -0,0 +1,245 @@
+import os
+import sys
+import json
+import time
+import threading
+import pstats
+import cProfile
+import tracemalloc
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+class RegistroEtapa:
+    """
+    Medições de uma etapa do ETL, preenchidas pelo MonitorETL e pelo código medido.
+
+    O código dentro da etapa informa o que entrou e o que saiu com entrada(...) e
+    saida(...), passando um DataFrame (ou apenas o número de linhas).
+    """
+    def __init__(self, etapa: str, memoria_profunda: bool = True):
+        self.etapa = etapa
+        self.memoria_profunda = memoria_profunda
+        self.dados = {'etapa': etapa}
+        self._saida = None
+
+    def entrada(self, obj) -> None:
+        self.dados['linhas_entrada'] = len(obj) if hasattr(obj, '__len__') else int(obj)
+
+    def saida(self, obj) -> None:
+        self.dados['linhas_saida'] = len(obj) if hasattr(obj, '__len__') else int(obj)
+        # A memória do DataFrame só é medida depois que o cronômetro para
+        self._saida = obj if isinstance(obj, pd.DataFrame) else None
+
+    def _finalizar(self) -> None:
+        if self._saida is not None:
+            self.dados['memoria_df_bytes'] = int(self._saida.memory_usage(index=True, deep=self.memoria_profunda).sum())
+            self._saida = None
+
+class _EtapaPerfilada:
+    # Perfil de uma etapa aberta e os perfis já consolidados das etapas filhas
+    # que rodaram em outras threads
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self.filhas = []
+        self.lock = threading.Lock()
+
+# Etapa perfilada que envolve o código em execução. Threads criadas com
+# contextvars.copy_context().run (ver lerViews) herdam a etapa de quem as submeteu
+_ETAPA_PERFILADA = contextvars.ContextVar('etapa_perfilada', default=None)
+
+class MonitorETL:
+    """
+    Instrumentação das etapas do ETL: tempo, linhas de entrada e saída, memória do
+    DataFrame produzido e pico de memória (RSS) do processo.
+
+    Cada etapa vira uma linha JSON no arquivo de métricas (se informado) e fica
+    disponível em registros_ para o resumo do fim da execução. No modo perfil, cada
+    etapa também é perfilada com cProfile (um .prof por etapa) e tem o pico de
+    alocações medido com tracemalloc.
+
+    O cProfile só mede a thread que o ativou, e só um pode estar ativo por thread:
+    - Etapas aninhadas na mesma thread entram no perfil da etapa externa e ficam
+      sem .prof próprio ("perfil": null).
+    - Etapas que rodam em outras threads (ex: as leituras ler:* de lerViews) ativam
+      um cProfile na própria thread e ganham o seu .prof. Se a thread foi criada com
+      contextvars.copy_context().run, a etapa que a submeteu é conhecida e o seu .prof
+      também inclui as estatísticas das filhas (pstats.Stats.add), em vez de mostrar
+      só a espera pelos futuros.
+
+    O pico do tracemalloc é global ao processo. Ele só é zerado quando nenhuma etapa
+    está aberta; cada etapa registra o pico acima da memória alocada no seu início.
+    O valor é exato quando o pico ocorre durante a etapa e, nas etapas aninhadas ou
+    simultâneas, é um limite superior quando o pico já vinha de antes.
+
+    Atributos:
+        caminho (str): Arquivo JSON lines onde as métricas são acrescentadas (ou None).
+        perfil (bool): Ativa cProfile e tracemalloc por etapa.
+        ativo (bool): Se False, as etapas não são medidas nem registradas.
+        registros_ (list): As métricas de cada etapa desta execução.
+    """
+    def __init__(self, caminho: str = None, perfil: bool = False, ativo: bool = True, memoria_profunda: bool = True):
+        """
+        Inicializa o monitor.
+
+        Args:
+            caminho (str): Arquivo JSON lines para as métricas. None apenas guarda em memória.
+            perfil (bool): Ativa o modo perfil (cProfile + tracemalloc), mais lento.
+            ativo (bool): Permite desligar a instrumentação sem alterar o código medido.
+            memoria_profunda (bool): Mede também o conteúdo das colunas de objetos (strings).
+        """
+        self.caminho = caminho
+        self.perfil = perfil
+        self.ativo = ativo
+        self.memoria_profunda = memoria_profunda
+        self.execucao = datetime.now().strftime('%Y%m%dT%H%M%S')
+        self.registros_ = []
+        self._lock = threading.Lock()
+        self._abertas = 0
+        self._thread = threading.local()
+
+        if self.ativo and self.caminho is not None:
+            os.makedirs(os.path.dirname(self.caminho) or '.', exist_ok=True)
+
+        if self.ativo and self.perfil and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def etapa(self, nome: str):
+        """
+        Context manager que mede uma etapa.
+
+        Exemplo:
+            with monitor.etapa('featuresEnginer') as registro:
+                registro.entrada(df)
+                df = featuresEnginer(df)
+                registro.saida(df)
+        """
+        registro = RegistroEtapa(nome, self.memoria_profunda)
+        if not self.ativo:
+            yield registro
+            return
+
+        perfilada, mae, token, memoria_inicio = None, None, None, 0
+        if self.perfil:
+            with self._lock:
+                if self._abertas == 0:
+                    tracemalloc.reset_peak()
+                self._abertas += 1
+                memoria_inicio = tracemalloc.get_traced_memory()[0]
+
+            # Um cProfile por thread: etapas aninhadas na mesma thread entram no perfil externo
+            if not getattr(self._thread, 'perfilando', False):
+                profiler = cProfile.Profile()
+                try:
+                    profiler.enable()
+                except ValueError:
+                    # Outro profiler já ativo no processo (ex: sys.monitoring no Python 3.12+)
+                    profiler = None
+                if profiler is not None:
+                    self._thread.perfilando = True
+                    mae = _ETAPA_PERFILADA.get()
+                    perfilada = _EtapaPerfilada(profiler)
+                    token = _ETAPA_PERFILADA.set(perfilada)
+
+        inicio = time.perf_counter()
+        try:
+            yield registro
+        finally:
+            duracao = time.perf_counter() - inicio
+            estatisticas = None
+            if perfilada is not None:
+                perfilada.profiler.disable()
+                self._thread.perfilando = False
+                _ETAPA_PERFILADA.reset(token)
+                estatisticas = self._consolidarPerfil(perfilada)
+                if mae is not None:
+                    with mae.lock:
+                        mae.filhas.append(estatisticas)
+
+            registro.dados.update({
+                'execucao': self.execucao,
+                'inicio': datetime.now().isoformat(timespec='seconds'),
+                'duracao_s': round(duracao, 4),
+                'rss_pico_bytes': self._rssPico()
+            })
+            if self.perfil:
+                with self._lock:
+                    registro.dados['tracemalloc_pico_bytes'] = tracemalloc.get_traced_memory()[1] - memoria_inicio
+                    self._abertas -= 1
+                registro.dados['perfil'] = self._gravarPerfil(estatisticas, nome) if estatisticas is not None else None
+            registro._finalizar()
+            self._emitir(registro.dados)
+
+    def medir(self, nome: str = None):
+        """Decorador equivalente a etapa(...), que registra o número de linhas do DataFrame retornado."""
+        def decorador(funcao):
+            def envoltorio(*args, **kwargs):
+                with self.etapa(nome or funcao.__name__) as registro:
+                    resultado = funcao(*args, **kwargs)
+                    if isinstance(resultado, pd.DataFrame):
+                        registro.saida(resultado)
+                return resultado
+            return envoltorio
+        return decorador
+
+    def resumo(self) -> pd.DataFrame:
+        """Retorna as métricas desta execução como um DataFrame, uma linha por etapa."""
+        colunas = ['etapa', 'duracao_s', 'linhas_entrada', 'linhas_saida', 'memoria_df_bytes', 'rss_pico_bytes']
+        if self.perfil:
+            colunas.append('tracemalloc_pico_bytes')
+
+        return pd.DataFrame(self.registros_).reindex(columns=colunas)
+
+    def imprimirResumo(self) -> None:
+        """Imprime o resumo das etapas, com as memórias em MB."""
+        resumo = self.resumo()
+        for coluna in [c for c in resumo.columns if c.endswith('_bytes')]:
+            resumo[coluna.replace('_bytes', '_mb')] = resumo.pop(coluna) / 1024 ** 2
+
+        print("=" * 45)
+        print("Resumo do ETL")
+        print("=" * 45)
+        print(resumo.to_string(index=False))
+        print("=" * 45)
+
+    def _emitir(self, dados: dict) -> None:
+        with self._lock:
+            self.registros_.append(dados)
+            if self.caminho is not None:
+                with open(self.caminho, 'a', encoding='utf-8') as arquivo:
+                    arquivo.write(json.dumps(dados, ensure_ascii=False, default=str) + '\n')
+
+    @staticmethod
+    def _consolidarPerfil(perfilada: '_EtapaPerfilada') -> pstats.Stats:
+        # Perfil da thread da etapa somado aos das etapas filhas de outras threads
+        estatisticas = pstats.Stats(perfilada.profiler)
+        with perfilada.lock:
+            filhas = list(perfilada.filhas)
+        if filhas:
+            estatisticas.add(*filhas)
+
+        return estatisticas
+
+    def _gravarPerfil(self, estatisticas: pstats.Stats, nome: str) -> str:
+        diretorio = os.path.join(os.path.dirname(self.caminho or '.') or '.', f'perfis_{self.execucao}')
+        os.makedirs(diretorio, exist_ok=True)
+        caminho = os.path.join(diretorio, ''.join(c if c.isalnum() else '_' for c in nome) + '.prof')
+        estatisticas.dump_stats(caminho)
+
+        return caminho
+
+    @staticmethod
+    def _rssPico():
+        if resource is None:
+            return None
+
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss é em KB no Linux e em bytes no macOS
+        return pico if sys.platform == 'darwin' else pico * 1024
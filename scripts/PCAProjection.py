@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+class PCAProjection:
+    """
+    Forma compacta de um PCATransformer treinado: a padronização e a projeção nos
+    componentes principais reduzidas a uma única transformação afim,
+
+        X_pca = X @ W + b
+
+    em que W (n_features x n_componentes) já divide os componentes pela escala de
+    cada feature e b reúne as médias do StandardScaler e do PCA. Cada chamada de
+    transform é uma multiplicação de matrizes que devolve um array do NumPy, sem passar
+    pelo StandardScaler, pelo PCA nem pela montagem de um DataFrame. Serve para pontuar
+    lotes pequenos repetidamente.
+
+    Parâmetros:
+    ----------
+    W : np.ndarray
+        Matriz n_features x n_componentes.
+    b : np.ndarray
+        Vetor de n_componentes.
+    feature_names_in_ : list
+        As colunas esperadas, na ordem das linhas de W.
+    """
+    def __init__(self, W, b, feature_names_in_):
+        W = np.asarray(W)
+        b = np.asarray(b, dtype=W.dtype)
+        if W.ndim != 2 or b.shape != (W.shape[1],) or len(feature_names_in_) != W.shape[0]:
+            raise ValueError("W deve ser n_features x n_componentes, b deve ter n_componentes posições "
+                             "e feature_names_in_ deve ter n_features nomes.")
+
+        self.W = W
+        self.b = b
+        self.feature_names_in_ = list(feature_names_in_)
+        self.n_components_ = W.shape[1]
+        self._columns = pd.Index(self.feature_names_in_)
+
+    def transform(self, X):
+        """
+        Projeta X nos componentes principais.
+
+        Parâmetros:
+        ----------
+        X : pd.DataFrame, np.ndarray ou matriz esparsa do SciPy
+            DataFrames são reordenados pelas colunas do treino; arrays e matrizes
+            esparsas devem vir com as colunas já na ordem de feature_names_in_.
+
+        Retorna:
+        -------
+        X_pca : np.ndarray
+            Array n_linhas x n_componentes.
+        """
+        if isinstance(X, pd.DataFrame):
+            if not X.columns.equals(self._columns):
+                X = X[self.feature_names_in_]
+            if any(isinstance(dtype, pd.SparseDtype) for dtype in X.dtypes):
+                # Colunas esparsas (ex: dummies) seguem esparsas; as densas entram na mesma matriz
+                X = sparse.csr_matrix(X.astype(pd.SparseDtype(self.W.dtype, 0)).sparse.to_coo())
+            else:
+                X = X.to_numpy(dtype=self.W.dtype)
+        elif not sparse.issparse(X):
+            X = np.asarray(X, dtype=self.W.dtype)
+
+        if X.ndim != 2 or X.shape[1] != self.W.shape[0]:
+            raise ValueError(f"X deve ter {self.W.shape[0]} colunas.")
+
+        return np.asarray(X @ self.W) + self.b
+
+    __call__ = transform
+
+    def save(self, path):
+        """Grava W, b e os nomes das features em um arquivo .npz."""
+        np.savez(path, W=self.W, b=self.b, feature_names_in_=np.array(self.feature_names_in_, dtype=str))
+
+    @classmethod
+    def load(cls, path):
+        """Cria a projeção a partir do arquivo gravado por save."""
+        with np.load(path, allow_pickle=False) as arquivo:
+            return cls(arquivo['W'], arquivo['b'], arquivo['feature_names_in_'].tolist())
@@ -1,8 +1,11 @@
+import copy
 import pandas as pd
 import numpy as np
+from scipy import sparse
 from sklearn.preprocessing import StandardScaler
 from sklearn.decomposition import PCA
 from sklearn.exceptions import NotFittedError
+from scripts.PCAProjection import PCAProjection
 
 class PCATransformer:
     """
@@ -12,6 +15,20 @@ class PCATransformer:
     Esta classe segue a API do Scikit-learn (com os métodos fit, transform
     e fit_transform) para ser facilmente integrada em pipelines.
 
+    Para dados que não cabem em memória, partial_fit e fit_stream aprendem
+    a partir de lotes (ex: iter_processed, de ProcessedData) e transform_stream
+    transforma lote a lote; a memória fica limitada ao tamanho do lote.
+
+    Matrizes esparsas (do SciPy, ou DataFrames com colunas esparsas, como as do
+    pd.get_dummies(..., sparse=True)) não são densificadas: só a escala é aplicada
+    à matriz e a centralização fica implícita no PCA (um operador linear do
+    Scikit-learn), sem materializar a matriz centrada.
+
+    Para comparar números de componentes, basta um ajuste com n_components=None:
+    with_components(k ou variância) devolve visões com os primeiros componentes, sem
+    reajustar. Para pontuar lotes pequenos, projection() reduz a padronização e o PCA
+    a uma única transformação afim (X @ W + b) que devolve arrays do NumPy.
+
     Parâmetros:
     ----------
     n_components : int, float ou None, default=0.95
@@ -20,17 +37,58 @@ class PCATransformer:
         - Se float (entre 0.0 e 1.0): A quantidade mínima de variância 
           explicada que os componentes selecionados devem ter.
         - Se None: Todos os componentes são mantidos.
+    svd_solver : str, default='auto'
+        O solver do PCA. 'auto' escolhe pelo formato, pela esparsidade e por
+        n_components (ver _select_solver); 'full', 'covariance_eigh', 'randomized'
+        e 'arpack' forçam o solver correspondente do Scikit-learn.
+    dtype : str, default='float64'
+        A precisão dos cálculos: 'float64' ou 'float32' (metade da memória).
     """
-    def __init__(self, n_components=0.95):
+    # Acima deste número de features, a matriz de covariância (n_features x n_features)
+    # deixa de ser o caminho barato para matrizes esparsas
+    MAX_COVARIANCE_FEATURES = 2000
+
+    def __init__(self, n_components=0.95, svd_solver='auto', dtype='float64'):
         if not ((isinstance(n_components, float) and 0 < n_components < 1) or 
                 isinstance(n_components, int) or n_components is None):
             raise ValueError("n_components deve ser um int, um float entre 0 e 1, ou None.")
+        if svd_solver not in ('auto', 'full', 'covariance_eigh', 'randomized', 'arpack'):
+            raise ValueError("svd_solver deve ser 'auto', 'full', 'covariance_eigh', 'randomized' ou 'arpack'.")
+        if dtype not in ('float64', 'float32'):
+            raise ValueError("dtype deve ser 'float64' ou 'float32'.")
             
         self.n_components = n_components
+        self.svd_solver = svd_solver
+        self.dtype = dtype
         self.scaler = StandardScaler()
         self.pca = PCA(n_components=self.n_components)
         self.feature_names_in_ = None
         self.n_components_ = None
+        self.svd_solver_ = None
+        self._stream = None
+        self._pending = False
+        self._projection = None
+
+    @property
+    def pca(self):
+        # Depois de partial_fit, a decomposição só é feita quando os componentes são usados
+        if self._pending:
+            self._finalize_stream()
+        return self._pca
+
+    @pca.setter
+    def pca(self, value):
+        self._pca = value
+
+    @property
+    def n_components_(self):
+        if self._pending:
+            self._finalize_stream()
+        return self._n_components
+
+    @n_components_.setter
+    def n_components_(self, value):
+        self._n_components = value
         
     def fit(self, X, y=None):
         """
@@ -38,7 +96,7 @@ class PCATransformer:
 
         Parâmetros:
         ----------
-        X : pd.DataFrame
+        X : pd.DataFrame ou matriz esparsa do SciPy
             O DataFrame de treino com as variáveis a serem transformadas.
         y : Ignorado
             Não é utilizado, presente para compatibilidade com a API do Scikit-learn.
@@ -48,10 +106,24 @@ class PCATransformer:
         self : object
             Retorna a própria instância da classe.
         """
-        if not isinstance(X, pd.DataFrame):
-            raise TypeError("X deve ser um pandas DataFrame.")
-        
-        self.feature_names_in_ = X.columns.tolist()
+        if isinstance(X, pd.DataFrame):
+            self.feature_names_in_ = X.columns.tolist()
+        elif sparse.issparse(X):
+            self.feature_names_in_ = [f"x{i}" for i in range(X.shape[1])]
+        else:
+            raise TypeError("X deve ser um pandas DataFrame ou uma matriz esparsa do SciPy.")
+        self._stream = None
+        self._pending = False
+        self._projection = None
+
+        X = self._prepare(X)
+        is_sparse = sparse.issparse(X)
+
+        # Em matrizes esparsas só a escala é aplicada; o PCA centraliza implicitamente
+        self.svd_solver_ = self._select_solver(X.shape[0], X.shape[1], is_sparse)
+        self.scaler = StandardScaler(with_mean=not is_sparse)
+        self.pca = PCA(n_components=self.n_components, svd_solver=self.svd_solver_,
+                       random_state=0 if self.svd_solver_ in ('randomized', 'arpack') else None)
         
         # Aprende os parâmetros de padronização e PCA
         X_scaled = self.scaler.fit_transform(X)
@@ -60,6 +132,152 @@ class PCATransformer:
         
         return self
 
+    def partial_fit(self, X, y=None):
+        """
+        Atualiza a padronização e o PCA com mais um lote de dados.
+
+        A média e a variância do StandardScaler são acumuladas com o partial_fit do
+        Scikit-learn. Para os componentes, a matriz de covariância é acumulada lote a
+        lote (atualização de Chan et al., numericamente estável); a decomposição da
+        matriz de correlação resultante dá os mesmos componentes e variâncias de fit
+        sobre todas as linhas juntas (a menos do sinal de cada componente). A memória
+        usada é a do lote mais uma matriz n_features x n_features.
+
+        A decomposição não é refeita a cada lote: ela acontece uma vez, no primeiro uso
+        dos componentes depois do último lote (transform, pca, n_components_, summary...).
+        Por isso um lote com uma única linha é aceito; o mínimo de 2 linhas no total só é
+        verificado nesse momento.
+
+        Parâmetros:
+        ----------
+        X : pd.DataFrame
+            Um lote de linhas, com as mesmas colunas do primeiro lote.
+        y : Ignorado
+            Não é utilizado, presente para compatibilidade com a API do Scikit-learn.
+
+        Retorna:
+        -------
+        self : object
+            Retorna a própria instância da classe.
+        """
+        self._accumulate(X)
+        self._pending = self._stream is not None
+        self._projection = None
+
+        return self
+
+    def fit_stream(self, frames):
+        """
+        Aprende a padronização e o PCA a partir de uma sequência de lotes, em uma única passada.
+
+        Parâmetros:
+        ----------
+        frames : iterável de pd.DataFrame
+            Os lotes (ex: iter_processed(columns=..., batch_size=...)).
+
+        Retorna:
+        -------
+        self : object
+            Retorna a própria instância da classe.
+        """
+        self._stream = None
+        self._pending = False
+        for frame in frames:
+            self._accumulate(frame)
+
+        if self._stream is None:
+            raise ValueError("fit_stream não recebeu nenhum lote.")
+        self._finalize_stream()
+
+        return self
+
+    def transform_stream(self, frames):
+        """
+        Aplica a transformação lote a lote.
+
+        Parâmetros:
+        ----------
+        frames : iterável de pd.DataFrame
+            Os lotes a transformar.
+
+        Retorna:
+        -------
+        gerador de pd.DataFrame
+            Os componentes principais de cada lote, com o índice do lote.
+        """
+        for frame in frames:
+            yield self.transform(frame)
+
+    def _accumulate(self, X):
+        # Acumula n, a média e a matriz de somas de quadrados centradas das linhas de X
+        if not isinstance(X, pd.DataFrame):
+            raise TypeError("X deve ser um pandas DataFrame.")
+
+        if self._stream is None:
+            # Primeiro lote: descarta qualquer ajuste anterior
+            self.feature_names_in_ = X.columns.tolist()
+            self.scaler = StandardScaler()
+            n_features = len(self.feature_names_in_)
+            self._stream = {'n': 0, 'mean': np.zeros(n_features), 'scatter': np.zeros((n_features, n_features))}
+        X = X[self.feature_names_in_]
+
+        values = X.to_numpy(dtype=np.float64, na_value=np.nan)
+        if len(values) == 0:
+            return
+        if np.isnan(values).any():
+            raise ValueError("X contém valores ausentes, que o PCA não aceita.")
+        self.scaler.partial_fit(X)
+
+        n_a, mean_a = self._stream['n'], self._stream['mean']
+        n_b, mean_b = len(values), values.mean(axis=0)
+        centered = values - mean_b
+        delta = mean_b - mean_a
+        n = n_a + n_b
+
+        self._stream['scatter'] += centered.T @ centered + np.outer(delta, delta) * (n_a * n_b / n)
+        self._stream['mean'] = mean_a + delta * (n_b / n)
+        self._stream['n'] = n
+
+    def _finalize_stream(self):
+        # Matriz de covariância dos dados padronizados (= correlação) e seus autovetores
+        n, scatter = self._stream['n'], self._stream['scatter']
+        if n < 2:
+            raise ValueError("São necessárias ao menos 2 linhas para ajustar o PCA.")
+
+        scale = self.scaler.scale_
+        correlation = scatter / (n - 1) / np.outer(scale, scale)
+        eigenvalues, eigenvectors = np.linalg.eigh((correlation + correlation.T) / 2)
+        factor = np.sqrt(np.clip(eigenvalues, 0, None))[:, None] * eigenvectors.T
+
+        # O PCA do Scikit-learn é ajustado sobre 2p linhas sintéticas, de média zero, cuja
+        # covariância é exatamente a acumulada: componentes, variâncias e a escolha do número
+        # de componentes (n_components) ficam iguais às do ajuste sobre todos os dados.
+        # O solver é escolhido pelo formato dos dados acumulados, como em fit
+        n_features = len(self.feature_names_in_)
+        rank = min(n, n_features)
+        n_components = rank if self.n_components is None else self.n_components
+        if isinstance(n_components, (int, np.integer)) and not isinstance(n_components, bool) and n_components > rank:
+            raise ValueError(f"n_components={n_components} deve estar entre 0 e min(n_samples, n_features)={rank}.")
+        synthetic = np.vstack([factor, -factor]) * np.sqrt((2 * n_features - 1) / 2)
+        self.svd_solver_ = self._select_solver(n, n_features, is_sparse=False)
+        pca = PCA(n_components=n_components, svd_solver=self.svd_solver_,
+                  random_state=0 if self.svd_solver_ in ('randomized', 'arpack') else None)
+        pca.fit(synthetic.astype(self.dtype))
+
+        # Os atributos que dependem do número de linhas voltam aos dados reais: n linhas em
+        # vez de 2p, valores singulares de n - 1 (e não 2p - 1) graus de liberdade e a
+        # variância de ruído média sobre os min(n, p) componentes que o fit teria
+        pca.n_components = self.n_components
+        pca.n_samples_ = n
+        pca.singular_values_ = pca.singular_values_ * np.sqrt((n - 1) / (2 * n_features - 1))
+        k = pca.n_components_
+        residual = np.clip(eigenvalues, 0, None).sum() - pca.explained_variance_.sum()
+        pca.noise_variance_ = pca.explained_variance_.dtype.type(max(residual, 0) / (rank - k) if k < rank else 0.0)
+        self.pca = pca
+        self.n_components_ = pca.n_components_
+        self._pending = False
+        self._projection = None
+
     def transform(self, X):
         """
         Aplica a padronização e a transformação PCA aprendidas.
@@ -78,7 +296,16 @@ class PCATransformer:
             raise NotFittedError("Esta instância de PCATransformer não foi treinada. Chame 'fit' primeiro.")
         
         # Garante que as colunas de X são as mesmas do treino
-        X_reordered = X[self.feature_names_in_]
+        if isinstance(X, pd.DataFrame):
+            index = X.index
+            X_reordered = self._prepare(X[self.feature_names_in_])
+        elif sparse.issparse(X):
+            if X.shape[1] != len(self.feature_names_in_):
+                raise ValueError(f"X tem {X.shape[1]} colunas; o treino teve {len(self.feature_names_in_)}.")
+            index = pd.RangeIndex(X.shape[0])
+            X_reordered = self._prepare(X)
+        else:
+            raise TypeError("X deve ser um pandas DataFrame ou uma matriz esparsa do SciPy.")
         
         # Aplica as transformações aprendidas
         X_scaled = self.scaler.transform(X_reordered)
@@ -86,10 +313,170 @@ class PCATransformer:
         
         # Cria um DataFrame com nomes de colunas informativos
         pc_names = [f"PC_{i+1}" for i in range(self.n_components_)]
-        X_pca = pd.DataFrame(X_pca_np, index=X.index, columns=pc_names)
+        X_pca = pd.DataFrame(X_pca_np, index=index, columns=pc_names)
         
         return X_pca
     
+    def _prepare(self, X):
+        # DataFrames com colunas esparsas viram uma matriz CSR, sem densificar; o restante
+        # segue como DataFrame. Ambos na precisão escolhida em dtype
+        dtype = np.dtype(self.dtype)
+        if sparse.issparse(X):
+            return sparse.csr_matrix(X, dtype=dtype)
+        is_sparse = [isinstance(d, pd.SparseDtype) for d in X.dtypes]
+        if any(is_sparse):
+            sparse_columns = [c for c, flag in zip(X.columns, is_sparse) if flag]
+            dense_columns = [c for c, flag in zip(X.columns, is_sparse) if not flag]
+            blocks = [X[sparse_columns].sparse.to_coo().tocsc().astype(dtype)]
+            if dense_columns:
+                blocks.append(sparse.csc_matrix(X[dense_columns].to_numpy(dtype=dtype)))
+
+            # Volta as colunas à ordem original
+            position = {c: i for i, c in enumerate(sparse_columns + dense_columns)}
+            matrix = sparse.hstack(blocks, format='csc')
+            return matrix[:, [position[c] for c in X.columns]].tocsr()
+
+        return X.astype(dtype)
+
+    def _select_solver(self, n_samples, n_features, is_sparse):
+        """
+        Escolhe o solver do PCA quando svd_solver='auto'.
+
+        - Matriz esparsa: 'covariance_eigh' (covariância n_features x n_features, com
+          a centralização implícita) até MAX_COVARIANCE_FEATURES features ou quando
+          n_components não é um inteiro; acima disso, 'arpack', que só multiplica a
+          matriz esparsa por vetores.
+        - Matriz densa: 'covariance_eigh' quando há muito mais linhas que colunas;
+          'randomized' quando poucos componentes (inteiro) são pedidos de uma matriz
+          grande; 'full' (SVD completa) nos demais casos.
+        """
+        if self.svd_solver != 'auto':
+            return self.svd_solver
+
+        smallest = min(n_samples, n_features)
+        few_components = isinstance(self.n_components, int) and self.n_components < 0.8 * smallest
+        if is_sparse:
+            if n_features <= self.MAX_COVARIANCE_FEATURES or not isinstance(self.n_components, int) \
+                    or self.n_components >= smallest:
+                return 'covariance_eigh'
+            return 'arpack'
+        if n_features <= 1000 and n_samples >= 10 * n_features:
+            return 'covariance_eigh'
+        if max(n_samples, n_features) > 500 and few_components:
+            return 'randomized'
+
+        return 'full'
+
+    def with_components(self, n_components):
+        """
+        Visão do transformador treinado restrita aos primeiros componentes, sem reajustar.
+
+        Os componentes do PCA vêm ordenados pela variância explicada, então os k primeiros
+        de um ajuste com mais componentes são exatamente os de um ajuste com n_components=k.
+        A visão compartilha o StandardScaler e recorta components_, as variâncias e os
+        valores singulares. Para poder escolher qualquer k, treine com n_components=None.
+
+        Parâmetros:
+        ----------
+        n_components : int ou float
+            - Se int: O número de componentes da visão.
+            - Se float (entre 0.0 e 1.0): A variância explicada mínima, com a mesma
+              regra de escolha do PCA do Scikit-learn.
+
+        Retorna:
+        -------
+        view : PCATransformer
+            Um novo PCATransformer, já treinado, com os componentes escolhidos.
+        """
+        if self.n_components_ is None:
+            raise NotFittedError("Esta instância de PCATransformer não foi treinada. Chame 'fit' primeiro.")
+
+        ratio = self.pca.explained_variance_ratio_
+        if isinstance(n_components, float) and 0 < n_components < 1:
+            cumulative = np.cumsum(ratio)
+            if cumulative[-1] < n_components and self.n_components_ < self._rank():
+                raise ValueError(f"Os {self.n_components_} componentes treinados explicam {cumulative[-1]:.2%} da "
+                                 "variância. Treine com n_components=None.")
+            k = min(int(np.searchsorted(cumulative, n_components, side='right')) + 1, self.n_components_)
+        elif isinstance(n_components, (int, np.integer)) and not isinstance(n_components, bool):
+            if not 1 <= n_components <= self.n_components_:
+                raise ValueError(f"n_components deve estar entre 1 e {self.n_components_} (os componentes treinados). "
+                                 "Treine com n_components=None para ter todos.")
+            k = int(n_components)
+        else:
+            raise ValueError("n_components deve ser um int ou um float entre 0 e 1.")
+
+        pca = copy.copy(self.pca)
+        pca.n_components = pca.n_components_ = k
+        pca.components_ = self.pca.components_[:k]
+        pca.explained_variance_ = self.pca.explained_variance_[:k]
+        pca.explained_variance_ratio_ = ratio[:k]
+        pca.singular_values_ = self.pca.singular_values_[:k]
+
+        # Variância de ruído do PCA: média das variâncias dos componentes descartados
+        total_variance = self.pca.explained_variance_[0] / ratio[0]
+        rank = self._rank()
+        pca.noise_variance_ = (total_variance - pca.explained_variance_.sum()) / (rank - k) if k < rank else 0.0
+
+        view = copy.copy(self)
+        view.n_components = k
+        view.n_components_ = k
+        view.pca = pca
+        view._stream = None
+        view._projection = None
+
+        return view
+
+    def _rank(self):
+        # Maior número de componentes possível no ajuste
+        return min(self.pca.n_samples_, self.pca.n_features_in_)
+
+    def projection(self):
+        """
+        A padronização e o PCA reduzidos a uma transformação afim X @ W + b.
+
+        Com z = (x - média) / escala e X_pca = (z - média do PCA) @ componentesᵀ,
+        W = componentesᵀ / escala (por linha) e b = -(média / escala + média do PCA) @ componentesᵀ.
+        Em matrizes esparsas o StandardScaler não centraliza, e só a média do PCA entra em b.
+        A projeção é calculada uma vez e reaproveitada até o próximo ajuste.
+
+        Retorna:
+        -------
+        projection : PCAProjection
+            Com transform(X) -> np.ndarray, save(path) e PCAProjection.load(path).
+        """
+        if self.n_components_ is None:
+            raise NotFittedError("Esta instância de PCATransformer não foi treinada. Chame 'fit' primeiro.")
+
+        if self._projection is None:
+            components = self.pca.components_.astype(np.float64)
+            if self.pca.whiten:
+                components = components / np.sqrt(self.pca.explained_variance_)[:, None]
+            scale = self.scaler.scale_ if self.scaler.scale_ is not None else np.ones(components.shape[1])
+            offset = self.scaler.mean_ / scale if self.scaler.with_mean else np.zeros(components.shape[1])
+
+            W = components.T / scale[:, None]
+            b = -(offset + self.pca.mean_) @ components.T
+            self._projection = PCAProjection(W.astype(self.dtype), b, self.feature_names_in_)
+
+        return self._projection
+
+    def project(self, X):
+        """
+        Igual a transform, mas pela projeção fundida e devolvendo um array do NumPy.
+
+        Parâmetros:
+        ----------
+        X : pd.DataFrame, np.ndarray ou matriz esparsa do SciPy
+            Arrays e matrizes esparsas devem vir com as colunas na ordem do treino.
+
+        Retorna:
+        -------
+        X_pca : np.ndarray
+            Array n_linhas x n_componentes.
+        """
+        return self.projection().transform(X)
+
     def fit_transform(self, X, y=None):
         """
         Aprende com os dados e os transforma em uma única etapa.
@@ -0,0 +1,85 @@
+import sqlite3
+import hashlib
+import threading
+
+def hashTexto(texto):
+
+    # Equivalente local do hashtext do PostgreSQL: um inteiro de 32 bits com sinal
+    if texto is None:
+        return None
+
+    return int.from_bytes(hashlib.blake2b(texto.encode('utf-8'), digest_size=4).digest(), 'little', signed=True)
+
+class CursorSQLite(sqlite3.Cursor):
+    """
+    Cursor do sqlite3 que aceita o atributo itersize dos cursores nomeados do psycopg2.
+
+    O SQLite já entrega as linhas sob demanda a cada fetchmany, então o cursor comum
+    faz o papel do cursor server-side.
+    """
+    itersize = 2000
+
+class ConexaoSQLite:
+    """
+    Conexão com um banco SQLite anexado como o schema "POF_2018", com a parte da
+    interface do psycopg2 usada pelo ETL (cursor, inclusive nomeado, e close) e uma
+    função hashtext, como a do PostgreSQL, para os hashes do ETL incremental.
+
+    Atributos:
+        caminho (str): Arquivo do banco SQLite.
+        dialeto (str): Sempre 'sqlite'; usado para trocar o que só existe no PostgreSQL.
+    """
+    dialeto = 'sqlite'
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._conn = sqlite3.connect(':memory:', check_same_thread=False)
+        self._conn.execute('ATTACH DATABASE ? AS "POF_2018"', (caminho,))
+        self._conn.create_function('hashtext', 1, hashTexto, deterministic=True)
+
+    def cursor(self, name: str = None):
+        # O nome do cursor server-side do psycopg2 é ignorado (ver CursorSQLite)
+        return self._conn.cursor(CursorSQLite)
+
+    def close(self) -> None:
+        self._conn.close()
+
+class PoolSQLite:
+    """
+    Substituto local do ThreadedConnectionPool do psycopg2, sobre um banco SQLite
+    gerado por GeradorPOF. Permite executar e medir o ETL sem o servidor PostgreSQL.
+
+    O backend 'copy' não existe no SQLite: as leituras com esse backend usam o
+    fetchall (ver lerConsulta).
+
+    Atributos:
+        caminho (str): Arquivo do banco SQLite.
+        max_conexoes (int): Número máximo de conexões emprestadas ao mesmo tempo.
+    """
+    def __init__(self, caminho: str, max_conexoes: int = 4):
+        self.caminho = caminho
+        self.max_conexoes = max_conexoes
+        self._livres = []
+        self._emprestadas = 0
+        self._lock = threading.Lock()
+
+    def getconn(self) -> ConexaoSQLite:
+        with self._lock:
+            if self._emprestadas >= self.max_conexoes:
+                raise RuntimeError("O pool de conexões SQLite está esgotado.")
+            self._emprestadas += 1
+            if self._livres:
+                return self._livres.pop()
+
+        return ConexaoSQLite(self.caminho)
+
+    def putconn(self, conn: ConexaoSQLite) -> None:
+        with self._lock:
+            self._emprestadas -= 1
+            self._livres.append(conn)
+
+    def closeall(self) -> None:
+        with self._lock:
+            for conn in self._livres:
+                conn.close()
+            self._livres = []
@@ -0,0 +1,187 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from pyarrow import fs
+from config import settings
+
+def compact_dtypes(df):
+    """
+    Converte o DataFrame processado para tipos compactos, preservados no arquivo:
+    textos viram 'category', inteiros anuláveis continuam 'Int64' e colunas float64
+    viram float32 quando a conversão não perde informação.
+
+    Args:
+        df (pd.DataFrame): O DataFrame produzido pelo ETL.
+
+    Returns:
+        pd.DataFrame: Um novo DataFrame com os tipos compactos.
+    """
+    df = df.copy()
+
+    for coluna in df.columns:
+        serie = df[coluna]
+        if pd.api.types.is_object_dtype(serie) or pd.api.types.is_string_dtype(serie):
+            df[coluna] = serie.astype('category')
+        elif serie.dtype == np.float64:
+            reduzida = serie.astype(np.float32)
+            if np.array_equal(reduzida.to_numpy(np.float64), serie.to_numpy(), equal_nan=True):
+                df[coluna] = reduzida
+
+    return df
+
+def save_processed(df, path=settings.DADOS_PROCESSADOS, csv_path=None):
+    """
+    Grava o DataFrame processado em Arrow IPC (Feather v2) sem compressão, formato
+    colunar que preserva os tipos e pode ser lido por memory-map, sem cópia.
+
+    Args:
+        df (pd.DataFrame): O DataFrame produzido pelo ETL.
+        path (str): Caminho do arquivo Arrow.
+        csv_path (str): Se informado, também exporta o CSV nesse caminho.
+    """
+    df = compact_dtypes(df)
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    feather.write_feather(tabela, path, compression='uncompressed')
+
+    if csv_path is not None:
+        os.makedirs(os.path.dirname(csv_path) or '.', exist_ok=True)
+        df.to_csv(csv_path, index=False)
+
+def part_dtypes(df):
+    """
+    Resumo dos tipos de uma partição do conjunto processado, para que save_processed_parts
+    chegue aos mesmos tipos que compact_dtypes daria ao conjunto inteiro: as categorias de
+    cada coluna de texto e, para cada coluna float64, se ela cabe em float32 sem perda.
+
+    Args:
+        df (pd.DataFrame): Uma partição já tratada.
+
+    Returns:
+        dict: Coluna -> {'categorias': list, 'ordenada': bool} ou {'float32': bool}.
+    """
+    resumo = {}
+    for coluna in df.columns:
+        serie = df[coluna]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            resumo[coluna] = {'categorias': serie.cat.categories.tolist(), 'ordenada': bool(serie.cat.ordered)}
+        elif pd.api.types.is_object_dtype(serie) or pd.api.types.is_string_dtype(serie):
+            resumo[coluna] = {'categorias': serie.dropna().unique().tolist(), 'ordenada': False}
+        elif serie.dtype == np.float64:
+            reduzida = serie.to_numpy().astype(np.float32)
+            resumo[coluna] = {'float32': bool(np.array_equal(reduzida.astype(np.float64), serie.to_numpy(), equal_nan=True))}
+
+    return resumo
+
+def _unify_dtypes(resumos):
+
+    # Mesmas categorias em todas as partições são mantidas (inclusive a ordem); caso
+    # contrário, a união ordenada, como o astype('category') do conjunto inteiro
+    unificado = {}
+    for coluna in resumos[0]:
+        partes = [resumo[coluna] for resumo in resumos if coluna in resumo]
+        if 'categorias' in partes[0]:
+            categorias = partes[0]['categorias']
+            if any(parte['categorias'] != categorias for parte in partes):
+                categorias = list(dict.fromkeys(c for parte in partes for c in parte['categorias']))
+                try:
+                    categorias = sorted(categorias)
+                except TypeError:
+                    pass
+            unificado[coluna] = pd.CategoricalDtype(categorias, ordered=partes[0]['ordenada'])
+        elif all(parte.get('float32') for parte in partes):
+            unificado[coluna] = np.float32
+
+    return unificado
+
+def save_processed_parts(paths, dtypes, path=settings.DADOS_PROCESSADOS, csv_path=None):
+    """
+    Grava o conjunto processado a partir de partições em Parquet, uma de cada vez, no
+    mesmo arquivo Arrow IPC de save_processed. A memória usada é a de uma partição.
+
+    Args:
+        paths (list): Arquivos Parquet das partições, na ordem em que serão gravadas.
+        dtypes (list): O part_dtypes de cada partição.
+        path (str): Caminho do arquivo Arrow.
+        csv_path (str): Se informado, também exporta o CSV nesse caminho.
+
+    Returns:
+        int: O número de linhas gravadas.
+    """
+    tipos = _unify_dtypes(dtypes)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    if csv_path is not None:
+        os.makedirs(os.path.dirname(csv_path) or '.', exist_ok=True)
+
+    linhas, escritor, esquema = 0, None, None
+    try:
+        for i, caminho in enumerate(paths):
+            df = pd.read_parquet(caminho)
+            df = df.astype({coluna: tipo for coluna, tipo in tipos.items() if coluna in df.columns})
+
+            tabela = pa.Table.from_pandas(df, preserve_index=False)
+            if escritor is None:
+                # Sem compressão, como o feather.write_feather de save_processed
+                esquema = tabela.schema
+                escritor = pa.ipc.new_file(path, esquema, options=pa.ipc.IpcWriteOptions(compression=None))
+            escritor.write_table(tabela.cast(esquema))
+
+            if csv_path is not None:
+                df.to_csv(csv_path, index=False, mode='w' if i == 0 else 'a', header=i == 0)
+            linhas += len(df)
+    finally:
+        if escritor is not None:
+            escritor.close()
+
+    return linhas
+
+def load_processed(columns=None, filters=None, path=settings.DADOS_PROCESSADOS):
+    """
+    Carrega o conjunto processado com projeção de colunas e filtro de linhas.
+
+    O arquivo é aberto por memory-map: só as colunas pedidas são lidas do disco e as
+    colunas numéricas sem nulos chegam ao pandas sem cópia.
+
+    Args:
+        columns (list): Colunas a carregar. None carrega todas.
+        filters: Filtro de linhas, no formato do pandas/pyarrow
+                 (ex: [('uf', '==', '53'), ('Qtd de cômodos', '>', 2)])
+                 ou uma expressão do pyarrow.dataset.
+        path (str): Caminho do arquivo Arrow.
+
+    Returns:
+        pd.DataFrame: O conjunto processado, com os tipos gravados pelo ETL.
+    """
+    dataset = ds.dataset(path, format='ipc', filesystem=fs.LocalFileSystem(use_mmap=True))
+
+    if filters is not None and not isinstance(filters, ds.Expression):
+        filters = pq.filters_to_expression(filters)
+
+    return dataset.to_table(columns=columns, filter=filters).to_pandas()
+
+def iter_processed(columns=None, filters=None, batch_size=100_000, path=settings.DADOS_PROCESSADOS):
+    """
+    Percorre o conjunto processado em lotes, sem carregá-lo inteiro em memória.
+
+    Args:
+        columns (list): Colunas a carregar. None carrega todas.
+        filters: Filtro de linhas, como em load_processed.
+        batch_size (int): Número máximo de linhas de cada lote.
+        path (str): Caminho do arquivo Arrow.
+
+    Yields:
+        pd.DataFrame: Um lote de linhas, com os tipos gravados pelo ETL.
+    """
+    dataset = ds.dataset(path, format='ipc', filesystem=fs.LocalFileSystem(use_mmap=True))
+
+    if filters is not None and not isinstance(filters, ds.Expression):
+        filters = pq.filters_to_expression(filters)
+
+    for lote in dataset.to_batches(columns=columns, filter=filters, batch_size=batch_size):
+        if lote.num_rows:
+            yield lote.to_pandas()
@@ -0,0 +1,88 @@
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+from sklearn.base import BaseEstimator, clone
+from sklearn.model_selection import cross_val_score
+
+# Estado de cada processo do pool, preenchido uma única vez pelo initializer
+_WORKER: dict = {}
+
+def _attach(x_path: str, y: np.ndarray, models: Dict[str, BaseEstimator], splits: Dict[str, list]) -> None:
+    # X é aberto como memmap somente leitura: todos os processos compartilham as mesmas páginas
+    _WORKER['X'] = np.load(x_path, mmap_mode='r')
+    _WORKER['y'] = y
+    _WORKER['models'] = models
+    _WORKER['splits'] = splits
+
+def _fold_scores(task: Tuple[str, Tuple[int, ...], str]) -> np.ndarray:
+    key, columns, scoring = task
+    X = np.asarray(_WORKER['X'][:, list(columns)])
+
+    return cross_val_score(clone(_WORKER['models'][key]), X, _WORKER['y'], scoring=scoring,
+                           cv=_WORKER['splits'][key], n_jobs=1)
+
+class SelectionPool:
+    """
+    Pool de processos para avaliar, em paralelo, as candidatas de um passo da busca
+    sequencial, inclusive de vários modelos ao mesmo tempo.
+
+    A matriz de features é gravada uma única vez como .npy e aberta como memmap
+    somente leitura por cada processo (no initializer, junto com y, os modelos e as
+    partições da validação cruzada). Cada tarefa leva apenas a chave do modelo, os
+    índices das colunas e a métrica; nenhum DataFrame é serializado por tarefa.
+
+    Uso:
+        with SelectionPool(X, y, {'lr': LinearRegression()}, {'lr': splits}) as pool:
+            scores = pool.score([('lr', [0, 3]), ('lr', [1, 3])], 'r2')
+
+    Atributos:
+        n_workers (int): Número de processos (None ou -1 = todos os núcleos).
+        directory (str): Onde gravar a matriz compartilhada (None = diretório temporário do sistema).
+    """
+    def __init__(self, X: pd.DataFrame, y: pd.Series, models: Dict[str, BaseEstimator], splits: Dict[str, list],
+                 n_workers: Optional[int] = None, directory: Optional[str] = None):
+        try:
+            self._X = X.to_numpy(dtype=np.float64)
+        except (TypeError, ValueError):
+            raise TypeError("SelectionPool exige features numéricas (ex: depois do pd.get_dummies).")
+
+        self._y = np.asarray(y)
+        self.models = models
+        self.splits = splits
+        self.n_workers = None if n_workers == -1 else n_workers
+        self.directory = directory
+        self._temporary = None
+        self._executor = None
+
+    def __enter__(self) -> 'SelectionPool':
+        self._temporary = tempfile.TemporaryDirectory(dir=self.directory)
+        x_path = os.path.join(self._temporary.name, 'X.npy')
+        np.save(x_path, self._X)
+        self._X = None
+
+        self._executor = ProcessPoolExecutor(max_workers=self.n_workers, initializer=_attach,
+                                             initargs=(x_path, self._y, self.models, self.splits))
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._executor.shutdown()
+        self._temporary.cleanup()
+
+    def score(self, tasks: List[Tuple[str, Sequence[int]]], scoring: str) -> List[float]:
+        """
+        Score médio da validação cruzada de cada tarefa (chave do modelo, índices das colunas).
+        """
+        return [float(scores.mean()) for scores in self.fold_scores(tasks, scoring)]
+
+    def fold_scores(self, tasks: List[Tuple[str, Sequence[int]]], scoring: str) -> List[np.ndarray]:
+        """
+        Scores de cada fold da validação cruzada de cada tarefa (chave do modelo, índices das colunas).
+        """
+        workers = self.n_workers or os.cpu_count() or 1
+        chunksize = max(1, len(tasks) // (4 * workers))
+
+        return list(self._executor.map(_fold_scores, [(key, tuple(columns), scoring) for key, columns in tasks],
+                                       chunksize=chunksize))
@@ -0,0 +1,138 @@
+import os
+import re
+import hashlib
+from decimal import Decimal
+import pandas as pd
+
+class SnapshotCache:
+    """
+    Cache local, em Parquet, das views (ou agregados) extraídas do PostgreSQL.
+
+    Cada snapshot é identificado pelo nome da view, pelo texto da consulta e por
+    uma impressão digital lida do catálogo do servidor (ver impressaoDigital).
+    Enquanto a impressão digital não muda, as execuções seguintes do ETL leem o
+    snapshot do disco em vez de consultar o banco. Ao gravar um snapshot novo, os
+    anteriores da mesma view e consulta são apagados.
+
+    Atributos:
+        diretorio (str): Diretório onde os snapshots são gravados.
+        atualizar (bool): Se True, ignora os snapshots existentes e os regrava.
+    """
+    def __init__(self, diretorio: str, atualizar: bool = False):
+        """
+        Inicializa o cache.
+
+        Args:
+            diretorio (str): Diretório dos snapshots (ex: settings.RAW_DATA_PATH).
+            atualizar (bool): Força a releitura do banco, sobrescrevendo os snapshots.
+        """
+        self.diretorio = diretorio
+        self.atualizar = atualizar
+        os.makedirs(self.diretorio, exist_ok=True)
+
+    # Tabelas das quais a view depende (inclusive por outras views), cada uma com o arquivo
+    # físico (muda com TRUNCATE, VACUUM FULL, CLUSTER), os contadores acumulados de linhas
+    # inseridas, alteradas e removidas do pg_stat_user_tables e, para views, o hash da definição
+    CONSULTA_CATALOGO = """
+        WITH RECURSIVE dependencias(oid) AS (
+            SELECT %s::regclass::oid
+            UNION
+            SELECT d.refobjid
+            FROM dependencias dep
+            JOIN pg_rewrite r ON r.ev_class = dep.oid
+            JOIN pg_depend d ON d.classid = 'pg_rewrite'::regclass AND d.objid = r.oid
+                            AND d.refclassid = 'pg_class'::regclass AND d.refobjid <> dep.oid
+        )
+        SELECT current_setting('track_counts'),
+               string_agg(concat_ws(':', c.oid, c.relkind, c.relfilenode, s.n_tup_ins, s.n_tup_upd, s.n_tup_del,
+                                    CASE WHEN c.relkind IN ('v', 'm') THEN md5(pg_get_viewdef(c.oid)) END),
+                          ',' ORDER BY c.oid)
+        FROM dependencias dep
+        JOIN pg_class c ON c.oid = dep.oid
+        LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid;
+    """
+
+    def impressaoDigital(self, conn, view: str) -> str:
+        """
+        Calcula uma impressão digital barata da view, só com consultas ao catálogo, sem
+        ler as linhas: para cada tabela de que a view depende, o arquivo físico e os
+        contadores de linhas inseridas, alteradas e removidas (ver CONSULTA_CATALOGO).
+        Qualquer escrita nas tabelas muda os contadores; um reinício dos contadores
+        (pg_stat_reset, queda do servidor) só provoca uma releitura desnecessária. Os
+        contadores são publicados ao fim de cada transação, com um atraso de até cerca de
+        um segundo: uma escrita confirmada nesse intervalo só é vista na execução seguinte.
+
+        Com track_counts desligado os contadores não andam; nesse caso a impressão volta
+        a ser o número de linhas e a soma do hash de cada linha, que percorre a view.
+
+        No SQLite, o tamanho e a data de modificação do arquivo do banco fazem esse papel.
+        """
+        cursor = conn.cursor()
+        if getattr(conn, 'dialeto', 'postgresql') == 'sqlite':
+            estado = os.stat(conn.caminho)
+            impressao = f'{estado.st_size}-{estado.st_mtime_ns}'
+        else:
+            cursor.execute(self.CONSULTA_CATALOGO, (f'"POF_2018"."{view}"',))
+            track_counts, impressao = cursor.fetchone()
+            if track_counts != 'on':
+                cursor.execute(f'SELECT COUNT(*), COALESCE(SUM(hashtext(t::text)::bigint), 0) FROM "POF_2018"."{view}" t;')
+                linhas, checksum = cursor.fetchone()
+                impressao = f'{linhas}:{checksum}'
+        cursor.close()
+
+        return impressao
+
+    def chave(self, nome: str, view: str, consulta: str, impressao: str) -> str:
+        """
+        Monta o nome do arquivo do snapshot: o nome da view, um hash curto da consulta (cada
+        modo de leitura tem o seu snapshot) e um hash da impressão digital.
+        """
+        consulta = hashlib.sha256('\n'.join([view, consulta]).encode('utf-8')).hexdigest()[:8]
+        resumo = hashlib.sha256(impressao.encode('utf-8')).hexdigest()[:16]
+
+        return f'{nome}_{consulta}_{resumo}.parquet'
+
+    def ler(self, chave: str):
+        """Retorna o snapshot gravado sob a chave, ou None se não existir (ou se atualizar=True)."""
+        caminho = os.path.join(self.diretorio, chave)
+        if self.atualizar or not os.path.exists(caminho):
+            return None
+
+        return pd.read_parquet(caminho)
+
+    def gravar(self, chave: str, df: pd.DataFrame) -> None:
+        """
+        Grava o snapshot de forma atômica, para que uma execução interrompida não deixe
+        arquivos pela metade, e apaga os snapshots anteriores da mesma view e consulta.
+        """
+        caminho = os.path.join(self.diretorio, chave)
+        temporario = caminho + '.tmp'
+
+        try:
+            df.to_parquet(temporario)
+        except (TypeError, ValueError):
+            # Colunas de objetos que misturam Decimal e int (ex: somas parciais de grupos
+            # sem valores) não têm tipo Arrow; como valores numéricos, viram float
+            self._normalizarNumericos(df).to_parquet(temporario)
+
+        os.replace(temporario, caminho)
+        self._apagarAnteriores(chave)
+
+    def _apagarAnteriores(self, chave: str) -> None:
+        # Mesma view e mesma consulta, outra impressão digital (ver chave). Snapshots de outros
+        # modos de leitura continuam válidos; os do formato antigo, sem o hash da consulta, não
+        nome, consulta, _ = chave.rsplit('_', 2)
+        padrao = re.compile(re.escape(nome) + rf'(_{consulta})?_[0-9a-f]{{16}}\.parquet')
+        for arquivo in os.listdir(self.diretorio):
+            if arquivo != chave and padrao.fullmatch(arquivo):
+                os.remove(os.path.join(self.diretorio, arquivo))
+
+    @staticmethod
+    def _normalizarNumericos(df: pd.DataFrame) -> pd.DataFrame:
+        df = df.copy()
+        for coluna in df.select_dtypes(include='object').columns:
+            valores = df[coluna].dropna()
+            if valores.map(lambda v: isinstance(v, (Decimal, int, float))).all():
+                df[coluna] = pd.to_numeric(df[coluna])
+
+        return df